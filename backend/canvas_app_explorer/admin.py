@@ -1,7 +1,14 @@
 # Register your models here.
 
+import json
+
 from django.contrib import admin
-from backend.canvas_app_explorer.models import LtiTool, CanvasPlacement, ToolCategory, CourseScan
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.html import format_html
+from backend.canvas_app_explorer.alt_text_helper.alt_text_telemetry import summarize_alt_text_calls
+from backend.canvas_app_explorer.models import (
+    LtiTool, CanvasPlacement, ToolCategory, CourseScan, AltTextCacheEntry, AltTextBatchJob, AltTextGenerationCall
+)
 
 class LtiToolAdmin(admin.ModelAdmin):
     fields = (
@@ -38,6 +45,35 @@ class CourseScanAdmin(admin.ModelAdmin):
     list_display = ('id', 'course_id', 'status', 'created_at', 'updated_at')
     list_filter = ('status', 'created_at')
     search_fields = ('course_id', 'q_task_id')
-    readonly_fields = ('course_id', 'q_task_id', 'id', 'created_at', 'updated_at')
+    readonly_fields = ('course_id', 'q_task_id', 'id', 'created_at', 'updated_at', 'alt_text_telemetry')
+
+    @admin.display(description='Alt text telemetry')
+    def alt_text_telemetry(self, obj):
+        summary = summarize_alt_text_calls(obj.course_id)
+        return format_html('<pre>{}</pre>', json.dumps(summary, indent=2, cls=DjangoJSONEncoder))
 
 admin.site.register(CourseScan, CourseScanAdmin)
+
+class AltTextCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'model', 'hit_count', 'created_at', 'last_used_at')
+    list_filter = ('model',)
+    search_fields = ('cache_key', 'alt_text')
+    readonly_fields = ('cache_key', 'model', 'hit_count', 'id', 'created_at', 'last_used_at')
+
+admin.site.register(AltTextCacheEntry, AltTextCacheEntryAdmin)
+
+class AltTextBatchJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'course_id', 'batch_id', 'status', 'request_count', 'created_at', 'completed_at')
+    list_filter = ('status',)
+    search_fields = ('batch_id', 'course__course_id')
+    readonly_fields = ('id', 'batch_id', 'input_file_id', 'request_count', 'requests', 'created_at', 'updated_at', 'completed_at')
+
+admin.site.register(AltTextBatchJob, AltTextBatchJobAdmin)
+
+class AltTextGenerationCallAdmin(admin.ModelAdmin):
+    list_display = ('id', 'course_id', 'deployment', 'image_count', 'prompt_tokens', 'completion_tokens', 'latency_ms', 'retries', 'error', 'created_at')
+    list_filter = ('deployment', 'model', 'image_max_dimension', 'image_jpeg_quality', 'created_at')
+    search_fields = ('course__course_id', 'error')
+    readonly_fields = tuple(field.name for field in AltTextGenerationCall._meta.fields)
+
+admin.site.register(AltTextGenerationCall, AltTextGenerationCallAdmin)
@@ -1,22 +1,51 @@
+import asyncio
+import json
 import logging
 import time
 import base64
 import io
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
 from django.conf import settings
 from constance import config
-from openai import AzureOpenAI
+from openai import AsyncAzureOpenAI, AzureOpenAI
 from PIL import Image
+import httpx
+from backend.canvas_app_explorer.alt_text_helper.alt_text_telemetry import AltTextCallRecord
+from backend.canvas_app_explorer.alt_text_helper.azure_deployment_pool import (
+    FAILOVER_ERRORS, PooledDeployment, get_deployment_pool
+)
+from backend.canvas_app_explorer.alt_text_helper.azure_rate_limiter import estimate_tokens
+from backend.canvas_app_explorer.canvas_lti_manager.exception import AltTextRequestTimeout, ScanDeadlineExceeded
 from backend.canvas_app_explorer.decorators import log_execution_time
 
 logger = logging.getLogger(__name__)
 
+AI_CONNECT_TIMEOUT_SECONDS = 10.0
+AI_KEEPALIVE_EXPIRY_SECONDS = 30.0
+# how long a partial batch waits for more images before it is sent
+ALT_TEXT_BATCH_WAIT_SECONDS = 0.2
+ALT_TEXT_BATCH_INSTRUCTIONS = (
+    'You will receive {count} images. Write the alt text for each image as instructed above. '
+    'Answer only with a JSON object of the form {{"alt_texts": ["...", "..."]}} holding exactly {count} strings, '
+    'one per image, in the order the images were given.'
+)
+
+# (encoded image, mime type) of one image in a batched request
+BatchImage = Tuple[bytes, str]
+# errors after which a call is sent to the next deployment
+RETRYABLE_ERRORS = FAILOVER_ERRORS + (AltTextRequestTimeout,)
+
 
 class AltTextProcessor:
     """Handles AI-based alt text generation for images using Azure OpenAI."""
     
-    def __init__(self):
-        """Initialize the AltTextProcessor with Azure OpenAI client configuration."""
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None, deadline: Optional[float] = None):
+        """Initialize the AltTextProcessor with Azure OpenAI client configuration.
+
+        :param transport: Optional httpx transport for the async client, e.g. a local stand-in in tests.
+        :param deadline: Optional `time.monotonic()` after which async generations raise ScanDeadlineExceeded.
+        """
         self.client = AzureOpenAI(
             api_key=config.AZURE_API_KEY,
             api_version=config.AZURE_API_VERSION,
@@ -24,8 +53,76 @@ class AltTextProcessor:
             organization=config.AZURE_ORGANIZATION
         )
         self.model = config.AZURE_MODEL
+        # async generations are spread over these deployments, each taking its requests and tokens
+        # from a budget shared by all workers; the pool and its deployment health are shared by the process
+        self.deployment_pool = get_deployment_pool()
+        # pooled HTTP client of every deployment's async client, open for the duration of `async_session`
+        self._http_client: Optional[httpx.AsyncClient] = None
+        # deployment name -> its async client during `async_session`
+        self._clients: Dict[str, AsyncAzureOpenAI] = {}
+        # telemetry of every async generation call, collected by `drain_call_records`
+        self.call_records: List[AltTextCallRecord] = []
+        self._transport = transport
+        self.deadline = deadline
+        # images waiting to be sent together when AZURE_ALT_TEXT_BATCH_SIZE > 1, with the futures of their callers
+        self._pending_batch: List[Tuple[bytes, str, asyncio.Future]] = []
+        self._batch_timer: Optional[asyncio.TimerHandle] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+
+    @asynccontextmanager
+    async def async_session(self) -> AsyncIterator[None]:
+        """Open an AsyncAzureOpenAI client per pool deployment for every generation of a scan and close them afterwards.
+
+        Requests time out after AZURE_REQUEST_TIMEOUT_SECONDS and share up to AZURE_MAX_CONNECTIONS keep-alive
+        connections. Nested sessions reuse the outer clients.
+        """
+        if self._http_client is not None:
+            yield
+            return
+        max_connections = config.AZURE_MAX_CONNECTIONS
+        timeout = httpx.Timeout(config.AZURE_REQUEST_TIMEOUT_SECONDS, connect=AI_CONNECT_TIMEOUT_SECONDS)
+        http_client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=AI_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            transport=self._transport,
+        )
+        # with more than one deployment, failing over replaces the SDK's retries on the same deployment
+        failover = len(self.deployment_pool.deployments) > 1
+        for pooled in self.deployment_pool.deployments:
+            deployment = pooled.deployment
+            self._clients[pooled.name] = AsyncAzureOpenAI(
+                api_key=deployment.api_key,
+                api_version=deployment.api_version,
+                azure_endpoint=deployment.api_base,
+                organization=deployment.organization,
+                timeout=timeout,
+                http_client=http_client,
+                **({'max_retries': 0} if failover else {}),
+            )
+        self._http_client = http_client
+        self._pending_batch = []
+        self._batch_timer = None
+        try:
+            yield
+        finally:
+            if self._batch_timer is not None:
+                self._batch_timer.cancel()
+                self._batch_timer = None
+            # the clients are about to close, batches still waiting or in flight can't be answered anymore
+            self._fail_batch(self._pending_batch)
+            self._pending_batch = []
+            batch_tasks = list(self._batch_tasks)
+            for task in batch_tasks:
+                task.cancel()
+            await asyncio.gather(*batch_tasks, return_exceptions=True)
+            self._clients = {}
+            client, self._http_client = self._http_client, None
+            await client.aclose()
     
-    @log_execution_time
     def generate_alt_text(self, image: Image.Image) -> Optional[str]:
         """
         Generate alt text for an image using Azure OpenAI.
@@ -36,29 +133,317 @@ class AltTextProcessor:
         Returns:
             Generated alt text string, or None if generation fails
         """
-        # Encode image to base64 (converts to JPEG if needed)
         img_buffer = io.BytesIO()
         image.save(img_buffer, format='JPEG')
-        imagedata = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
-        
-        prompt = config.AZURE_ALT_TEXT_PROMPT
+        return self.generate_alt_text_from_bytes(img_buffer.getvalue())
+
+    @log_execution_time
+    def generate_alt_text_from_bytes(self, image_bytes: bytes, mime_type: str = 'image/jpeg') -> Optional[str]:
+        """
+        Generate alt text for already encoded image bytes using Azure OpenAI.
         
-        messages = [
-            {"role": "system", "content": prompt},
-            {"role": "user", "content": [
-                {"type": "image_url", "image_url": {
-                    "url": f"data:image/jpeg;base64,{imagedata}"}}
-            ]}
-        ]
+        The bytes are sent as-is, so images optimized by ProcessContentImages are not decoded
+        or re-encoded again before the request.
         
+        Args:
+            image_bytes: Encoded image, e.g. the JPEG produced by get_optimized_images
+            mime_type: Content type of image_bytes
+            
+        Returns:
+            Generated alt text string, or None if generation fails
+        """
         response = self.client.chat.completions.with_raw_response.create(
             model=self.model,
+            messages=self.build_messages(image_bytes, mime_type),
+            temperature=config.AZURE_ALT_TEXT_TEMPERATURE,
+        )
+        
+        return self._alt_text_from_completion(response.parse())
+
+    async def generate_alt_text_from_bytes_async(self, image_bytes: bytes, mime_type: str = 'image/jpeg') -> Optional[str]:
+        """
+        Same as `generate_alt_text_from_bytes`, awaiting the request on the pooled async client.
+        
+        No thread is held while the request is in flight, and cancelling the calling task aborts the request.
+        Called outside `async_session`, a session is opened just for this request.
+        """
+        if self._http_client is None:
+            async with self.async_session():
+                return await self.generate_alt_text_from_bytes_async(image_bytes, mime_type)
+
+        start_time = time.perf_counter()
+        completion = await self._create_completion_async(self.build_messages(image_bytes, mime_type), 1, len(image_bytes))
+        logger.info(f"generate_alt_text_from_bytes_async execution time: {time.perf_counter() - start_time:.2f} seconds")
+        return self._alt_text_from_completion(completion)
+
+    async def generate_alt_text_batched_async(self, image_bytes: bytes, mime_type: str = 'image/jpeg') -> Optional[str]:
+        """
+        Generate alt text like `generate_alt_text_from_bytes_async`, sharing the request with other images when batching is on.
+        
+        With AZURE_ALT_TEXT_BATCH_SIZE above 1, concurrent callers are collected until the batch is full or
+        ALT_TEXT_BATCH_WAIT_SECONDS passed, and the whole batch is described in one request with one copy of the prompt.
+        Images the batched answer doesn't cover are generated with single-image requests.
+        """
+        batch_size = config.AZURE_ALT_TEXT_BATCH_SIZE
+        if batch_size <= 1:
+            return await self.generate_alt_text_from_bytes_async(image_bytes, mime_type)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending_batch.append((image_bytes, mime_type, future))
+        if len(self._pending_batch) >= batch_size:
+            self._flush_batch()
+        elif self._batch_timer is None:
+            self._batch_timer = loop.call_later(ALT_TEXT_BATCH_WAIT_SECONDS, self._flush_batch)
+        return await future
+
+    def _flush_batch(self) -> None:
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+        batch, self._pending_batch = self._pending_batch, []
+        if batch:
+            # keep a reference so the task isn't garbage collected while it runs
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    @staticmethod
+    def _fail_batch(batch: List[Tuple[bytes, str, asyncio.Future]]) -> None:
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(RuntimeError("Alt text session closed before the batched request was answered"))
+
+    async def _run_batch(self, batch: List[Tuple[bytes, str, asyncio.Future]]) -> None:
+        try:
+            await self._answer_batch(batch)
+        except asyncio.CancelledError:
+            self._fail_batch(batch)
+            raise
+
+    async def _answer_batch(self, batch: List[Tuple[bytes, str, asyncio.Future]]) -> None:
+        alt_texts: List[Optional[str]] = [None] * len(batch)
+        if len(batch) > 1:
+            try:
+                alt_texts = await self.generate_alt_texts_from_bytes_async([(image, mime) for image, mime, _ in batch])
+            except Exception as e:
+                logger.error(f"Batched alt text request for {len(batch)} images failed, falling back to single images: {e}")
+
+        # entries the batch didn't answer (or a batch of one) get a request of their own
+        missing = [i for i, alt_text in enumerate(alt_texts) if not alt_text]
+        single_results = await asyncio.gather(
+            *[self.generate_alt_text_from_bytes_async(batch[i][0], batch[i][1]) for i in missing],
+            return_exceptions=True,
+        )
+        for i, result in zip(missing, single_results):
+            alt_texts[i] = result
+
+        for (_, _, future), result in zip(batch, alt_texts):
+            if future.done():
+                # the caller was cancelled
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def generate_alt_texts_from_bytes_async(self, images: List[BatchImage]) -> List[Optional[str]]:
+        """
+        Describe several images in one request, returning one alt text per image (None where the answer has none).
+        
+        The answer must be the JSON object requested by ALT_TEXT_BATCH_INSTRUCTIONS; a malformed answer or one with
+        the wrong number of entries yields None for every image.
+        """
+        if self._http_client is None:
+            async with self.async_session():
+                return await self.generate_alt_texts_from_bytes_async(images)
+
+        start_time = time.perf_counter()
+        completion = await self._create_completion_async(
+            self.build_batch_messages(images), len(images), sum(len(image) for image, _ in images),
+            response_format={"type": "json_object"},
+        )
+        logger.info(
+            f"generate_alt_texts_from_bytes_async execution time for {len(images)} images: "
+            f"{time.perf_counter() - start_time:.2f} seconds"
+        )
+        return self._alt_texts_from_batch_completion(completion, len(images))
+
+    async def _create_completion_async(
+            self, messages: List[Dict[str, Any]], image_count: int, image_bytes: int, **kwargs: Any):
+        """
+        Send a chat completion for `image_count` images to the deployment chosen by the pool, once its rate
+        limiter admits it. Connection errors, 5xx and 429 answers and requests without an answer within
+        AZURE_CALL_DEADLINE_SECONDS are retried on each other deployment in turn. With AZURE_HEDGE_ENABLED, a
+        request slower than the pool's `hedge_delay` gets a duplicate and the first answer wins.
+        Past `deadline` nothing is sent and a call still running is cancelled, both raising ScanDeadlineExceeded.
+        The call's deployment, token usage, latency and retries are added to `call_records`.
+        """
+        if self.deadline is None:
+            return await self._create_completion_with_failover(messages, image_count, image_bytes, **kwargs)
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise ScanDeadlineExceeded("Course scan deadline reached before the alt text request was sent")
+        try:
+            return await asyncio.wait_for(
+                self._create_completion_with_failover(messages, image_count, image_bytes, **kwargs), remaining
+            )
+        except asyncio.TimeoutError as e:
+            raise ScanDeadlineExceeded("Course scan deadline reached while waiting for alt text") from e
+
+    async def _create_completion_with_failover(
+            self, messages: List[Dict[str, Any]], image_count: int, image_bytes: int, **kwargs: Any):
+        record = AltTextCallRecord(image_count=image_count, image_bytes=image_bytes)
+        call_start = time.perf_counter()
+        tried: Set[str] = set()
+        last_error: Optional[Exception] = None
+        try:
+            while True:
+                pooled = self.deployment_pool.choose(exclude=tried)
+                if pooled is None:
+                    raise last_error
+                tried.add(pooled.name)
+                try:
+                    return await self._hedged_request(pooled, tried, record, messages, image_count, **kwargs)
+                except RETRYABLE_ERRORS as e:
+                    last_error = e
+        except BaseException as e:
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record.retries += max(0, len(tried) - 1)
+            record.wait_seconds = max(0.0, time.perf_counter() - call_start - record.latency_seconds)
+            self.call_records.append(record)
+
+    async def _hedged_request(
+            self, pooled: PooledDeployment, tried: Set[str], record: AltTextCallRecord,
+            messages: List[Dict[str, Any]], image_count: int, **kwargs: Any):
+        """
+        `_request_deployment` on `pooled`, duplicated on another deployment (the same one if there is no other)
+        when no answer came within the pool's `hedge_delay`. The first successful answer is returned and the
+        other request cancelled; when both fail the last error is raised. Each request of a hedged call keeps
+        its own telemetry and only the request that settled the call is added to `record`.
+        """
+        delay = self.deployment_pool.hedge_delay() if config.AZURE_HEDGE_ENABLED else None
+        if delay is None:
+            return await self._request_deployment(pooled, record, messages, image_count, **kwargs)
+
+        def start(target: PooledDeployment) -> asyncio.Future:
+            attempt = AltTextCallRecord(image_count=record.image_count, image_bytes=record.image_bytes)
+            task = asyncio.ensure_future(self._request_deployment(target, attempt, messages, image_count, **kwargs))
+            requests[task] = (target, attempt)
+            return task
+
+        requests: Dict[asyncio.Future, Tuple[PooledDeployment, AltTextCallRecord]] = {}
+        first = start(pooled)
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if not done:
+                hedge = self.deployment_pool.choose(exclude=tried) or pooled
+                tried.add(hedge.name)
+                self.deployment_pool.record_hedge(hedge)
+                logger.info(f"No alt text from deployment {pooled.name} after {delay:.2f}s, hedging on {hedge.name}")
+                start(hedge)
+            pending = set(requests)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    target, attempt = requests[task]
+                    if task.exception() is None:
+                        if task is not first:
+                            self.deployment_pool.record_hedge_win(target)
+                        self._add_attempt(record, attempt)
+                        return task.result()
+                    error, failed_attempt = task.exception(), attempt
+            self._add_attempt(record, failed_attempt)
+            raise error
+        finally:
+            for task in requests:
+                task.cancel()
+            await asyncio.gather(*requests, return_exceptions=True)
+
+    @staticmethod
+    def _add_attempt(record: AltTextCallRecord, attempt: AltTextCallRecord) -> None:
+        """Add the telemetry of the request that settled a hedged call to the call's record."""
+        record.deployment, record.model = attempt.deployment, attempt.model
+        record.latency_seconds += attempt.latency_seconds
+        record.retries += attempt.retries
+        if attempt.prompt_tokens is not None:
+            record.prompt_tokens, record.completion_tokens = attempt.prompt_tokens, attempt.completion_tokens
+
+    async def _request_deployment(
+            self, pooled: PooledDeployment, record: AltTextCallRecord,
+            messages: List[Dict[str, Any]], image_count: int, **kwargs: Any):
+        """
+        One request to `pooled` once its rate limiter admits it, abandoned after AZURE_CALL_DEADLINE_SECONDS.
+        The outcome is recorded with the pool and in `record`; retryable errors are raised for the next deployment.
+        """
+        record.deployment, record.model = pooled.name, pooled.deployment.model
+        start_time = time.perf_counter()
+        try:
+            async with pooled.rate_limiter.slot(estimate_tokens(image_count)) as reservation:
+                # the deployment's latency, without the wait for its budget
+                start_time = time.perf_counter()
+                call_deadline = config.AZURE_CALL_DEADLINE_SECONDS
+                try:
+                    response, completion = await asyncio.wait_for(
+                        self._send_request(pooled, messages, **kwargs), call_deadline
+                    )
+                except asyncio.TimeoutError as e:
+                    raise AltTextRequestTimeout(
+                        f"No answer from deployment {pooled.name} within {call_deadline:.0f}s"
+                    ) from e
+                latency = time.perf_counter() - start_time
+                usage = getattr(completion, 'usage', None)
+                await pooled.rate_limiter.record_response(
+                    reservation, response.headers, usage.total_tokens if usage else None
+                )
+        except RETRYABLE_ERRORS as e:
+            # a 429 has been recorded by the rate limiter on its way out of the slot
+            latency = time.perf_counter() - start_time
+            record.latency_seconds += latency
+            self.deployment_pool.record_failure(pooled, e, latency)
+            logger.warning(f"Alt text request to Azure OpenAI deployment {pooled.name} failed: {e}")
+            raise
+        record.deployment, record.model = pooled.name, pooled.deployment.model
+        record.latency_seconds += latency
+        record.retries += getattr(response, 'retries_taken', 0)
+        if usage:
+            record.prompt_tokens, record.completion_tokens = usage.prompt_tokens, usage.completion_tokens
+        self.deployment_pool.record_success(pooled, latency)
+        return completion
+
+    async def _send_request(self, pooled: PooledDeployment, messages: List[Dict[str, Any]], **kwargs: Any):
+        response = await self._clients[pooled.name].chat.completions.with_raw_response.create(
+            model=pooled.deployment.model,
             messages=messages,
             temperature=config.AZURE_ALT_TEXT_TEMPERATURE,
+            **kwargs,
         )
+        return response, await response.parse()
+
+    def drain_call_records(self) -> List[AltTextCallRecord]:
+        """Return the telemetry of the calls made since the last drain and forget it."""
+        records, self.call_records = self.call_records, []
+        return records
+
+    @staticmethod
+    def build_messages(image_bytes: bytes, mime_type: str) -> List[Dict[str, Any]]:
+        imagedata = base64.b64encode(image_bytes).decode('utf-8')
         
-        completion = response.parse()
+        prompt = config.AZURE_ALT_TEXT_PROMPT
         
+        return [
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": [
+                {"type": "image_url", "image_url": {
+                    "url": f"data:{mime_type};base64,{imagedata}"}}
+            ]}
+        ]
+
+    @staticmethod
+    def _alt_text_from_completion(completion) -> Optional[str]:
         # Validate that completion and choices exist before accessing
         if not completion or not completion.choices or len(completion.choices) == 0:
             logger.error(
@@ -72,3 +457,31 @@ class AltTextProcessor:
         logger.info(f"AI response: {alt_text}")
         
         return alt_text
+
+    @staticmethod
+    def build_batch_messages(images: List[BatchImage]) -> List[Dict[str, Any]]:
+        prompt = config.AZURE_ALT_TEXT_PROMPT
+        instructions = ALT_TEXT_BATCH_INSTRUCTIONS.format(count=len(images))
+        
+        return [
+            {"role": "system", "content": f"{prompt}\n\n{instructions}"},
+            {"role": "user", "content": [
+                {"type": "image_url", "image_url": {
+                    "url": f"data:{mime_type};base64,{base64.b64encode(image_bytes).decode('utf-8')}"}}
+                for image_bytes, mime_type in images
+            ]}
+        ]
+
+    @staticmethod
+    def _alt_texts_from_batch_completion(completion, count: int) -> List[Optional[str]]:
+        content = completion.choices[0].message.content if completion and completion.choices else None
+        try:
+            alt_texts = json.loads(content or '')['alt_texts']
+        except (ValueError, TypeError, KeyError) as e:
+            logger.error(f"Malformed batched alt text response: {e}; content={content}")
+            return [None] * count
+        if not isinstance(alt_texts, list) or len(alt_texts) != count:
+            logger.error(f"Batched alt text response has {len(alt_texts) if isinstance(alt_texts, list) else 'no'} entries for {count} images")
+            return [None] * count
+        logger.info(f"AI batched response: {alt_texts}")
+        return [alt_text.strip() if isinstance(alt_text, str) and alt_text.strip() else None for alt_text in alt_texts]
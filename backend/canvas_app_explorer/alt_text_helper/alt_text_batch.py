@@ -0,0 +1,196 @@
+import asyncio
+import json
+import logging
+import tempfile
+from collections import defaultdict
+from typing import IO, Any, Dict, List, Optional, Tuple, Union
+
+import httpx
+from asgiref.sync import async_to_sync
+from constance import config
+from django.utils import timezone
+from openai import AzureOpenAI
+
+from backend.canvas_app_explorer.alt_text_helper.ai_processor import AltTextProcessor
+from backend.canvas_app_explorer.alt_text_helper.process_content_images import ProcessContentImages, canonical_image_key
+from backend.canvas_app_explorer.canvas_lti_manager.exception import AltTextBatchException
+from backend.canvas_app_explorer.models import AltTextBatchJob, ImageItem
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = '/chat/completions'
+BATCH_COMPLETION_WINDOW = '24h'
+# batch states after which no more results arrive, `expired` batches may still have partial output
+BATCH_TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+# JSONL input larger than this is spooled to a temp file instead of memory
+BATCH_SPOOL_MEMORY_BYTES = 8 * 1024 * 1024
+BATCH_HTTP_TIMEOUT_SECONDS = 120.0
+
+
+class AltTextBatch:
+    """
+    Generate a course's alt text through the Azure OpenAI Batch API instead of one live request per image.
+
+    `submit` downloads and optimizes every unique image like a regular scan, and writes a chat completion
+    request for each image that isn't in the alt text cache to a JSONL file. It uploads the file and starts
+    a batch job recorded as an AltTextBatchJob. `poll` checks the job, and once it has finished maps the
+    output back to the ImageItems. Both return results in the `_worker_async` shape
+    ({'img': ImageItem, 'alt_text': str|Exception}) for `ProcessContentImages.store_alt_text_results`.
+    """
+
+    def __init__(self, process_content_images: ProcessContentImages, transport: Optional[httpx.BaseTransport] = None):
+        """
+        :param process_content_images: Downloads, optimizes and caches images for the course and stores the results.
+        :param transport: Optional httpx transport for the Azure OpenAI client, e.g. a local stand-in in tests.
+        """
+        self.process_content_images = process_content_images
+        self.course_id = process_content_images.course_id
+        self.client = AzureOpenAI(
+            api_key=config.AZURE_API_KEY,
+            api_version=config.AZURE_API_VERSION,
+            azure_endpoint=config.AZURE_API_BASE,
+            organization=config.AZURE_ORGANIZATION,
+            http_client=httpx.Client(transport=transport, timeout=BATCH_HTTP_TIMEOUT_SECONDS) if transport else None,
+        )
+        # batch jobs need a deployment of the "global batch" type, which may differ from the live one
+        self.deployment = config.AZURE_BATCH_MODEL or config.AZURE_MODEL
+
+    def submit(self, image_models: List[ImageItem]) -> Tuple[Optional[AltTextBatchJob], List[Dict[str, Any]]]:
+        """
+        Start a batch job for the images that need generated alt text.
+
+        Returns the job (None when no image needs the AI model) and the results of images settled without it:
+        cache hits, trivial images, rejected images and failed downloads.
+        """
+        groups: Dict[str, List[ImageItem]] = defaultdict(list)
+        for img in image_models:
+            groups[canonical_image_key(img.image_url)].append(img)
+
+        requests: Dict[str, Dict[str, Any]] = {}
+        settled: List[Dict[str, Any]] = []
+        with tempfile.SpooledTemporaryFile(max_size=BATCH_SPOOL_MEMORY_BYTES) as jsonl:
+            async_to_sync(self._write_requests)(list(groups.values()), jsonl, requests, settled)
+            if not requests:
+                logger.info(f"No images of course {self.course_id} need a batch alt text request")
+                return None, settled
+            jsonl.seek(0)
+            input_file = self.client.files.create(file=('alt_text_batch.jsonl', jsonl), purpose='batch')
+
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=BATCH_COMPLETION_WINDOW,
+        )
+        job = AltTextBatchJob.objects.create(
+            course_id=self.course_id,
+            batch_id=batch.id,
+            input_file_id=input_file.id,
+            status=batch.status,
+            request_count=len(requests),
+            requests=requests,
+        )
+        logger.info(f"Submitted {job} with {len(requests)} requests for {len(image_models)} ImageItems")
+        return job, settled
+
+    async def _write_requests(
+            self,
+            groups: List[List[ImageItem]],
+            jsonl: IO[bytes],
+            requests: Dict[str, Dict[str, Any]],
+            settled: List[Dict[str, Any]]) -> None:
+        proc = self.process_content_images
+        sem = asyncio.Semaphore(config.IMAGE_PROCESSING_CONCURRENCY)
+        temperature = config.AZURE_ALT_TEXT_TEMPERATURE
+
+        async def _prepare(group: List[ImageItem]) -> None:
+            async with sem:
+                contents = await proc.get_image_content_async(group[0].image_url)
+                if isinstance(contents, Exception):
+                    settled.extend({'img': img, 'alt_text': contents} for img in group)
+                    return
+                trivial = await proc.prefilter_image_async(contents)
+                if trivial:
+                    settled.extend({'img': img, 'alt_text': trivial} for img in group)
+                    return
+                reused_alt_text, cache_entry = await proc.find_reusable_alt_text(contents)
+                if reused_alt_text:
+                    settled.extend({'img': img, 'alt_text': reused_alt_text} for img in group)
+                    return
+                custom_id = f'image-{group[0].id}'
+                line = {
+                    'custom_id': custom_id,
+                    'method': 'POST',
+                    'url': BATCH_ENDPOINT,
+                    'body': {
+                        'model': self.deployment,
+                        'messages': AltTextProcessor.build_messages(contents, 'image/jpeg'),
+                        'temperature': temperature,
+                    },
+                }
+                # lines are written from the event loop thread, one at a time
+                jsonl.write(json.dumps(line).encode('utf-8') + b'\n')
+                requests[custom_id] = {'image_ids': [img.id for img in group], **cache_entry}
+
+        async with proc.image_download_session():
+            await asyncio.gather(*[_prepare(group) for group in groups])
+
+    def poll(self, job: AltTextBatchJob) -> Optional[List[Dict[str, Any]]]:
+        """
+        Refresh the job's status. Returns None while the batch is running, then the results of its ImageItems.
+
+        Requests without a successful result (failed, expired or cancelled batches, per-request errors)
+        come back as AltTextBatchException so the images are recorded as failed and retried.
+        """
+        batch = self.client.batches.retrieve(job.batch_id)
+        job.status = batch.status
+        if batch.status not in BATCH_TERMINAL_STATUSES:
+            job.save(update_fields=['status', 'updated_at'])
+            logger.info(f"{job} is still running: {batch.request_counts}")
+            return None
+
+        outcomes: Dict[str, Union[str, Exception]] = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                for line in self.client.files.content(file_id).text.splitlines():
+                    if line.strip():
+                        custom_id, outcome = self._parse_result_line(line)
+                        outcomes[custom_id] = outcome
+
+        images_by_id = {
+            img.id: img
+            for img in ImageItem.objects.filter(
+                id__in=[image_id for request in job.requests.values() for image_id in request['image_ids']]
+            )
+        }
+        gen_results = []
+        for custom_id, request in job.requests.items():
+            outcome = outcomes.get(custom_id, AltTextBatchException(f"Batch {job.batch_id} {batch.status} without a result"))
+            if isinstance(outcome, str):
+                self.process_content_images.remember_alt_text(outcome, request)
+            # images deleted by a rescan while the batch ran are skipped
+            gen_results.extend(
+                {'img': images_by_id[image_id], 'alt_text': outcome}
+                for image_id in request['image_ids'] if image_id in images_by_id
+            )
+
+        job.completed_at = timezone.now()
+        job.save(update_fields=['status', 'completed_at', 'updated_at'])
+        logger.info(f"{job} finished with {len(outcomes)} results for {job.request_count} requests")
+        return gen_results
+
+    @staticmethod
+    def _parse_result_line(line: str) -> Tuple[str, Union[str, Exception]]:
+        """(custom_id, alt text or AltTextBatchException) of one line of a batch output or error file."""
+        record = json.loads(line)
+        custom_id = record.get('custom_id')
+        response = record.get('response') or {}
+        body = response.get('body') or {}
+        if record.get('error') or response.get('status_code') != 200:
+            error = record.get('error') or body.get('error') or {}
+            message = error.get('message') if isinstance(error, dict) else error
+            return custom_id, AltTextBatchException(
+                f"Batch request {custom_id} failed with status {response.get('status_code')}: {message}"
+            )
+        choices = body.get('choices') or []
+        alt_text = (choices[0].get('message') or {}).get('content') if choices else None
+        return custom_id, (alt_text or '').strip()
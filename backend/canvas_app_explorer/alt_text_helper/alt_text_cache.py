@@ -0,0 +1,150 @@
+import hashlib
+import logging
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from constance import config
+from django.db.models import F, Q
+from django.db.utils import DatabaseError
+from django.utils import timezone
+
+from backend.canvas_app_explorer.alt_text_helper.perceptual_hash import hamming_distance, hash_bands, hash_to_hex
+from backend.canvas_app_explorer.models import AltTextCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# near-duplicate candidates sharing a hash band that are compared per lookup
+SIMILAR_CANDIDATE_LIMIT = 50
+
+
+def alt_text_cache_key(image_bytes: bytes, model: str, prompt: str, temperature: float) -> str:
+    """sha256 over the optimized image bytes and every generation setting that changes the alt text."""
+    digest = hashlib.sha256(image_bytes)
+    for part in (model, prompt, repr(float(temperature))):
+        digest.update(b'\x00')
+        digest.update(part.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def generation_settings_key(model: str, prompt: str, temperature: float) -> str:
+    """sha256 of the generation settings alone, near-duplicate images only share alt text generated the same way."""
+    return alt_text_cache_key(b'', model, prompt, temperature)
+
+
+class AltTextCache:
+    """
+    Persistent, content-addressed alt text cache shared by every course scan.
+
+    Entries live in the database so copies of a course in later terms reuse alt text generated
+    for the same images. Entries unused for ALT_TEXT_CACHE_TTL_DAYS are ignored and evicted, and
+    the table is trimmed to ALT_TEXT_CACHE_MAX_ENTRIES least recently used entries.
+    When PERCEPTUAL_HASH_MATCHING is on, images with no exact entry can reuse the alt text of an
+    entry whose perceptual hash is within PERCEPTUAL_HASH_MAX_DISTANCE bits.
+    Database errors are logged and treated as misses so the cache never fails a scan.
+    """
+
+    def __init__(self) -> None:
+        self.enabled: bool = config.ALT_TEXT_CACHE_ENABLED
+        self.ttl = timedelta(days=config.ALT_TEXT_CACHE_TTL_DAYS)
+        self.max_entries: int = config.ALT_TEXT_CACHE_MAX_ENTRIES
+        self.similar_matching: bool = config.PERCEPTUAL_HASH_MATCHING
+        self.max_distance: int = config.PERCEPTUAL_HASH_MAX_DISTANCE
+        self.hits = 0
+        self.misses = 0
+        self.similar_hits = 0
+
+    def get(self, cache_key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        try:
+            now = timezone.now()
+            entry = AltTextCacheEntry.objects.filter(cache_key=cache_key, last_used_at__gte=now - self.ttl).first()
+            if entry is None:
+                self.misses += 1
+                return None
+            AltTextCacheEntry.objects.filter(id=entry.id).update(hit_count=F('hit_count') + 1, last_used_at=now)
+            self.hits += 1
+            return entry.alt_text
+        except (DatabaseError, Exception) as e:
+            logger.error(f"Error reading alt text cache entry {cache_key}: {e}")
+            self.misses += 1
+            return None
+
+    def get_similar(self, perceptual_hash: int, generation_key: str) -> Optional[str]:
+        """Alt text of the closest entry within the Hamming distance threshold, generated with the same settings."""
+        if not self.enabled or not self.similar_matching:
+            return None
+        try:
+            now = timezone.now()
+            band_match = Q()
+            for i, band in enumerate(hash_bands(perceptual_hash)):
+                band_match |= Q(**{f'phash_band_{i}': band})
+            candidates = (
+                AltTextCacheEntry.objects
+                .filter(band_match, generation_key=generation_key, last_used_at__gte=now - self.ttl)
+                .values('id', 'perceptual_hash', 'alt_text')[:SIMILAR_CANDIDATE_LIMIT]
+            )
+            best = None
+            best_distance = self.max_distance + 1
+            for candidate in candidates:
+                distance = hamming_distance(perceptual_hash, int(candidate['perceptual_hash'], 16))
+                if distance < best_distance:
+                    best, best_distance = candidate, distance
+            if best is None:
+                return None
+            AltTextCacheEntry.objects.filter(id=best['id']).update(hit_count=F('hit_count') + 1, last_used_at=now)
+            self.similar_hits += 1
+            logger.debug(f"Near-duplicate alt text cache match at distance {best_distance}")
+            return best['alt_text']
+        except (DatabaseError, Exception) as e:
+            logger.error(f"Error looking up similar alt text cache entries: {e}")
+            return None
+
+    def set(
+            self,
+            cache_key: str,
+            model: str,
+            alt_text: str,
+            generation_key: Optional[str] = None,
+            perceptual_hash: Optional[int] = None) -> None:
+        if not self.enabled or not alt_text:
+            return
+        defaults = {'model': model[:100], 'alt_text': alt_text, 'last_used_at': timezone.now(), 'generation_key': generation_key}
+        if perceptual_hash is not None:
+            defaults['perceptual_hash'] = hash_to_hex(perceptual_hash)
+            for i, band in enumerate(hash_bands(perceptual_hash)):
+                defaults[f'phash_band_{i}'] = band
+        try:
+            AltTextCacheEntry.objects.update_or_create(cache_key=cache_key, defaults=defaults)
+        except (DatabaseError, Exception) as e:
+            logger.error(f"Error storing alt text cache entry {cache_key}: {e}")
+
+    def evict(self) -> int:
+        """Delete expired entries, then the least recently used ones beyond the size limit. Returns rows deleted."""
+        if not self.enabled:
+            return 0
+        try:
+            deleted, _ = AltTextCacheEntry.objects.filter(last_used_at__lt=timezone.now() - self.ttl).delete()
+            overflow = AltTextCacheEntry.objects.count() - self.max_entries
+            if overflow > 0:
+                lru_ids = list(
+                    AltTextCacheEntry.objects.order_by('last_used_at').values_list('id', flat=True)[:overflow]
+                )
+                overflow_deleted, _ = AltTextCacheEntry.objects.filter(id__in=lru_ids).delete()
+                deleted += overflow_deleted
+            if deleted:
+                logger.info(f"Evicted {deleted} alt text cache entries")
+            return deleted
+        except (DatabaseError, Exception) as e:
+            logger.error(f"Error evicting alt text cache entries: {e}")
+            return 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        # similar hits are exact misses answered by a near-duplicate
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'similar_hits': self.similar_hits,
+            'hit_rate': round((self.hits + self.similar_hits) / lookups, 3) if lookups else None,
+        }
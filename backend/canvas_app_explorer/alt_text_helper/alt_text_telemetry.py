@@ -0,0 +1,147 @@
+import logging
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from constance import config
+
+from backend.canvas_app_explorer.models import AltTextGenerationCall, ImageItem, ImageItemStatus
+
+logger = logging.getLogger(__name__)
+
+TELEMETRY_SAVE_BATCH_SIZE = 500
+
+
+@dataclass
+class AltTextCallRecord:
+    """Telemetry of one alt text generation call, including the attempts it failed over from."""
+    image_count: int
+    image_bytes: int
+    deployment: str = ''
+    model: str = ''
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    latency_seconds: float = 0.0
+    wait_seconds: float = 0.0
+    retries: int = 0
+    error: Optional[str] = None
+
+
+def save_alt_text_calls(
+        course_id: int,
+        records: List[AltTextCallRecord],
+        image_max_dimension: int,
+        image_jpeg_quality: int) -> None:
+    """Store the calls of a course scan with the image optimization settings their images were sent with."""
+    AltTextGenerationCall.objects.bulk_create(
+        [
+            AltTextGenerationCall(
+                course_id=course_id,
+                deployment=record.deployment[:255],
+                model=record.model[:100],
+                image_count=record.image_count,
+                image_bytes=record.image_bytes,
+                image_max_dimension=image_max_dimension,
+                image_jpeg_quality=image_jpeg_quality,
+                prompt_tokens=record.prompt_tokens,
+                completion_tokens=record.completion_tokens,
+                latency_ms=round(record.latency_seconds * 1000),
+                wait_ms=round(record.wait_seconds * 1000),
+                retries=record.retries,
+                error=record.error[:255] if record.error else None,
+            )
+            for record in records
+        ],
+        batch_size=TELEMETRY_SAVE_BATCH_SIZE,
+    )
+    logger.info(f"Saved telemetry of {len(records)} alt text calls for course {course_id}")
+
+
+def _percentiles(values: List[int]) -> Dict[str, Optional[int]]:
+    """Nearest-rank p50, p95 and max of `values`."""
+    if not values:
+        return {'p50': None, 'p95': None, 'max': None}
+    ordered = sorted(values)
+
+    def rank(p: float) -> int:
+        return ordered[max(0, math.ceil(p * len(ordered)) - 1)]
+
+    return {'p50': rank(0.5), 'p95': rank(0.95), 'max': ordered[-1]}
+
+
+class _CallTotals:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.failed_calls = 0
+        self.images = 0
+        self.image_bytes = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies: List[int] = []
+        self.waits: List[int] = []
+
+    def add(self, call: Dict[str, Any]) -> None:
+        self.calls += 1
+        self.failed_calls += 1 if call['error'] else 0
+        self.images += call['image_count']
+        self.image_bytes += call['image_bytes']
+        self.retries += call['retries']
+        self.prompt_tokens += call['prompt_tokens'] or 0
+        self.completion_tokens += call['completion_tokens'] or 0
+        self.latencies.append(call['latency_ms'])
+        self.waits.append(call['wait_ms'])
+
+    def as_dict(self) -> Dict[str, Any]:
+        prompt_price = config.AZURE_PROMPT_TOKEN_PRICE_PER_MILLION
+        completion_price = config.AZURE_COMPLETION_TOKEN_PRICE_PER_MILLION
+        cost = (self.prompt_tokens * prompt_price + self.completion_tokens * completion_price) / 1_000_000
+        return {
+            'calls': self.calls,
+            'failed_calls': self.failed_calls,
+            'images': self.images,
+            'retries': self.retries,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'total_tokens': self.prompt_tokens + self.completion_tokens,
+            'prompt_tokens_per_image': round(self.prompt_tokens / self.images) if self.images else None,
+            'bytes_per_image': round(self.image_bytes / self.images) if self.images else None,
+            'estimated_cost': round(cost, 4),
+            'latency_ms': _percentiles(self.latencies),
+            'wait_ms': _percentiles(self.waits),
+        }
+
+
+def summarize_alt_text_calls(course_id: int, since: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Aggregate the alt text calls of a course (made at or after `since`): totals, token cost at the current
+    AZURE_*_TOKEN_PRICE_PER_MILLION settings and latency percentiles, overall, per deployment and per
+    IMAGE_MAX_DIMENSION/IMAGE_JPEG_QUALITY combination. `skipped_trivial_images` counts the course's images
+    the local pre-filter settled without a call, in the same window.
+    """
+    calls = AltTextGenerationCall.objects.filter(course_id=course_id)
+    skipped = ImageItem.objects.filter(course_id=course_id, processing_status=ImageItemStatus.SKIPPED)
+    if since is not None:
+        calls = calls.filter(created_at__gte=since)
+        skipped = skipped.filter(processed_at__gte=since)
+
+    total = _CallTotals()
+    by_deployment: Dict[str, _CallTotals] = defaultdict(_CallTotals)
+    by_image_settings: Dict[str, _CallTotals] = defaultdict(_CallTotals)
+    for call in calls.values(
+            'deployment', 'image_count', 'image_bytes', 'image_max_dimension', 'image_jpeg_quality', 'prompt_tokens',
+            'completion_tokens', 'latency_ms', 'wait_ms', 'retries', 'error').iterator():
+        total.add(call)
+        by_deployment[call['deployment']].add(call)
+        by_image_settings[f"{call['image_max_dimension']}px_q{call['image_jpeg_quality']}"].add(call)
+
+    return {
+        'course_id': course_id,
+        'since': since,
+        **total.as_dict(),
+        'skipped_trivial_images': skipped.count(),
+        'by_deployment': {name: totals.as_dict() for name, totals in by_deployment.items()},
+        'by_image_settings': {name: totals.as_dict() for name, totals in by_image_settings.items()},
+    }
@@ -1,14 +1,7 @@
-from collections.abc import Callable
+from collections.abc import Awaitable, Callable
 import logging
 import asyncio 
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
-from canvasapi import Canvas
-from canvasapi.course import Course
-from canvasapi.page import Page
-from canvasapi.assignment import Assignment
-from canvasapi.quiz import Quiz
-from canvasapi.quiz import QuizQuestion
-from canvasapi.exceptions import CanvasException
 from asgiref.sync import async_to_sync
 from django.db.utils import DatabaseError
 from typing import Any, Dict, List, Literal, NotRequired, TypedDict, Union
@@ -16,6 +9,8 @@ from bs4 import BeautifulSoup
 
 from django.conf import settings
 from backend.canvas_app_explorer.models import ImageItem, ContentItem
+from backend.canvas_app_explorer.canvas_lti_manager.exception import CanvasHTTPError
+from backend.canvas_app_explorer.alt_text_helper.canvas_async_client import AsyncCanvasCourse, CanvasAsyncClient
 
 logger = logging.getLogger(__name__)
 
@@ -34,16 +29,16 @@ class ContentPayload(TypedDict):
     content_parent_id: str | None
     content_type: Literal["assignment", "quiz", "page", "quiz_question"]
     images: List[ImagePayload]
-    
-PER_PAGE = 100
+
+# Canvas objects are the plain JSON dicts returned by CanvasAsyncClient
+CanvasObject = Dict[str, Any]
+
 class AltTextUpdate:
-    def __init__(self, course_id: int, canvas_api: Canvas, content_with_alt_text: List[Dict[str, Any]], content_types: List[str]) -> None:
-        self.course: Course = Course(canvas_api._Canvas__requester, {'id': course_id})
-        self.canvas_api = canvas_api
+    def __init__(self, course_id: int, canvas: CanvasAsyncClient, content_with_alt_text: List[Dict[str, Any]], content_types: List[str]) -> None:
+        self.course: AsyncCanvasCourse = AsyncCanvasCourse(canvas, course_id)
         self.content_with_alt_text: List[ContentPayload] = self._enrich_content_with_ui_urls(content_with_alt_text)
         self.content_alt_text_update_report: List[ContentPayload] = self.content_with_alt_text
         self.content_types: List[str] = content_types
-        self.semaphore = asyncio.Semaphore(10)
     
     def process_alt_text_update(self) -> bool|List[ContentPayload]:
         """
@@ -55,16 +50,10 @@ class AltTextUpdate:
 
         logger.info(f'self.content_with_alt_text: {self.content_with_alt_text}')
         try:
-            if "page" in self.content_types:
-                self._process_page()
-            elif "assignment" in self.content_types:
-                self._process_assignment()
-            elif quiz_types:
-                self._process_quiz_and_questions(quiz_types)
-            else: 
-                logger.warning("No valid content types found for alt text update")
+            async_to_sync(self._process_content_types)(quiz_types)
         except Exception as e:
             logger.error(f"Error processing alt text update for course ID {self.course.id}: {e}")
+        logger.info(f"Canvas rate limit counters for course {self.course.id}: {self.course.canvas.scheduler.counters.as_dict()}")
         
         # Check if there are any failures in the report
         # A failure is indicated by either is_alt_text_updated=False or alt_text_failed_error_message being set
@@ -78,8 +67,19 @@ class AltTextUpdate:
         
         return self.content_alt_text_update_report if has_failures else True
 
+    async def _process_content_types(self, quiz_types: List[str]) -> None:
+        # every Canvas fetch and edit of this update shares one pooled connection on this event loop
+        async with self.course.canvas:
+            if "page" in self.content_types:
+                await self._process_page()
+            elif "assignment" in self.content_types:
+                await self._process_assignment()
+            elif quiz_types:
+                await self._process_quiz_and_questions(quiz_types)
+            else: 
+                logger.warning("No valid content types found for alt text update")
 
-    def _process_page(self) -> None:
+    async def _process_page(self) -> None:
         logger.info("Processing page alt text update for course_id %s", self.course.id)
         approved_content = self._get_approved_content_ids()
         page_ids = {item["content_id"] for item in approved_content}
@@ -89,23 +89,23 @@ class AltTextUpdate:
             return
         
         try:
-            pages: Page = list(self.course.get_pages(include=['body'], per_page=PER_PAGE))
-        except (CanvasException, Exception) as e:
+            pages: List[CanvasObject] = [p async for p in self.course.get_pages()]
+        except (CanvasHTTPError, Exception) as e:
             logger.error(f"Failed to fetch pages for course ID {self.course.id}: {e}")
             # Mark all approved page images as failed due to fetch error
             page_errors = [{"content_id": pid, "error_message": str(e)} for pid in page_ids]
             self._mark_content_images_failed(page_errors, "page")
             raise e
         # this filters Content: pages from API call to only those with approved images content IDs. 
-        approved_pages: Page = [p for p in pages if getattr(p, "page_id", None) in page_ids]
-        page_alt_text_update_results = self._update_page_alt_text(approved_pages)
+        approved_pages: List[CanvasObject] = [p for p in pages if p.get("page_id") in page_ids]
+        page_alt_text_update_results = await self._update_page_alt_text(approved_pages)
         
         # Track failed pages by preparing error list with content_id and error message
         page_errors = []
         for page, result in zip(approved_pages, page_alt_text_update_results):
             if isinstance(result, Exception):
                 page_errors.append({
-                    "content_id": page.page_id,
+                    "content_id": page["page_id"],
                     "error_message": str(result)
                 })
         
@@ -114,7 +114,7 @@ class AltTextUpdate:
             self._mark_content_images_failed(page_errors, "page")
             raise Exception(f"Error updating page alt text for course ID {self.course.id}")
 
-    def _process_assignment(self) -> None:
+    async def _process_assignment(self) -> None:
         logger.info("Processing assignment alt text update for course_id %s", self.course.id)
         approved_content = self._get_approved_content_ids()
         assignment_ids = {item["content_id"] for item in approved_content}
@@ -125,8 +125,8 @@ class AltTextUpdate:
         
         # making api calls for fetching assignments
         try:
-            assignments: Assignment = list(self.course.get_assignments(per_page=PER_PAGE))
-        except (CanvasException, Exception) as e:
+            assignments: List[CanvasObject] = [a async for a in self.course.get_assignments()]
+        except (CanvasHTTPError, Exception) as e:
             logger.error(f"Failed to fetch assignments for course ID {self.course.id}: {e}")
             # Mark all approved assignment images as failed due to fetch error
             assignment_errors = [{"content_id": aid, "error_message": str(e)} for aid in assignment_ids]
@@ -134,15 +134,15 @@ class AltTextUpdate:
             raise e
         
         # this filters Content: assignments from API call to only those with approved images content IDs.
-        approved_assignment: Assignment = [a for a in assignments if a.id in assignment_ids]
-        assign_alt_text_update_results = self._update_assignment_alt_text(approved_assignment)
+        approved_assignment: List[CanvasObject] = [a for a in assignments if a["id"] in assignment_ids]
+        assign_alt_text_update_results = await self._update_assignment_alt_text(approved_assignment)
         
         # Track failed assignments by preparing error list with content_id and error message
         assignment_errors = []
         for assignment, result in zip(approved_assignment, assign_alt_text_update_results):
             if isinstance(result, Exception):
                 assignment_errors.append({
-                    "content_id": assignment.id,
+                    "content_id": assignment["id"],
                     "error_message": str(result)
                 })
         
@@ -151,7 +151,7 @@ class AltTextUpdate:
             self._mark_content_images_failed(assignment_errors, "assignment")
             raise Exception(f"Error updating assignment alt text for course ID {self.course.id}")
     
-    def _process_quiz_and_questions(self, quiz_types: List[str]) -> None:
+    async def _process_quiz_and_questions(self, quiz_types: List[str]) -> None:
         logger.info("Processing quiz alt text update for course_id %s with quiz types %s", self.course.id, quiz_types)
         approved_content = self._get_approved_content_ids()
         
@@ -163,8 +163,8 @@ class AltTextUpdate:
         if approved_quizzes:
             error_quizzes_fetch = False
             try: 
-                quizzes_result = list(self.course.get_quizzes(per_page=PER_PAGE))
-            except (CanvasException, Exception) as e:
+                quizzes_result = [q async for q in self.course.get_quizzes()]
+            except (CanvasHTTPError, Exception) as e:
                 logger.error(f"Failed to fetch quizzes : {e}")
                 # Mark all approved quiz images as failed due to fetch error
                 quiz_errors = [{"content_id": qid, "error_message": str(e)} for qid in approved_quizzes]
@@ -173,15 +173,15 @@ class AltTextUpdate:
 
             if not error_quizzes_fetch:
                 quizzes_to_update = self._filter_approved_quizzes_for_update(quizzes_result, approved_quizzes)
-                for q in quizzes_to_update: logger.info(f"Quiz to Update Id {q.id} Name: {q.title}")
-                quizzes_alt_text_update_results = self._update_quiz_alt_text(quizzes_to_update)
+                for q in quizzes_to_update: logger.info(f"Quiz to Update Id {q['id']} Name: {q.get('title')}")
+                quizzes_alt_text_update_results = await self._update_quiz_alt_text(quizzes_to_update)
                 
                 # Track failed quizzes by preparing error list with content_id and error message
                 quiz_errors = []
                 for quiz, result in zip(quizzes_to_update, quizzes_alt_text_update_results):
                     if isinstance(result, Exception):
                         quiz_errors.append({
-                            "content_id": quiz.id,
+                            "content_id": quiz["id"],
                             "error_message": str(result)
                         })
                 
@@ -194,7 +194,7 @@ class AltTextUpdate:
             approved_question_ids = {c['content_id'] for c in approved_quiz_questions}
             quiz_ids_list = [c['content_parent_id'] for c in approved_quiz_questions if c.get('content_parent_id')]
             
-            result_quiz_questions = self.get_quiz_questions(approved_quiz_questions)
+            result_quiz_questions = await self.get_quiz_questions(approved_quiz_questions)
             # Flatten the results using zip - result_quiz_questions is a list of lists or exceptions
             all_questions = []
             failed_quiz_batches = []
@@ -213,8 +213,8 @@ class AltTextUpdate:
                 questions_to_update = self._filter_approved_questions_for_update(all_questions, approved_question_ids)
                 
                 for q in questions_to_update:
-                    logger.info(f"Question Id {q.id} quiz id: {q.quiz_id}: Name: {q.question_name}")
-                questions_alt_text_update_results = self._update_quiz_question_alt_text(questions_to_update)
+                    logger.info(f"Question Id {q['id']} quiz id: {q['quiz_id']}: Name: {q.get('question_name')}")
+                questions_alt_text_update_results = await self._update_quiz_question_alt_text(questions_to_update)
                 
                 # Track failed questions by preparing error list with content_id and error message
                 question_errors = []
@@ -222,11 +222,11 @@ class AltTextUpdate:
                 for question, result in zip(questions_to_update, questions_alt_text_update_results):
                     if isinstance(result, Exception):
                         question_errors.append({
-                            "content_id": question.id,
+                            "content_id": question["id"],
                             "error_message": str(result)
                         })
                     else:
-                        question_successes.append(question.id)
+                        question_successes.append(question["id"])
                 
                 # Mark all failed and successful questions in report
                 if question_errors:
@@ -307,115 +307,95 @@ class AltTextUpdate:
 
     
     
-    def _filter_approved_quizzes_for_update(self, quizzes: List[Quiz], approved_quiz_ids: set) -> List[Quiz]:
-        return [q for q in quizzes if q.id in approved_quiz_ids]
+    def _filter_approved_quizzes_for_update(self, quizzes: List[CanvasObject], approved_quiz_ids: set) -> List[CanvasObject]:
+        return [q for q in quizzes if q['id'] in approved_quiz_ids]
 
-    def _filter_approved_questions_for_update(self, questions: List[QuizQuestion], approved_question_ids: set) -> List[QuizQuestion]:
-        return [q for q in questions if q.id in approved_question_ids]
+    def _filter_approved_questions_for_update(self, questions: List[CanvasObject], approved_question_ids: set) -> List[CanvasObject]:
+        return [q for q in questions if q['id'] in approved_question_ids]
     
         
     
-    @async_to_sync
-    async def get_quiz_questions(self, quiz_questions: List[dict]) -> None:
-        async with self.semaphore:
-            # Extract unique quiz IDs and fetch questions for each
-            quiz_ids = {c['content_parent_id'] for c in quiz_questions if c.get('content_parent_id')}
-            tasks = [
-                self.update_content_items_async(
-                    self._get_quiz_questions_sync, 
-                    Quiz(self.canvas_api._Canvas__requester, {'id': quiz_id, 'course_id': self.course.id})
-                )
-                for quiz_id in quiz_ids
-            ]
-            logger.info(f"Fetching quiz questions for quiz IDs: {len(quiz_ids)}")
-            return await asyncio.gather(*tasks, return_exceptions=True)
-    
-    def _get_quiz_questions_sync(self, quiz: Quiz) -> List[QuizQuestion]:
-        try:
-            return list(quiz.get_questions(per_page=PER_PAGE))
-        except (CanvasException, Exception) as e:
-            logger.error(f"Failed to fetch questions for quiz ID {quiz.id}: {e}")
-            raise e
+    async def get_quiz_questions(self, quiz_questions: List[dict]) -> List[Union[List[CanvasObject], Exception]]:
+        # Extract unique quiz IDs and fetch questions for each
+        quiz_ids = {c['content_parent_id'] for c in quiz_questions if c.get('content_parent_id')}
+        tasks = [
+            self.update_content_items_async(self._get_quiz_questions, quiz_id)
+            for quiz_id in quiz_ids
+        ]
+        logger.info(f"Fetching quiz questions for quiz IDs: {len(quiz_ids)}")
+        return await asyncio.gather(*tasks, return_exceptions=True)
     
-    def _get_quizzes_sync(self, course: Course) -> List[Quiz]:
+    async def _get_quiz_questions(self, quiz_id: int) -> List[CanvasObject]:
         try:
-            return list(course.get_quizzes(per_page=PER_PAGE))
-        except (CanvasException, Exception) as e:
-            logger.error(f"Failed to fetch quizzes for course ID {course.id}: {e}")
+            return [q async for q in self.course.get_quiz_questions(quiz_id)]
+        except (CanvasHTTPError, Exception) as e:
+            logger.error(f"Failed to fetch questions for quiz ID {quiz_id}: {e}")
             raise e
     
-    @async_to_sync
-    async def _update_quiz_alt_text(self, approved_quizzes: List[Quiz]) -> None:
-        async with self.semaphore:
-            quiz_update_tasks = [self.update_content_items_async(self._update_quiz_alt_text_sync, quiz) 
-                                 for quiz in approved_quizzes]
-            return await asyncio.gather(*quiz_update_tasks, return_exceptions=True)
+    async def _update_quiz_alt_text(self, approved_quizzes: List[CanvasObject]) -> List[Union[CanvasObject, Exception]]:
+        quiz_update_tasks = [self.update_content_items_async(self._edit_quiz, quiz) 
+                             for quiz in approved_quizzes]
+        return await asyncio.gather(*quiz_update_tasks, return_exceptions=True)
         
-    def _update_quiz_alt_text_sync(self, approved_quiz: Quiz) -> None:
+    async def _edit_quiz(self, approved_quiz: CanvasObject) -> CanvasObject:
         try:
-            updated_description = self._update_alt_text_html(approved_quiz.id, approved_quiz.description)
-            return approved_quiz.edit(quiz={'description': updated_description})
-        except (CanvasException, Exception) as e:
-            logger.error(f"Failed to update quiz ID {approved_quiz.id}: {e}")
+            updated_description = self._update_alt_text_html(approved_quiz['id'], approved_quiz.get('description') or '')
+            return await self.course.update_quiz(approved_quiz['id'], updated_description)
+        except (CanvasHTTPError, Exception) as e:
+            logger.error(f"Failed to update quiz ID {approved_quiz['id']}: {e}")
             raise e
         
-    @async_to_sync
-    async def _update_quiz_question_alt_text(self, approved_quiz_questions: List[QuizQuestion]) -> None:
-        async with self.semaphore:
-            question_update_tasks = [self.update_content_items_async(self._update_quiz_question_alt_text_sync, question) 
-                                     for question in approved_quiz_questions]
-            return await asyncio.gather(*question_update_tasks, return_exceptions=True)
+    async def _update_quiz_question_alt_text(self, approved_quiz_questions: List[CanvasObject]) -> List[Union[CanvasObject, Exception]]:
+        question_update_tasks = [self.update_content_items_async(self._edit_quiz_question, question) 
+                                 for question in approved_quiz_questions]
+        return await asyncio.gather(*question_update_tasks, return_exceptions=True)
     
-    def _update_quiz_question_alt_text_sync(self, approved_question: QuizQuestion) -> None:
+    async def _edit_quiz_question(self, approved_question: CanvasObject) -> CanvasObject:
         try:
-            updated_text = self._update_alt_text_html(approved_question.id, approved_question.question_text)
-            return approved_question.edit(question={'question_text': updated_text})
-        except (CanvasException, Exception) as e:
-            logger.error(f"Failed to update quiz question ID {approved_question.id}: {e}")
+            updated_text = self._update_alt_text_html(approved_question['id'], approved_question.get('question_text') or '')
+            return await self.course.update_quiz_question(approved_question['quiz_id'], approved_question['id'], updated_text)
+        except (CanvasHTTPError, Exception) as e:
+            logger.error(f"Failed to update quiz question ID {approved_question['id']}: {e}")
             raise e
         
-    @async_to_sync
-    async def _update_assignment_alt_text(self, approved_assignments: List[Assignment]) -> None:
-        async with self.semaphore:
-            assign_update_tasks = [self.update_content_items_async(self._update_assignment_alt_text_sync, assignment) 
-                                   for assignment in approved_assignments]
-            return await asyncio.gather(*assign_update_tasks, return_exceptions=True)
+    async def _update_assignment_alt_text(self, approved_assignments: List[CanvasObject]) -> List[Union[CanvasObject, Exception]]:
+        assign_update_tasks = [self.update_content_items_async(self._edit_assignment, assignment) 
+                               for assignment in approved_assignments]
+        return await asyncio.gather(*assign_update_tasks, return_exceptions=True)
     
 
-    def _update_assignment_alt_text_sync(self, approved_assignment: Assignment) -> None:
+    async def _edit_assignment(self, approved_assignment: CanvasObject) -> CanvasObject:
         try:
-            updated_description = self._update_alt_text_html(approved_assignment.id, approved_assignment.description)
-            return approved_assignment.edit(assignment={'description': updated_description})
-        except (CanvasException, Exception) as e:
-            logger.error(f"Failed to update assignment ID {approved_assignment.id}: {e}")
+            updated_description = self._update_alt_text_html(approved_assignment['id'], approved_assignment.get('description') or '')
+            return await self.course.update_assignment(approved_assignment['id'], updated_description)
+        except (CanvasHTTPError, Exception) as e:
+            logger.error(f"Failed to update assignment ID {approved_assignment['id']}: {e}")
             raise e
 
-    async def update_content_items_async[T, R](self, fn: Callable[[T], R], ctx: T) -> Union[R, Exception]:
+    async def update_content_items_async[T, R](self, fn: Callable[[T], Awaitable[R]], ctx: T) -> Union[R, Exception]:
         """
-        Generic async wrapper that runs the synchronous `fn(course|quiz)` in a thread and
-        returns a list (or empty list on error). `fn` should be a callable like
-        `get_assignments`, `get_pages`,  `get_quizzes`, `get_quiz_questions` that 
-        accepts a Course or Quiz and returns a list.
+        Generic async wrapper that awaits `fn(ctx)` on the current event loop and
+        returns its result, or the exception it raised. `fn` should be a coroutine
+        function like `_edit_page`, `_edit_assignment`, `_edit_quiz` or `_get_quiz_questions`.
         """
         try:
-            return await asyncio.to_thread(fn, ctx)
-        except (CanvasException, Exception) as e:
+            return await fn(ctx)
+        except (CanvasHTTPError, Exception) as e:
             logger.error("Error updating content items using %s: %s", getattr(fn, '__name__', str(fn)), e)
             return e
     
-    @async_to_sync
-    async def _update_page_alt_text(self, approved_pages: List[Page]) -> None:
-        async with self.semaphore:
-            page_update_tasks = [self.update_content_items_async(self._update_page_alt_text_sync, page) 
-                                 for page in approved_pages]
-            return await asyncio.gather(*page_update_tasks, return_exceptions=True)
+    async def _update_page_alt_text(self, approved_pages: List[CanvasObject]) -> List[Union[CanvasObject, Exception]]:
+        page_update_tasks = [self.update_content_items_async(self._edit_page, page) 
+                             for page in approved_pages]
+        return await asyncio.gather(*page_update_tasks, return_exceptions=True)
     
-    def _update_page_alt_text_sync(self, page: Page) -> None:
+    async def _edit_page(self, page: CanvasObject) -> CanvasObject:
         try:
-            updated_body = self._update_alt_text_html(page.page_id, page.body)
-            return page.edit(wiki_page={'body': updated_body})
-        except (CanvasException, Exception) as e:
-            logger.error(f"Failed to update page ID {page.page_id}: {e}")
+            updated_body = self._update_alt_text_html(page['page_id'], page.get('body') or '')
+            # pages are addressed by their url slug in the Canvas pages API
+            return await self.course.update_page(page['url'], updated_body)
+        except (CanvasHTTPError, Exception) as e:
+            logger.error(f"Failed to update page ID {page['page_id']}: {e}")
             raise e
 
     
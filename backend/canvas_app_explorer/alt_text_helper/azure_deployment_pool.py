@@ -0,0 +1,260 @@
+import json
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from constance import config
+from openai import APIConnectionError, InternalServerError, RateLimitError
+
+from backend.canvas_app_explorer.alt_text_helper.azure_rate_limiter import AzureOpenAIRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# errors of the deployment rather than the request, the call is retried on another deployment
+FAILOVER_ERRORS = (APIConnectionError, InternalServerError, RateLimitError)
+# consecutive failures after which a deployment is ejected
+DEPLOYMENT_EJECT_AFTER_ERRORS = 3
+# an ejected deployment gets traffic again after this long, doubled for every ejection in a row
+DEPLOYMENT_EJECT_SECONDS = 30.0
+DEPLOYMENT_MAX_EJECT_SECONDS = 300.0
+# weight of the latest call in the latency moving average
+DEPLOYMENT_LATENCY_SMOOTHING = 0.3
+# successful call latencies the hedging delay is taken from, and how many are needed before calls are hedged
+HEDGE_LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+_shared_pool: Optional['AzureDeploymentPool'] = None
+
+
+@dataclass
+class AzureDeployment:
+    name: str
+    api_base: str
+    api_key: str
+    api_version: str
+    model: str
+    organization: Optional[str] = None
+    weight: float = 1.0
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+
+
+@dataclass
+class DeploymentStats:
+    requests: int = 0
+    errors: int = 0
+    consecutive_errors: int = 0
+    ejections: int = 0
+    latency_ewma_seconds: Optional[float] = None
+    max_latency_seconds: float = 0.0
+    last_error: Optional[str] = None
+    # duplicates of slow calls sent to this deployment, and how many of them answered first
+    hedged_requests: int = 0
+    hedge_wins: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class PooledDeployment:
+    """A deployment of the pool with its rate limiter and health."""
+    deployment: AzureDeployment
+    rate_limiter: AzureOpenAIRateLimiter
+    stats: DeploymentStats = field(default_factory=DeploymentStats)
+    ejected_until: float = 0.0
+    # ejections in a row without a successful call in between
+    ejection_streak: int = 0
+
+    @property
+    def name(self) -> str:
+        return self.deployment.name
+
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def score(self) -> float:
+        """Weighted remaining quota, shared by the calls in flight."""
+        return self.deployment.weight * self.rate_limiter.headroom() / (1 + self.rate_limiter.in_flight)
+
+
+class AzureDeploymentPool:
+    """
+    The Azure OpenAI deployments alt text can be generated with: the AZURE_API_BASE/AZURE_MODEL deployment
+    followed by those listed in AZURE_EXTRA_DEPLOYMENTS.
+
+    `choose` picks the healthy deployment with the most weighted remaining quota. A deployment is ejected
+    for a while after DEPLOYMENT_EJECT_AFTER_ERRORS consecutive failures, or when its latency average goes
+    above AZURE_DEPLOYMENT_EJECT_LATENCY_SECONDS; when every deployment is ejected the one coming back first
+    is used. `stats` reports requests, errors and latency per deployment.
+
+    `hedge_delay` is the AZURE_HEDGE_PERCENTILE latency of the pool's recent successful calls, after which
+    a call still waiting for its answer gets a duplicate.
+
+    Scans use the pool shared by the process from `get_deployment_pool`, so health, ejections and latencies
+    carry over from one scan to the next.
+    """
+
+    def __init__(self, deployments: List[AzureDeployment], store=None) -> None:
+        self.deployments = [
+            PooledDeployment(
+                deployment,
+                AzureOpenAIRateLimiter(
+                    deployment.model,
+                    store=store,
+                    api_base=deployment.api_base,
+                    requests_per_minute=deployment.requests_per_minute,
+                    tokens_per_minute=deployment.tokens_per_minute,
+                ),
+            )
+            for deployment in deployments
+        ]
+        self.recent_latencies: Deque[float] = deque(maxlen=HEDGE_LATENCY_WINDOW)
+
+    @classmethod
+    def from_config(cls, store=None) -> 'AzureDeploymentPool':
+        """Build the pool from constance settings, see `deployments_from_config`."""
+        return cls(deployments_from_config(), store=store)
+
+    def choose(self, exclude: Set[str]) -> Optional[PooledDeployment]:
+        """The deployment for the next call, skipping the names in `exclude`. None once every deployment was tried."""
+        candidates = [d for d in self.deployments if d.name not in exclude and d.deployment.weight > 0]
+        if not candidates:
+            return None
+        now = time.monotonic()
+        healthy = [d for d in candidates if d.is_healthy(now)]
+        if not healthy:
+            return min(candidates, key=lambda d: d.ejected_until)
+        # max() keeps the first of equal scores, so the primary deployment wins ties
+        return max(healthy, key=lambda d: d.score())
+
+    def model_signature(self) -> str:
+        """
+        The distinct models of the deployments that can answer calls, sorted and joined with '+'. Alt text is
+        cached under it, so entries are only reused while the models that may have generated them are unchanged.
+        A pool of one model gives that model's name.
+        """
+        models = {d.deployment.model for d in self.deployments if d.deployment.weight > 0}
+        return '+'.join(sorted(models)) or self.deployments[0].deployment.model
+
+    def record_success(self, pooled: PooledDeployment, latency: float) -> None:
+        stats = pooled.stats
+        stats.requests += 1
+        stats.consecutive_errors = 0
+        self._record_latency(stats, latency)
+        self.recent_latencies.append(latency)
+        if stats.latency_ewma_seconds > config.AZURE_DEPLOYMENT_EJECT_LATENCY_SECONDS:
+            self._eject(pooled, f"latency average {stats.latency_ewma_seconds:.1f}s")
+            # start over once it is back, so one slow period doesn't eject it again right away
+            stats.latency_ewma_seconds = None
+        else:
+            pooled.ejection_streak = 0
+
+    def record_failure(self, pooled: PooledDeployment, error: Exception, latency: float) -> None:
+        stats = pooled.stats
+        stats.requests += 1
+        stats.errors += 1
+        stats.consecutive_errors += 1
+        stats.last_error = f"{type(error).__name__}: {error}"
+        self._record_latency(stats, latency)
+        if stats.consecutive_errors >= DEPLOYMENT_EJECT_AFTER_ERRORS:
+            self._eject(pooled, stats.last_error)
+            stats.consecutive_errors = 0
+
+    def record_hedge(self, pooled: PooledDeployment) -> None:
+        pooled.stats.hedged_requests += 1
+
+    def record_hedge_win(self, pooled: PooledDeployment) -> None:
+        pooled.stats.hedge_wins += 1
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds after which a call is hedged, None while fewer than HEDGE_MIN_SAMPLES calls succeeded."""
+        if len(self.recent_latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.recent_latencies)
+        rank = math.ceil(config.AZURE_HEDGE_PERCENTILE / 100 * len(ordered))
+        return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        return {
+            d.name: {**d.stats.as_dict(), 'healthy': d.is_healthy(now), 'rate_limit': d.rate_limiter.counters.as_dict()}
+            for d in self.deployments
+        }
+
+    @staticmethod
+    def _record_latency(stats: DeploymentStats, latency: float) -> None:
+        stats.max_latency_seconds = max(stats.max_latency_seconds, latency)
+        if stats.latency_ewma_seconds is None:
+            stats.latency_ewma_seconds = latency
+        else:
+            stats.latency_ewma_seconds += DEPLOYMENT_LATENCY_SMOOTHING * (latency - stats.latency_ewma_seconds)
+
+    @staticmethod
+    def _eject(pooled: PooledDeployment, reason: str) -> None:
+        pooled.ejection_streak += 1
+        pooled.stats.ejections += 1
+        seconds = min(DEPLOYMENT_EJECT_SECONDS * 2 ** (pooled.ejection_streak - 1), DEPLOYMENT_MAX_EJECT_SECONDS)
+        pooled.ejected_until = time.monotonic() + seconds
+        logger.warning(f"Ejecting Azure OpenAI deployment {pooled.name} for {seconds:.0f}s: {reason}")
+
+
+def deployments_from_config() -> List[AzureDeployment]:
+    """
+    The AZURE_API_BASE/AZURE_MODEL deployment followed by AZURE_EXTRA_DEPLOYMENTS, a JSON list of objects with
+    `api_base` and `model`, and optionally `name`, `api_key`, `api_version`, `organization`, `weight`,
+    `requests_per_minute` and `tokens_per_minute`; missing values are taken from the AZURE_* settings.
+    """
+    primary = AzureDeployment(
+        name='primary',
+        api_base=config.AZURE_API_BASE,
+        api_key=config.AZURE_API_KEY,
+        api_version=config.AZURE_API_VERSION,
+        model=config.AZURE_MODEL,
+        organization=config.AZURE_ORGANIZATION,
+    )
+    deployments = [primary]
+    try:
+        extra = json.loads(config.AZURE_EXTRA_DEPLOYMENTS or '[]')
+    except ValueError as e:
+        logger.error(f"AZURE_EXTRA_DEPLOYMENTS is not valid JSON, using only the primary deployment: {e}")
+        extra = []
+    for i, entry in enumerate(extra):
+        try:
+            deployments.append(AzureDeployment(
+                name=entry.get('name') or f"{entry['api_base']}:{entry['model']}",
+                api_base=entry['api_base'],
+                api_key=entry.get('api_key', primary.api_key),
+                api_version=entry.get('api_version', primary.api_version),
+                model=entry['model'],
+                organization=entry.get('organization', primary.organization),
+                weight=float(entry.get('weight', 1.0)),
+                requests_per_minute=entry.get('requests_per_minute'),
+                tokens_per_minute=entry.get('tokens_per_minute'),
+            ))
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            logger.error(f"Skipping AZURE_EXTRA_DEPLOYMENTS entry {i}: {e}")
+    return deployments
+
+
+def get_deployment_pool() -> AzureDeploymentPool:
+    """
+    Deployment pool shared by every alt text processor in this process, rebuilt when the deployment settings change.
+
+    Ejected deployments stay ejected and hedging keeps its latency window across scans, instead of every scan
+    rediscovering a failing deployment and waiting for HEDGE_MIN_SAMPLES calls again.
+    """
+    global _shared_pool
+    deployments = deployments_from_config()
+    if _shared_pool is None or [pooled.deployment for pooled in _shared_pool.deployments] != deployments:
+        _shared_pool = AzureDeploymentPool(deployments)
+    return _shared_pool
+
+
+def reset_deployment_pool() -> None:
+    """Discard the shared pool and the health it collected, e.g. between tests."""
+    global _shared_pool
+    _shared_pool = None
@@ -0,0 +1,355 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Dict, Mapping, Optional, Tuple
+
+from constance import config
+from django.conf import settings
+from openai import RateLimitError
+
+logger = logging.getLogger(__name__)
+
+# a request or token bucket refills its whole per-minute capacity over this many seconds
+BUDGET_WINDOW_SECONDS = 60.0
+# idle budgets are dropped from Redis after this long, they are full again by then anyway
+BUDGET_KEY_TTL_SECONDS = 120
+# tokens reserved per call before the real usage is known: a high detail image costs a base amount plus
+# an amount per 512px tile, the answer is assumed to be at most COMPLETION_TOKEN_ESTIMATE
+IMAGE_BASE_TOKENS = 85
+IMAGE_TILE_TOKENS = 170
+IMAGE_TILE_SIZE = 512
+COMPLETION_TOKEN_ESTIMATE = 300
+AZURE_RATE_LIMIT_MIN_CONCURRENCY = 1
+AZURE_RATE_LIMIT_INITIAL_CONCURRENCY = 2
+# concurrency only grows while both remaining quotas are above this share of the per-minute limits
+AZURE_RATE_LIMIT_HEADROOM = 0.2
+AZURE_RATE_LIMIT_BACKOFF_SECONDS = 2.0
+AZURE_RATE_LIMIT_MAX_BACKOFF_SECONDS = 60.0
+
+# Refills both buckets by the time since the last update, lowers them to the quota Azure reported remaining,
+# then takes the request and tokens, or returns how long to wait until they are available. Redis' own clock
+# is used so every worker host sees the same budget.
+TAKE_FROM_BUDGET_SCRIPT = """
+local rpm, tpm = tonumber(ARGV[1]), tonumber(ARGV[2])
+local take_requests, take_tokens = tonumber(ARGV[3]), tonumber(ARGV[4])
+local force = ARGV[5] == '1'
+local remaining_requests, remaining_tokens = tonumber(ARGV[6]), tonumber(ARGV[7])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'updated')
+local requests = tonumber(state[1]) or rpm
+local tokens = tonumber(state[2]) or tpm
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+requests = math.min(rpm, requests + elapsed * rpm / 60)
+tokens = math.min(tpm, tokens + elapsed * tpm / 60)
+if remaining_requests >= 0 then requests = math.min(requests, remaining_requests) end
+if remaining_tokens >= 0 then tokens = math.min(tokens, remaining_tokens) end
+local wait = 0
+if not force then
+    if take_requests > requests then wait = math.max(wait, (take_requests - requests) * 60 / rpm) end
+    if take_tokens > tokens then wait = math.max(wait, (take_tokens - tokens) * 60 / tpm) end
+end
+if wait == 0 then
+    requests = math.min(rpm, requests - take_requests)
+    tokens = math.min(tpm, tokens - take_tokens)
+end
+redis.call('HSET', KEYS[1], 'requests', requests, 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], ARGV[8])
+return tostring(wait)
+"""
+
+
+@dataclass
+class AzureRateLimitCounters:
+    calls: int = 0
+    throttled_responses: int = 0
+    waits: int = 0
+    seconds_waited: float = 0.0
+    concurrency_decreases: int = 0
+    concurrency_increases: int = 0
+    tokens_used: int = 0
+    last_remaining_requests: Optional[int] = None
+    last_remaining_tokens: Optional[int] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class BudgetReservation:
+    """Tokens one call took from the budget, corrected by `AzureOpenAIRateLimiter.record_response`."""
+    tokens: int = 0
+
+
+def _header_int(headers: Mapping[str, str], name: str) -> Optional[int]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
+
+
+class RedisBudgetStore:
+    """Request and token buckets of each budget key, kept in the Redis of CACHES['default'] and updated atomically."""
+
+    def __init__(self, alias: str = 'default') -> None:
+        self.alias = alias
+        self._script = None
+
+    def take(
+            self,
+            key: str,
+            rpm: int,
+            tpm: int,
+            requests: float,
+            tokens: float,
+            force: bool = False,
+            remaining_requests: Optional[int] = None,
+            remaining_tokens: Optional[int] = None) -> float:
+        """
+        Take `requests` and `tokens` from the budget. Returns 0 when taken, otherwise the seconds until they
+        are available and nothing is taken. `force` takes them regardless (negative amounts give tokens back),
+        the remaining quota reported by Azure lowers the buckets first.
+        """
+        if self._script is None:
+            # imported here so deployments without django_redis can use the local store
+            from django_redis import get_redis_connection
+            self._script = get_redis_connection(self.alias).register_script(TAKE_FROM_BUDGET_SCRIPT)
+        wait = self._script(keys=[key], args=[
+            rpm, tpm, requests, tokens, int(force),
+            -1 if remaining_requests is None else remaining_requests,
+            -1 if remaining_tokens is None else remaining_tokens,
+            BUDGET_KEY_TTL_SECONDS,
+        ])
+        return float(wait)
+
+
+class LocalBudgetStore:
+    """
+    In-process stand-in for RedisBudgetStore with the same bucket arithmetic, for tests and deployments
+    without Redis. The budget is then only shared by the scans of one worker process.
+    """
+
+    def __init__(self) -> None:
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(
+            self,
+            key: str,
+            rpm: int,
+            tpm: int,
+            requests: float,
+            tokens: float,
+            force: bool = False,
+            remaining_requests: Optional[int] = None,
+            remaining_tokens: Optional[int] = None) -> float:
+        with self._lock:
+            now = time.monotonic()
+            available_requests, available_tokens, updated = self._buckets.get(key, (rpm, tpm, now))
+            elapsed = max(0.0, now - updated)
+            available_requests = min(rpm, available_requests + elapsed * rpm / BUDGET_WINDOW_SECONDS)
+            available_tokens = min(tpm, available_tokens + elapsed * tpm / BUDGET_WINDOW_SECONDS)
+            if remaining_requests is not None:
+                available_requests = min(available_requests, remaining_requests)
+            if remaining_tokens is not None:
+                available_tokens = min(available_tokens, remaining_tokens)
+            wait = 0.0
+            if not force:
+                if requests > available_requests:
+                    wait = max(wait, (requests - available_requests) * BUDGET_WINDOW_SECONDS / rpm)
+                if tokens > available_tokens:
+                    wait = max(wait, (tokens - available_tokens) * BUDGET_WINDOW_SECONDS / tpm)
+            if wait == 0:
+                available_requests = min(rpm, available_requests - requests)
+                available_tokens = min(tpm, available_tokens - tokens)
+            self._buckets[key] = (available_requests, available_tokens, now)
+            return wait
+
+
+_local_budget_store = LocalBudgetStore()
+
+
+def default_budget_store():
+    """The Redis store shared by every Q worker, or the process-wide local one when AZURE_RATE_LIMIT_BACKEND is 'local'."""
+    if settings.AZURE_RATE_LIMIT_BACKEND == 'local':
+        return _local_budget_store
+    return RedisBudgetStore()
+
+
+def estimate_tokens(image_count: int) -> int:
+    """Tokens a request for `image_count` images is expected to use: the prompt, the images and their answers."""
+    tiles = math.ceil(config.IMAGE_MAX_DIMENSION / IMAGE_TILE_SIZE) ** 2
+    image_tokens = IMAGE_BASE_TOKENS + IMAGE_TILE_TOKENS * tiles
+    return len(config.AZURE_ALT_TEXT_PROMPT) // 4 + image_count * (image_tokens + COMPLETION_TOKEN_ESTIMATE)
+
+
+class AzureOpenAIRateLimiter:
+    """
+    Admits Azure OpenAI calls against the deployment's requests- and tokens-per-minute limits
+    (AZURE_REQUESTS_PER_MINUTE, AZURE_TOKENS_PER_MINUTE), kept as token buckets in a store shared by every
+    Q worker. Each call takes one request and its estimated tokens, waiting until the budget has them;
+    afterwards the estimate is corrected with the real usage and the buckets are lowered to the
+    x-ratelimit-remaining-* quota Azure reported.
+
+    Concurrency within the process is additive-increase/multiplicative-decrease: it grows by one after a
+    response with quota to spare, up to AZURE_MAX_CONNECTIONS, and is halved, with a pause, when Azure
+    answers 429. A limit of 0 turns the corresponding bucket off. Deployments of a pool pass their own
+    `api_base` and limits.
+    """
+
+    def __init__(
+            self,
+            deployment: str,
+            store=None,
+            api_base: Optional[str] = None,
+            requests_per_minute: Optional[int] = None,
+            tokens_per_minute: Optional[int] = None,
+            initial_concurrency: int = AZURE_RATE_LIMIT_INITIAL_CONCURRENCY,
+            min_concurrency: int = AZURE_RATE_LIMIT_MIN_CONCURRENCY,
+            max_concurrency: Optional[int] = None,
+            backoff_seconds: float = AZURE_RATE_LIMIT_BACKOFF_SECONDS) -> None:
+        self.key = f'azure-openai-budget:{api_base or config.AZURE_API_BASE}:{deployment}'
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.store = store or default_budget_store()
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max(min_concurrency, max_concurrency or config.AZURE_MAX_CONNECTIONS)
+        self.concurrency_limit = max(min_concurrency, min(initial_concurrency, self.max_concurrency))
+        self.backoff_seconds = backoff_seconds
+        self.counters = AzureRateLimitCounters()
+        self._in_flight = 0
+        self._throttle_streak = 0
+        self._resume_at = 0.0
+        # created on first use, and again for each new event loop, so it binds to the loop making the calls
+        self._condition: Optional[asyncio.Condition] = None
+        self._condition_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int) -> AsyncIterator[BudgetReservation]:
+        """
+        Wait for a concurrency slot and for one request and `estimated_tokens` in the shared budget.
+        The response of the call must be passed to `record_response` with the yielded reservation inside
+        the slot; a 429 raised inside it is recorded before it propagates.
+        """
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._condition_loop is not loop:
+            self._condition = asyncio.Condition()
+            self._condition_loop = loop
+        condition = self._condition
+        async with condition:
+            await condition.wait_for(lambda: self._in_flight < self.concurrency_limit)
+            self._in_flight += 1
+        try:
+            delay = self._resume_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            reservation = BudgetReservation(await self._take_budget(estimated_tokens))
+            self.counters.calls += 1
+            try:
+                yield reservation
+            except RateLimitError as e:
+                self._record_throttled(e.response.headers)
+                raise
+        finally:
+            async with condition:
+                self._in_flight -= 1
+                condition.notify_all()
+
+    async def _take_budget(self, tokens: int) -> int:
+        rpm, tpm = self._limits()
+        if not rpm and not tpm:
+            return 0
+        # a single call never needs more than the whole bucket, otherwise it would wait forever
+        tokens = min(tokens, tpm) if tpm else 0
+        while True:
+            wait = await self._store_take(1 if rpm else 0, tokens)
+            if wait <= 0:
+                return tokens
+            self.counters.waits += 1
+            self.counters.seconds_waited += wait
+            logger.debug(f"Azure OpenAI budget {self.key} exhausted, waiting {wait:.2f}s")
+            await asyncio.sleep(wait)
+
+    def _limits(self) -> Tuple[int, int]:
+        rpm = config.AZURE_REQUESTS_PER_MINUTE if self.requests_per_minute is None else self.requests_per_minute
+        tpm = config.AZURE_TOKENS_PER_MINUTE if self.tokens_per_minute is None else self.tokens_per_minute
+        return max(0, rpm), max(0, tpm)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def headroom(self) -> float:
+        """Share of the per-minute limits Azure last reported remaining, the scarcer of requests and tokens (1.0 when unknown)."""
+        rpm, tpm = self._limits()
+        shares = [1.0]
+        if rpm and self.counters.last_remaining_requests is not None:
+            shares.append(self.counters.last_remaining_requests / rpm)
+        if tpm and self.counters.last_remaining_tokens is not None:
+            shares.append(self.counters.last_remaining_tokens / tpm)
+        return max(0.0, min(shares))
+
+    async def _store_take(self, requests: float, tokens: float, force: bool = False,
+                          remaining_requests: Optional[int] = None, remaining_tokens: Optional[int] = None) -> float:
+        rpm, tpm = self._limits()
+        try:
+            # a disabled bucket gets a capacity nothing is ever taken from
+            return await asyncio.to_thread(
+                self.store.take, self.key, rpm or 1, tpm or 1, requests if rpm else 0, tokens if tpm else 0, force,
+                remaining_requests if rpm else None, remaining_tokens if tpm else None,
+            )
+        except Exception as e:
+            # an unreachable budget must not stop scans, the process keeps a budget of its own until it is back
+            if self.store is _local_budget_store:
+                raise
+            logger.warning(f"Shared Azure OpenAI budget unavailable, using a per-process budget: {e}")
+            self.store = _local_budget_store
+            return await self._store_take(requests, tokens, force, remaining_requests, remaining_tokens)
+
+    async def record_response(
+            self, reservation: BudgetReservation, headers: Mapping[str, str], total_tokens: Optional[int]) -> None:
+        """Correct the token reservation with the real usage, sync the budget with Azure's remaining quota and grow concurrency."""
+        remaining_requests = _header_int(headers, 'x-ratelimit-remaining-requests')
+        remaining_tokens = _header_int(headers, 'x-ratelimit-remaining-tokens')
+        self.counters.last_remaining_requests = remaining_requests
+        self.counters.last_remaining_tokens = remaining_tokens
+        correction = 0
+        if total_tokens is not None:
+            self.counters.tokens_used += total_tokens
+            correction = total_tokens - reservation.tokens
+        if correction or remaining_requests is not None or remaining_tokens is not None:
+            await self._store_take(0, correction, True, remaining_requests, remaining_tokens)
+
+        self._throttle_streak = 0
+        rpm, tpm = self._limits()
+        if (
+            (not rpm or remaining_requests is None or remaining_requests > rpm * AZURE_RATE_LIMIT_HEADROOM)
+            and (not tpm or remaining_tokens is None or remaining_tokens > tpm * AZURE_RATE_LIMIT_HEADROOM)
+        ):
+            self._set_limit(self.concurrency_limit + 1)
+
+    def _record_throttled(self, headers: Mapping[str, str]) -> None:
+        self.counters.throttled_responses += 1
+        self._throttle_streak += 1
+        self._set_limit(self.concurrency_limit // 2)
+        retry_after = _header_int(headers, 'retry-after')
+        pause = retry_after if retry_after is not None else min(
+            self.backoff_seconds * 2 ** (self._throttle_streak - 1), AZURE_RATE_LIMIT_MAX_BACKOFF_SECONDS
+        )
+        self._resume_at = max(self._resume_at, asyncio.get_running_loop().time() + pause)
+        logger.warning(f"Azure OpenAI rate limit exceeded, pausing {pause:.1f}s with concurrency {self.concurrency_limit}")
+
+    def _set_limit(self, limit: int) -> None:
+        limit = max(self.min_concurrency, min(limit, self.max_concurrency))
+        if limit < self.concurrency_limit:
+            self.counters.concurrency_decreases += 1
+        elif limit > self.concurrency_limit:
+            self.counters.concurrency_increases += 1
+        self.concurrency_limit = limit
@@ -1,29 +1,39 @@
 import asyncio
+import hashlib
 import logging
-from django.db import transaction
+from collections import defaultdict
+from html.parser import HTMLParser
+from datetime import datetime, timedelta
+from django.db import connection, transaction
+from django.utils import timezone
 from urllib.parse import urlparse, parse_qs, urlencode
-from typing import List, Dict, Any, Optional, TypeVar, Callable, Union
-from asgiref.sync import async_to_sync
+from typing import Awaitable, Iterator, List, Dict, Any, Optional, Tuple, TypeVar, Callable, Union
+from constance import config
+from asgiref.sync import async_to_sync, sync_to_async
 from django.test import RequestFactory
 from django.contrib.auth.models import User
 from django.contrib.auth import get_user_model
 from django.contrib.sessions.backends.db import SessionStore
+from django.db.models import Min
 from django.db.utils import DatabaseError
-from bs4 import BeautifulSoup
+from django_q.models import Schedule
+from django_q.tasks import schedule
 from PIL import Image
 from rest_framework.request import Request
-from canvasapi.exceptions import CanvasException
-from canvasapi.course import Course
-from canvasapi.quiz import Quiz
-from canvasapi import Canvas
 from canvas_oauth.exceptions import InvalidOAuthReturnError
 from canvas_oauth.models import CanvasOAuth2Token
 
 from backend import settings
 from backend.canvas_app_explorer.canvas_lti_manager.django_factory import DjangoCourseLtiManagerFactory
-from backend.canvas_app_explorer.canvas_lti_manager.exception import ImageContentExtractionException
-from backend.canvas_app_explorer.models import CourseScan, ContentItem, ImageItem, CourseScanStatus
-from backend.canvas_app_explorer.alt_text_helper.process_content_images import ProcessContentImages
+from backend.canvas_app_explorer.canvas_lti_manager.exception import CanvasHTTPError, ImageContentExtractionException
+from backend.canvas_app_explorer.models import AltTextBatchJob, CourseScan, ContentItem, ImageItem, ImageItemStatus, CourseScanStatus
+from backend.canvas_app_explorer.alt_text_helper.canvas_async_client import (
+    AsyncCanvasCourse, CanvasAsyncClient, parse_canvas_datetime
+)
+from backend.canvas_app_explorer.alt_text_helper.alt_text_batch import AltTextBatch
+from backend.canvas_app_explorer.alt_text_helper.process_content_images import (
+    ProcessContentImages, course_scan_deadline, retryable_failed_images
+)
 from backend.canvas_app_explorer.decorators import log_execution_time
 
 logger = logging.getLogger(__name__)
@@ -31,9 +41,21 @@ T = TypeVar("T")
 R = TypeVar("R")
 
 MANAGER_FACTORY = DjangoCourseLtiManagerFactory(f'https://{settings.CANVAS_OAUTH_CANVAS_DOMAIN}')
-PER_PAGE = 100
 IMAGE_EXTENSIONS = tuple(Image.registered_extensions().keys())
-semaphore = asyncio.Semaphore(10)
+
+# Max rows per INSERT/DELETE statement when saving scan results
+SCAN_RESULTS_BATCH_SIZE = 500
+# ContentItem columns refreshed from Canvas on every scan
+CONTENT_ITEM_SCAN_FIELDS = ['course', 'content_type', 'content_name', 'content_parent_id', 'content_updated_at', 'content_hash']
+
+# Bounded queues between the streaming scan stages, producers block when a stage falls behind
+CONTENT_QUEUE_MAXSIZE = 100
+IMAGE_QUEUE_MAXSIZE_PER_WORKER = 4
+
+# (content_type, content_id) -> (content_updated_at, content_hash) from the previous scan
+ContentWatermarks = Dict[Tuple[str, int], Tuple[Optional[datetime], Optional[str]]]
+# Awaited with each content item as soon as it's scanned
+ContentCallback = Callable[[Dict[str, Any]], Awaitable[None]]
 
 
 
@@ -42,52 +64,204 @@ def fetch_and_scan_course(task: Dict[str, Any]):
     logger.info(f"Starting fetch_and_scan_course for course_id: {task.get('course_id')}")
       # mark CourseScan as running (create if missing)
     course_id = int(task.get('course_id'))
+    # incremental scans only re-parse content whose Canvas watermark moved since the last scan
+    incremental = bool(task.get('incremental', config.INCREMENTAL_COURSE_SCAN))
+    # alt text generation stops here, in time to save what is done before the Q_CLUSTER timeout kills the task
+    deadline = course_scan_deadline()
 
     # adding a status before start of the scan, if this DB action failed no need to stop next steps of fetching content images
     update_course_scan(course_id, CourseScanStatus.RUNNING.value)
 
     # Fetch course content using the manager
-    user_id = task.get('user_id')
-    req_user: User = get_user_model().objects.get(pk=user_id)
-    canvas_callback_url = task.get('canvas_callback_url')
-    request = _create_background_request(req_user, canvas_callback_url, course_id)
-    
-    try:
-        manager = MANAGER_FACTORY.create_manager(request)
-        canvas_api: Canvas = manager.canvas_api
-        bearer_token = manager.api_key
-    except (InvalidOAuthReturnError, Exception) as e:
-        logger.error(f"Error creating Canvas API for course_id {course_id}: {e}")
-        CanvasOAuth2Token.objects.filter(user=request.user).delete()
+    manager = _create_task_manager(task, course_id)
+    if manager is None:
         update_course_scan(course_id, CourseScanStatus.FAILED.value)
         return
+    bearer_token = manager.api_key
 
-    # Fetch full course details to ensure attributes like course_code are present for logging
-    course: Course = Course(canvas_api._Canvas__requester, {'id': course_id})
+    course = AsyncCanvasCourse(CanvasAsyncClient(manager.api_url, bearer_token), course_id)
 
-    results = async_to_sync(get_courses_images)(course)
-    state_of_content_fetch: bool = unpack_and_store_content_images(results, course)
-
-    # this check is helping not to move to alt text retrieval if there was an error in fetching content images
-    if not state_of_content_fetch:
-        logger.error(f"Failed to fetch content images for course_id {course_id}. Marking scan as FAILED.")
+    watermarks = load_content_watermarks(course_id) if incremental else None
+    if config.AZURE_BATCH_MODE:
+        # alt text comes from an Azure OpenAI batch job, `poll_alt_text_batch` finishes the scan
+        batch_scan_course_images(course, bearer_token, watermarks, incremental, task)
         return
-    
+    # streaming scans start on images while Canvas content is still being paginated
+    scan_and_store = stream_and_store_course_images if config.STREAMING_COURSE_SCAN else scan_and_store_course_images
+
+    images_failed = False
     try:
-        retrieve_and_store_alt_text(course, bearer_token=bearer_token)
+        state_of_content_fetch: bool = scan_and_store(course, bearer_token, watermarks, incremental, deadline)
     except ImageContentExtractionException as e:
+        # the images that failed are recorded on their ImageItem and retried on their own, not with a rescan
         logger.error(
             f"ImageContentExtractionException while processing alt text for course_id {course_id}: {e}",
             exc_info=True
         )
-        update_course_scan(course_id, CourseScanStatus.FAILED.value)
+        state_of_content_fetch = True
+        images_failed = True
+
+    if not state_of_content_fetch:
+        logger.error(f"Failed to fetch content images for course_id {course_id}. Marking scan as FAILED.")
         return
 
-    # Update that the course scan is completed
-    update_course_scan(course_id, CourseScanStatus.COMPLETED.value)
+    # Update that the course scan is completed, with errors if some images failed
+    finish_course_scan(course_id, task, images_failed)
 
+@log_execution_time
+def retry_failed_course_images(task: Dict[str, Any]):
+    """
+    Generate alt text again for only the FAILED images of a course scan, without rescanning the course.
+    Scheduled by `finish_course_scan` after IMAGE_RETRY_BACKOFF_SECONDS, or started right away (`respect_backoff`
+    False) from the retry API. Schedules the next retry while images with attempts left are still failing.
+    """
+    course_id = int(task.get('course_id'))
+    logger.info(f"Retrying failed images for course_id: {course_id}")
+    manager = _create_task_manager(task, course_id)
+    if manager is None:
+        return
 
-    
+    process_content_images = ProcessContentImages(course_id=course_id, bearer_token=manager.api_key)
+    images_failed = False
+    try:
+        process_content_images.retry_failed_images(respect_backoff=task.get('respect_backoff', True))
+    except ImageContentExtractionException as e:
+        logger.error(f"Images still failing after retry for course_id {course_id}: {e}")
+        images_failed = True
+    finish_course_scan(course_id, task, images_failed)
+
+def finish_course_scan(course_id: int, task: Dict[str, Any], images_failed: bool = False) -> None:
+    """
+    Mark the scan COMPLETED, or COMPLETED_WITH_ERRORS when alt text generation failed or some images are still FAILED,
+    and schedule a retry of the failed images that have attempts left.
+    """
+    failed_images = ImageItem.objects.filter(course_id=course_id, processing_status=ImageItemStatus.FAILED)
+    if not images_failed and not failed_images.exists():
+        update_course_scan(course_id, CourseScanStatus.COMPLETED.value)
+        return
+    update_course_scan(course_id, CourseScanStatus.COMPLETED_WITH_ERRORS.value)
+    schedule_failed_image_retry(course_id, task)
+
+def schedule_failed_image_retry(course_id: int, task: Dict[str, Any]) -> None:
+    """Schedule `retry_failed_course_images` once, when the earliest retryable failed image is due."""
+    retryable = retryable_failed_images(course_id).exclude(next_attempt_at__isnull=True)
+    next_run = retryable.aggregate(next_run=Min('next_attempt_at'))['next_run']
+    if next_run is None:
+        logger.info(f"No failed images left to retry for course_id {course_id}")
+    # one pending retry per course, the latest scan decides when it runs
+    _schedule_task_once(
+        'retry_failed_course_images', f'retry-failed-images-{course_id}', next_run, {**task, 'respect_backoff': True}
+    )
+
+def _schedule_task_once(func_name: str, name: str, next_run: Optional[datetime], task: Dict[str, Any]) -> None:
+    """Replace the schedule called `name` with one running `func_name` of this module at `next_run` (None just removes it)."""
+    try:
+        Schedule.objects.filter(name=name).delete()
+        if next_run is None:
+            return
+        schedule(
+            f'{__name__}.{func_name}',
+            name=name,
+            schedule_type=Schedule.ONCE,
+            next_run=next_run,
+            task=task,
+        )
+        logger.info(f"Scheduled {name} at {next_run}")
+    except (DatabaseError, Exception) as e:
+        logger.error(f"Error scheduling {name}: {e}")
+
+def batch_scan_course_images(
+        course: AsyncCanvasCourse,
+        bearer_token: Optional[str],
+        watermarks: Optional[ContentWatermarks],
+        incremental: bool,
+        task: Dict[str, Any]) -> None:
+    """
+    Scan the course like `scan_and_store_course_images`, then submit its alt text requests as an Azure OpenAI
+    batch job polled by `poll_alt_text_batch`, which finishes the scan. Images the batch isn't needed for (cache hits,
+    rejected or failed downloads) are stored right away. If the job can't be submitted the alt text is generated live.
+    """
+    results = async_to_sync(fetch_course_content)(course, watermarks)
+    if not unpack_and_store_content_images(results, course):
+        logger.error(f"Failed to fetch content images for course_id {course.id}. Marking scan as FAILED.")
+        return
+
+    process_content_images = ProcessContentImages(course_id=course.id, bearer_token=bearer_token)
+    image_qs = ImageItem.objects.filter(course_id=course.id)
+    if incremental:
+        image_qs = image_qs.filter(image_alt_text__isnull=True)
+
+    images_failed = False
+    try:
+        job, settled = AltTextBatch(process_content_images).submit(list(image_qs))
+    except Exception as e:
+        logger.error(f"Error submitting alt text batch for course_id {course.id}, generating alt text live instead: {e}")
+        job, settled = None, []
+        try:
+            process_content_images.retrieve_images_with_alt_text(only_missing_alt_text=incremental)
+        except ImageContentExtractionException:
+            images_failed = True
+
+    try:
+        process_content_images.store_alt_text_results(settled)
+    except ImageContentExtractionException as e:
+        logger.error(f"Alt text failed for images of course_id {course.id} before the batch job: {e}")
+        images_failed = True
+
+    if job is None:
+        finish_course_scan(course.id, task, images_failed)
+        return
+    schedule_alt_text_batch_poll(job, task)
+
+@log_execution_time
+def poll_alt_text_batch(task: Dict[str, Any]):
+    """
+    Check the Azure OpenAI batch job of a course scan, store its alt text once it has finished and finish the scan.
+    Reschedules itself every AZURE_BATCH_POLL_SECONDS while the job runs.
+    """
+    job_id = task.get('batch_job_id')
+    try:
+        job = AltTextBatchJob.objects.get(id=job_id)
+    except AltTextBatchJob.DoesNotExist:
+        logger.error(f"Alt text batch job {job_id} no longer exists, its course was probably rescanned")
+        return
+
+    process_content_images = ProcessContentImages(course_id=job.course_id)
+    try:
+        gen_results = AltTextBatch(process_content_images).poll(job)
+    except Exception as e:
+        logger.error(f"Error polling {job}, trying again later: {e}")
+        gen_results = None
+    if gen_results is None:
+        schedule_alt_text_batch_poll(job, task)
+        return
+
+    scan_task = {key: value for key, value in task.items() if key != 'batch_job_id'}
+    images_failed = False
+    try:
+        process_content_images.store_alt_text_results(gen_results)
+    except ImageContentExtractionException as e:
+        logger.error(f"Alt text failed for images of {job}: {e}")
+        images_failed = True
+    finish_course_scan(job.course_id, scan_task, images_failed)
+
+def schedule_alt_text_batch_poll(job: AltTextBatchJob, task: Dict[str, Any]) -> None:
+    next_run = timezone.now() + timedelta(seconds=config.AZURE_BATCH_POLL_SECONDS)
+    _schedule_task_once('poll_alt_text_batch', f'poll-alt-text-batch-{job.id}', next_run, {**task, 'batch_job_id': job.id})
+
+def _create_task_manager(task: Dict[str, Any], course_id: int):
+    """Canvas manager acting as the user who started the task, None (and the user's token dropped) if that fails."""
+    user_id = task.get('user_id')
+    req_user: User = get_user_model().objects.get(pk=user_id)
+    canvas_callback_url = task.get('canvas_callback_url')
+    request = _create_background_request(req_user, canvas_callback_url, course_id)
+
+    try:
+        return MANAGER_FACTORY.create_manager(request)
+    except (InvalidOAuthReturnError, Exception) as e:
+        logger.error(f"Error creating Canvas API for course_id {course_id}: {e}")
+        CanvasOAuth2Token.objects.filter(user=request.user).delete()
+        return None
 
 def _create_background_request(req_user: User, canvas_callback_url: str, course_id: int) -> Request:
     logger.info(f"Creating background request - User: {req_user}, Course ID: {course_id}, Callback URL: {canvas_callback_url}")
@@ -102,46 +276,164 @@ def _create_background_request(req_user: User, canvas_callback_url: str, course_
     request.session = session
     return request
 
-async def get_courses_images(course: Course):
+def scan_and_store_course_images(
+        course: AsyncCanvasCourse,
+        bearer_token: Optional[str],
+        watermarks: Optional[ContentWatermarks],
+        incremental: bool,
+        deadline: Optional[float] = None) -> bool:
+    """
+    Scan the course in phases: gather all content, persist it, then generate alt text for the stored images.
+    Returns False if fetching content failed (the scan is already marked FAILED), raises
+    ImageContentExtractionException if alt text generation failed for any image or stopped at `deadline`.
+    """
+    results = async_to_sync(fetch_course_content)(course, watermarks)
+    state_of_content_fetch: bool = unpack_and_store_content_images(results, course)
+
+    # this check is helping not to move to alt text retrieval if there was an error in fetching content images
+    if not state_of_content_fetch:
+        return False
+
+    retrieve_and_store_alt_text(course, bearer_token=bearer_token, only_missing_alt_text=incremental, deadline=deadline)
+    return True
+
+def stream_and_store_course_images(
+        course: AsyncCanvasCourse,
+        bearer_token: Optional[str],
+        watermarks: Optional[ContentWatermarks],
+        incremental: bool,
+        deadline: Optional[float] = None) -> bool:
+    """
+    Scan the course as a producer/consumer pipeline so image processing overlaps Canvas pagination:
+    Canvas fetch -> content queue -> DB persist -> image queue -> ProcessContentImages workers.
+    Same contract as `scan_and_store_course_images`.
+    """
+    process_content_images = ProcessContentImages(
+        course_id=course.id,
+        bearer_token=bearer_token,
+        deadline=deadline,
+    )
+    results, seen_content_ids, gen_results = async_to_sync(_run_scan_pipeline)(
+        course, process_content_images, watermarks, incremental
+    )
+    assignments, pages, quizzes = results
+    fetch_failed = any(_has_fetch_error(r) for r in (assignments, pages, quizzes))
+
+    if fetch_failed:
+        update_course_scan(course.id, CourseScanStatus.FAILED.value)
+    else:
+        # content that wasn't seen in this scan was removed from Canvas or no longer has images
+        try:
+            delete_stale_content(course.id, seen_content_ids)
+        except (DatabaseError, Exception) as e:
+            logger.error(f"Error deleting stale content for course_id {course.id}: {e}")
+
+    # keep the alt text already generated even when the Canvas fetch failed part way
+    process_content_images.store_alt_text_results(gen_results)
+    return not fetch_failed
+
+async def _run_scan_pipeline(
+        course: AsyncCanvasCourse,
+        process_content_images: ProcessContentImages,
+        watermarks: Optional[ContentWatermarks],
+        incremental: bool):
+    concurrency = config.IMAGE_PROCESSING_CONCURRENCY
+    content_queue: asyncio.Queue = asyncio.Queue(maxsize=CONTENT_QUEUE_MAXSIZE)
+    image_queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * IMAGE_QUEUE_MAXSIZE_PER_WORKER)
+    seen_content_ids: List[int] = []
+
+    async def on_content(item: Dict[str, Any]) -> None:
+        # waiting for queue space here is what applies backpressure to Canvas pagination
+        await content_queue.put(item)
+
+    async def produce_content():
+        try:
+            return await fetch_course_content(course, watermarks, on_content)
+        finally:
+            await content_queue.put(None)
+
+    async def persist_content():
+        try:
+            while (item := await content_queue.get()) is not None:
+                seen_content_ids.append(item.get('id'))
+                try:
+                    image_models = await sync_to_async(persist_scanned_content)(course.id, item, incremental)
+                except (DatabaseError, Exception) as e:
+                    logger.error(f"Error persisting content item {item.get('id')} for course_id {course.id}: {e}")
+                    continue
+                for img in image_models:
+                    await image_queue.put(img)
+        finally:
+            for _ in range(concurrency):
+                await image_queue.put(None)
+
+    stages = [
+        asyncio.ensure_future(produce_content()),
+        asyncio.ensure_future(persist_content()),
+        asyncio.ensure_future(process_content_images.consume_image_queue(image_queue, concurrency)),
+    ]
+    try:
+        results, _, gen_results = await asyncio.gather(*stages)
+    except BaseException:
+        # stop the other stages before re-raising, instead of leaving their DB writes and AI calls to loop teardown
+        for stage in stages:
+            stage.cancel()
+        await asyncio.gather(*stages, return_exceptions=True)
+        raise
+    return results, seen_content_ids, gen_results
+
+async def fetch_course_content(
+        course: AsyncCanvasCourse,
+        watermarks: Optional[ContentWatermarks] = None,
+        on_content: Optional[ContentCallback] = None):
+    """
+    Open the course's pooled Canvas connection on the running event loop and gather all content lists with it.
+    """
+    async with course.canvas:
+        results = await get_courses_images(course, watermarks, on_content)
+    logger.info(f"Canvas rate limit counters for course {course.id}: {course.canvas.scheduler.counters.as_dict()}")
+    return results
+
+async def get_courses_images(
+        course: AsyncCanvasCourse,
+        watermarks: Optional[ContentWatermarks] = None,
+        on_content: Optional[ContentCallback] = None):
     results = await asyncio.gather(
-        fetch_content_items_async(get_assignments, course),
-        fetch_content_items_async(get_pages, course),
-        fetch_content_items_async(get_quizzes, course),
+        fetch_content_items_async(get_assignments, course, watermarks, on_content),
+        fetch_content_items_async(get_pages, course, watermarks, on_content),
+        fetch_content_items_async(get_quizzes, course, watermarks, on_content),
         return_exceptions=True,
     )
     logger.info("raw results from gather course images: %s", results)
     return results
     
-def retrieve_and_store_alt_text(course: Course, bearer_token: Optional[str] = None):
+def retrieve_and_store_alt_text(
+        course: AsyncCanvasCourse,
+        bearer_token: Optional[str] = None,
+        only_missing_alt_text: bool = False,
+        deadline: Optional[float] = None):
     """
     Retrieve alt text for images in the given course using AI processor.
     The images for the course need to have been processed first to get the image URLs.
 
-    :param course: Course object
-    :type course: Course
+    :param course: Course to retrieve alt text for
+    :type course: AsyncCanvasCourse
     :param bearer_token: Optional bearer token to pass directly to the image fetcher for Authorization
+    :param only_missing_alt_text: Only process images that don't have alt text yet (incremental scans)
+    :param deadline: Optional `time.monotonic()` at which alt text generation stops, see ProcessContentImages
     """
     process_content_images = ProcessContentImages(
         course_id=course.id,
         bearer_token=bearer_token,
+        deadline=deadline,
     )
-    images_with_alt_text = process_content_images.retrieve_images_with_alt_text()
+    images_with_alt_text = process_content_images.retrieve_images_with_alt_text(only_missing_alt_text=only_missing_alt_text)
     return images_with_alt_text
 
-def unpack_and_store_content_images(results, course: Course) -> bool:
+def unpack_and_store_content_images(results, course: AsyncCanvasCourse) -> bool:
      # unpack results (assignments, pages) and handle exceptions returned by gather. gather maintain call order
     assignments, pages, quizzes = results
 
-    # Simple error check: return True if result is an Exception or contains any Exception entries
-    def _has_fetch_error(result) -> bool:
-        if isinstance(result, Exception):
-            return True
-        if isinstance(result, list):
-            for item in result:
-                if isinstance(item, Exception):
-                    return True
-        return False
-
     error_when_fetching_images = any(_has_fetch_error(r) for r in (assignments, pages, quizzes))
 
     if error_when_fetching_images:
@@ -150,19 +442,29 @@ def unpack_and_store_content_images(results, course: Course) -> bool:
     
     combined = assignments + pages + quizzes
     logger.debug("Combined items count: %s", combined)
-    # Filter to only those content with images with alt text
+    # Filter to only those content with images with alt text, unchanged content is kept so its rows survive
     filtered_content_with_images = [
         item for item in combined
-        if isinstance(item.get('images'), list) and len(item.get('images')) > 0
+        if item.get('unchanged') or (isinstance(item.get('images'), list) and len(item.get('images')) > 0)
     ]
 
     logger.debug("Items before filter: %d; after filter (has images): %d", len(combined), len(filtered_content_with_images))
     logger.info(f"Course {course.id} items with images: {filtered_content_with_images}")
 
-    # DB call to persist initial ContentItem and ImageItem records
+    # DB call to persist ContentItem and ImageItem records
     save_scan_results(course.id, filtered_content_with_images)
     return True
 
+def _has_fetch_error(result) -> bool:
+    """Simple error check: return True if result is an Exception or contains any Exception entries"""
+    if isinstance(result, Exception):
+        return True
+    if isinstance(result, list):
+        for item in result:
+            if isinstance(item, Exception):
+                return True
+    return False
+
 def update_course_scan(course_id, status) -> None:
     """
     This function updates or creates a CourseScan record with the given status.
@@ -185,135 +487,320 @@ def update_course_scan(course_id, status) -> None:
     
 def save_scan_results(course_id: int, items: List[Dict[str, Any]]):
     """
-    Save the scan results into the database within a transaction.
-    Deletes previous ContentItem and ImageItem records for the course_id, then creates new records.
+    Save the scan results by diffing them against the rows already stored for the course.
+    Only new or changed ContentItems are upserted and only added/removed image URLs are inserted/deleted,
+    in chunks, so ImageItems whose URL is still on the content keep their alt text. Content marked
+    `unchanged` (incremental scans) is left as is, content missing from the scan is deleted.
+    All reads and the diff happen before the transaction so it only spans the writes.
     
     :param course_id: Course ID
     :type course_id: int
-    :param items: List of content items with images
+    :param items: List of content items with images or flagged as unchanged
     :type items: List[Dict[str, Any]]
     """
     try:
+        existing_content = {c.content_id: c for c in ContentItem.objects.filter(course_id=course_id)}
+        existing_images: Dict[int, List[Tuple[int, str]]] = defaultdict(list)
+        for image_id, content_id, image_url in ImageItem.objects.filter(course_id=course_id).values_list('id', 'content_item_id', 'image_url'):
+            existing_images[content_id].append((image_id, image_url))
+
+        seen_content_ids = {item.get('id') for item in items}
+        content_ids_to_delete = [content_id for content_id in existing_content if content_id not in seen_content_ids]
+        content_to_upsert: List[ContentItem] = []
+        images_to_create: List[ImageItem] = []
+        image_ids_to_delete: List[int] = []
+        for item in items:
+            if item.get('unchanged'):
+                continue
+            if _is_content_row_changed(existing_content.get(item.get('id')), course_id, item):
+                content_to_upsert.append(_content_item_from_scan(course_id, item))
+            create, delete = _diff_content_images(course_id, item, existing_images.get(item.get('id'), []))
+            images_to_create.extend(create)
+            image_ids_to_delete.extend(delete)
+
         with transaction.atomic():
-            # 1. Delete previous items based on course_id if exists
-            ContentItem.objects.filter(course_id=course_id).delete()
-            ImageItem.objects.filter(course_id=course_id).delete()
-            
-            # 2. Create ContentItem and ImageItem
-            for item in items:
-                content_item = ContentItem.objects.create(
-                    course_id=course_id,
-                    content_type=item.get('type'),
-                    content_id=item.get('id'),
-                    content_name=item.get('name'),
-                    content_parent_id=item.get('content_parent_id')
-                )
-                
-                for img in item['images']:
-                    ImageItem.objects.create(
-                        course_id=course_id,
-                        content_item=content_item,
-                        image_url=img
-                    )
+            for chunk in _chunks(content_ids_to_delete, SCAN_RESULTS_BATCH_SIZE):
+                ContentItem.objects.filter(content_id__in=chunk).delete()
+            for chunk in _chunks(image_ids_to_delete, SCAN_RESULTS_BATCH_SIZE):
+                ImageItem.objects.filter(id__in=chunk).delete()
+            _upsert_content_items(content_to_upsert)
+            ImageItem.objects.bulk_create(images_to_create, batch_size=SCAN_RESULTS_BATCH_SIZE)
+
+        logger.info(
+            f"Saved scan results for course_id {course_id}: {len(content_to_upsert)} content upserted, "
+            f"{len(content_ids_to_delete)} content deleted, {len(images_to_create)} images created, "
+            f"{len(image_ids_to_delete)} images deleted"
+        )
 
     except (DatabaseError, Exception) as e:
         logger.error(f"Error in save_scan_results transaction for course_id {course_id}: {e}")
         return
+
+def persist_scanned_content(course_id: int, item: Dict[str, Any], incremental: bool = False) -> List[ImageItem]:
+    """
+    Diff and store the ContentItem and ImageItem rows for one scanned content item (streaming scans).
+    Returns the ImageItems that need alt text: all images of the content, or in an incremental scan
+    only the ones without alt text.
+    """
+    content_id = item.get('id')
+    if not item.get('unchanged'):
+        existing_content = ContentItem.objects.filter(content_id=content_id).first()
+        existing_images = list(ImageItem.objects.filter(content_item_id=content_id).values_list('id', 'image_url'))
+        images_to_create, image_ids_to_delete = _diff_content_images(course_id, item, existing_images)
+
+        with transaction.atomic():
+            if _is_content_row_changed(existing_content, course_id, item):
+                _upsert_content_items([_content_item_from_scan(course_id, item)])
+            if image_ids_to_delete:
+                ImageItem.objects.filter(id__in=image_ids_to_delete).delete()
+            ImageItem.objects.bulk_create(images_to_create, batch_size=SCAN_RESULTS_BATCH_SIZE)
+
+    # re-read the rows, MySQL doesn't return primary keys from bulk_create
+    image_qs = ImageItem.objects.filter(content_item_id=content_id)
+    if incremental:
+        image_qs = image_qs.filter(image_alt_text__isnull=True)
+    return list(image_qs)
+
+def _content_item_from_scan(course_id: int, item: Dict[str, Any]) -> ContentItem:
+    return ContentItem(
+        course_id=course_id,
+        content_type=item.get('type'),
+        content_id=item.get('id'),
+        content_name=item.get('name'),
+        content_parent_id=item.get('content_parent_id'),
+        content_updated_at=item.get('content_updated_at'),
+        content_hash=item.get('content_hash'),
+    )
+
+def _is_content_row_changed(existing: Optional[ContentItem], course_id: int, item: Dict[str, Any]) -> bool:
+    if existing is None:
+        return True
+    scanned = _content_item_from_scan(course_id, item)
+    return any(getattr(existing, field.attname) != getattr(scanned, field.attname)
+               for field in (ContentItem._meta.get_field(name) for name in CONTENT_ITEM_SCAN_FIELDS))
+
+def _diff_content_images(
+        course_id: int,
+        item: Dict[str, Any],
+        existing_images: List[Tuple[int, str]]) -> Tuple[List[ImageItem], List[int]]:
+    """
+    Match the scanned image URLs of a content item against its stored (id, image_url) rows.
+    Returns the ImageItems to create and the ids of stored rows whose URL is gone. Repeated URLs are matched one to one.
+    """
+    unmatched_ids_by_url: Dict[str, List[int]] = defaultdict(list)
+    for image_id, image_url in existing_images:
+        unmatched_ids_by_url[image_url].append(image_id)
+
+    images_to_create = []
+    for image_url in item['images']:
+        if unmatched_ids_by_url.get(image_url):
+            # keep the existing row, and the alt text already generated for it
+            unmatched_ids_by_url[image_url].pop()
+        else:
+            images_to_create.append(ImageItem(course_id=course_id, content_item_id=item.get('id'), image_url=image_url))
+    image_ids_to_delete = [image_id for image_ids in unmatched_ids_by_url.values() for image_id in image_ids]
+    return images_to_create, image_ids_to_delete
+
+def _upsert_content_items(content_items: List[ContentItem]) -> None:
+    """Insert or update ContentItems on their unique content_id (MySQL ON DUPLICATE KEY UPDATE)."""
+    if not content_items:
+        return
+    # MySQL upserts on any unique key and rejects an explicit conflict target, other backends require one
+    unique_fields = ['content_id'] if connection.features.supports_update_conflicts_with_target else None
+    ContentItem.objects.bulk_create(
+        content_items,
+        batch_size=SCAN_RESULTS_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=CONTENT_ITEM_SCAN_FIELDS,
+    )
+
+def _chunks(values: List[T], size: int) -> Iterator[List[T]]:
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+def delete_stale_content(course_id: int, seen_content_ids: List[int]) -> None:
+    """Delete ContentItems (and their ImageItems, via cascade) of this course that the latest scan didn't return."""
+    deleted_count, _ = ContentItem.objects.filter(course_id=course_id).exclude(content_id__in=seen_content_ids).delete()
+    logger.info(f"Deleted {deleted_count} stale content rows for course_id {course_id}")
+
+def load_content_watermarks(course_id: int) -> ContentWatermarks:
+    """
+    Load the `updated_at`/body hash watermarks stored by the previous scan of this course.
+    Returns an empty dict when nothing was stored, which makes every content item count as changed.
+    """
+    try:
+        rows = ContentItem.objects.filter(course_id=course_id).values_list(
+            'content_type', 'content_id', 'content_updated_at', 'content_hash'
+        )
+        return {(content_type, content_id): (updated_at, content_hash) for content_type, content_id, updated_at, content_hash in rows}
+    except (DatabaseError, Exception) as e:
+        logger.error(f"Error loading content watermarks for course_id {course_id}, falling back to a full parse: {e}")
+        return {}
+
+def _hash_content(html_content: Optional[str]) -> str:
+    return hashlib.sha256((html_content or '').encode('utf-8')).hexdigest()
+
+def _is_content_unchanged(
+        watermarks: Optional[ContentWatermarks],
+        content_type: str,
+        content_id: int,
+        updated_at: Optional[datetime],
+        content_hash: str) -> bool:
+    """
+    Compare a content item against the previous scan's watermark.
+    A matching Canvas `updated_at` is trusted as-is; otherwise (or when Canvas has no `updated_at`, like quiz questions)
+    the body hash decides.
+    """
+    if not watermarks:
+        return False
+    previous = watermarks.get((content_type, content_id))
+    if previous is None:
+        return False
+    previous_updated_at, previous_hash = previous
+    if updated_at is not None and previous_updated_at is not None and updated_at == previous_updated_at:
+        return True
+    return previous_hash is not None and previous_hash == content_hash
+
+async def _scan_content(
+        images_list: List[Dict[str, Any]],
+        watermarks: Optional[ContentWatermarks],
+        content_id: int,
+        content_name: str,
+        html_content: Optional[str],
+        content_type: str,
+        content_parent_id: Optional[int],
+        updated_at: Optional[datetime],
+        on_content: Optional[ContentCallback] = None) -> List[Dict[str, Any]]:
+    """
+    Append the content item to `images_list`, parsing its HTML only when it changed since the last scan.
+    When `on_content` is given, the appended item is also handed to it right away (streaming scans).
+    """
+    content_hash = _hash_content(html_content)
+    items_before = len(images_list)
+    if _is_content_unchanged(watermarks, content_type, content_id, updated_at, content_hash):
+        logger.debug(f"Skipping unchanged {content_type} ID: {content_id}")
+        images_list.append({
+            'id': content_id,
+            'name': content_name,
+            'images': [],
+            'type': content_type,
+            'content_parent_id': content_parent_id,
+            'unchanged': True,
+        })
+    else:
+        images_list = append_image_items(
+            images_list,
+            content_id,
+            content_name,
+            extract_images_from_html(html_content),
+            content_type,
+            content_parent_id,
+            updated_at,
+            content_hash)
+    if on_content and len(images_list) > items_before:
+        await on_content(images_list[-1])
+    return images_list
   
-async def fetch_content_items_async(fn: Callable[[T], R], ctx: T) -> Union[R, Exception]:
+async def fetch_content_items_async(fn: Callable[..., Awaitable[R]], ctx: T, *args: Any) -> Union[R, Exception]:
     """
-   Generic async wrapper that runs the synchronous `fn(course|quiz)` in a thread and
-   returns a list (or empty list on error). `fn` should be a callable like
-   `get_assignments`, `get_pages`,  `get_quizzes`, `get_quiz_questions` that 
-   accepts a Course or Quiz and returns a list.
+   Generic async wrapper that awaits `fn(course|quiz, *args)` and returns its list,
+   or the exception it raised. `fn` should be a coroutine function like
+   `get_assignments`, `get_pages`,  `get_quizzes`, `get_quiz_question_items` that 
+   accepts a course or quiz and returns a list.
     """
     try:
-        return await asyncio.to_thread(fn, ctx)
-    except (CanvasException, Exception) as e:
+        return await fn(ctx, *args)
+    except (CanvasHTTPError, Exception) as e:
         logger.error("Error fetching content items using %s: %s", getattr(fn, '__name__', str(fn)), e)
         return e
 
 
-def get_assignments(course: Course):
+async def get_assignments(course: AsyncCanvasCourse, watermarks: Optional[ContentWatermarks] = None, on_content: Optional[ContentCallback] = None):
     """
-    Synchronously fetches assignments for a given course using canvas_api.get_assignments().
+    Fetches assignments for a given course from the Canvas assignments list.
     """
     try:
         logger.info(f"Fetching assignments for course {course.id}.")
-        assignments = list(course.get_assignments(per_page=PER_PAGE))
-        logger.debug(f"Fetched {len(assignments)} assignments.")
         images_from_assignments = []
-        for assignment in assignments:
-            # Use getattr to safely check for quiz_id attribute
-            quiz_id = getattr(assignment, 'quiz_id', None)
-            if quiz_id:
+        # each page of assignments is scanned as soon as it arrives
+        async for assignment in course.get_assignments():
+            if assignment.get('quiz_id'):
                 # skip quiz assignments since quizzes are fetched separately
-                logger.debug(f"Skipping quiz assignment ID: {assignment.id}")
+                logger.debug(f"Skipping quiz assignment ID: {assignment['id']}")
                 continue
-            logger.info(f"Assignment ID: {assignment.id}, Name: {assignment.name}")
+            logger.info(f"Assignment ID: {assignment['id']}, Name: {assignment.get('name')}")
 
             # Extract images from assignment description
-            images_from_assignments = append_image_items(
+            images_from_assignments = await _scan_content(
                 images_from_assignments,
-                assignment.id,
-                assignment.name,
-                extract_images_from_html(assignment.description),
+                watermarks,
+                assignment['id'],
+                assignment.get('name'),
+                assignment.get('description'),
                 'assignment',
-                None)
+                None,
+                parse_canvas_datetime(assignment.get('updated_at')),
+                on_content)
+        logger.debug(f"Fetched assignments with images: {len(images_from_assignments)}.")
         return images_from_assignments
-    except (CanvasException, Exception) as e:
+    except (CanvasHTTPError, Exception) as e:
         logger.error(f"Error fetching assignments for course {course.id}: {e}")
         raise e
  
-def get_pages(course: Course):
+async def get_pages(course: AsyncCanvasCourse, watermarks: Optional[ContentWatermarks] = None, on_content: Optional[ContentCallback] = None):
     """
-    Synchronously fetches pages for a given course using canvas_api.get_pages().
+    Fetches pages, including their body, for a given course from the Canvas pages list.
     """
     try:
         logger.info(f"Fetching pages for course {course.id}.")
-        pages = list(course.get_pages(include=['body'], per_page=PER_PAGE))
-
-        logger.debug(f"Fetched {len(pages)} pages.")
-        for page in pages:
-            logger.info(f"Page ID: {page.page_id}, Title: {page.title}")
         images_from_pages = []
-        for page in pages:
+        # each page of pages is scanned as soon as it arrives
+        async for page in course.get_pages():
+            logger.info(f"Page ID: {page['page_id']}, Title: {page.get('title')}")
             # Extract images from page body
-            images_from_pages = append_image_items(
+            images_from_pages = await _scan_content(
                 images_from_pages,
-                page.page_id,
-                page.title,
-                extract_images_from_html(page.body),
+                watermarks,
+                page['page_id'],
+                page.get('title'),
+                page.get('body'),
                 'page',
-                None)
+                None,
+                parse_canvas_datetime(page.get('updated_at')),
+                on_content)
         return images_from_pages
-    except (CanvasException, Exception) as e:
+    except (CanvasHTTPError, Exception) as e:
         logger.error(f"Error fetching pages for course {course.id}: {e}")
         raise e
 
 
-def get_quizzes(course: Course):
+async def get_quizzes(course: AsyncCanvasCourse, watermarks: Optional[ContentWatermarks] = None, on_content: Optional[ContentCallback] = None):
     """
-    Synchronously fetches quizzes for a given course using canvas_api.get_quizzes().
+    Fetches quizzes for a given course from the Canvas quizzes list, then the questions of each quiz.
     """
     try:
         logger.info(f"Fetching quizzes for course {course.id}.")
-        quizzes: List[Quiz] = list(course.get_quizzes(per_page=PER_PAGE))
+        quizzes: List[Dict[str, Any]] = []
 
         images_from_quizzes = []
-        for quiz in quizzes:
+        async for quiz in course.get_quizzes():
+            quizzes.append(quiz)
             # Extract images from quiz description
-            images_from_quizzes = append_image_items(
+            images_from_quizzes = await _scan_content(
                 images_from_quizzes,
-                quiz.id,
-                quiz.title,
-                extract_images_from_html(getattr(quiz, 'description', '')),
+                watermarks,
+                quiz['id'],
+                quiz.get('title'),
+                quiz.get('description') or '',
                 'quiz',
-                None)
+                None,
+                parse_canvas_datetime(quiz.get('updated_at')),
+                on_content)
 
-        quiz_question_results = async_to_sync(get_quiz_questions)(quizzes)
+        quiz_question_results = await get_quiz_questions(course, quizzes, watermarks, on_content)
         return process_quiz_with_questions(images_from_quizzes, quiz_question_results)
-    except (CanvasException, Exception) as e:
+    except (CanvasHTTPError, Exception) as e:
         logger.error(f"Errors fetching Quizzes for course {course.id}: {e}")
         raise e
 
@@ -334,29 +821,42 @@ def process_quiz_with_questions(quiz: List[Dict[str, Any]], questions: List[Dict
     else:
         return exceptions[0]
 
-async def get_quiz_questions(quizzes: List[Quiz]):
-    async with semaphore:
-        quiz_q_tasks = [fetch_content_items_async(get_quiz_questions_sync, quiz) for quiz in quizzes]
-        return await asyncio.gather(*quiz_q_tasks, return_exceptions=True)
-
-def get_quiz_questions_sync(quiz: Quiz):
-    logger.info(f"Fetching questions for quiz ID: {quiz.id}, Title: {quiz.title}")
+async def get_quiz_questions(
+        course: AsyncCanvasCourse,
+        quizzes: List[Dict[str, Any]],
+        watermarks: Optional[ContentWatermarks] = None,
+        on_content: Optional[ContentCallback] = None):
+    # concurrency against Canvas is bounded per request by the client's rate limit scheduler
+    quiz_q_tasks = [
+        fetch_content_items_async(get_quiz_question_items, course, quiz, watermarks, on_content)
+        for quiz in quizzes
+    ]
+    return await asyncio.gather(*quiz_q_tasks, return_exceptions=True)
+
+async def get_quiz_question_items(
+        course: AsyncCanvasCourse,
+        quiz: Dict[str, Any],
+        watermarks: Optional[ContentWatermarks] = None,
+        on_content: Optional[ContentCallback] = None):
+    logger.info(f"Fetching questions for quiz ID: {quiz['id']}, Title: {quiz.get('title')}")
     images_from_questions = []
     try:
-        question = quiz.get_questions(per_page=PER_PAGE)
-        for question in question:
-            # Extract images from quiz question text
-            images_from_questions = append_image_items(
+        async for question in course.get_quiz_questions(quiz['id']):
+            # Extract images from quiz question text, questions have no updated_at so only the hash is compared
+            images_from_questions = await _scan_content(
                 images_from_questions,
-                question.id,
-                question.question_name,
-                extract_images_from_html(getattr(question, 'question_text', '')),
+                watermarks,
+                question['id'],
+                question.get('question_name'),
+                question.get('question_text') or '',
                 'quiz_question',
-                quiz.id)
+                quiz['id'],
+                None,
+                on_content)
 
         return images_from_questions
-    except (CanvasException, Exception) as e:
-        logger.error(f"Errors fetching quiz {quiz.id}:{quiz.title} questions due {e}")
+    except (CanvasHTTPError, Exception) as e:
+        logger.error(f"Errors fetching quiz {quiz['id']}:{quiz.get('title')} questions due {e}")
         raise e
 
 def _parse_canvas_file_src(img_src: str) ->  Optional[str]:
@@ -400,14 +900,32 @@ def _parse_canvas_file_src(img_src: str) ->  Optional[str]:
         logger.error(f"Error parsing img src URL '{img_src}': {e}")
         raise e
 
+class _ImgTagCollector(HTMLParser):
+    """
+    Tokenizer that keeps only the attributes of <img> start tags, without building a document tree.
+    """
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.img_attrs: List[Dict[str, str]] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag == 'img':
+            # valueless attributes come through as None, the last duplicate attribute wins
+            self.img_attrs.append({name: value or '' for name, value in attrs})
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self.handle_starttag(tag, attrs)
+
+
 def extract_images_from_html(html_content: str) -> List[str]:
     if not html_content:
         return []
-    soup = BeautifulSoup(html_content, "html.parser")
+    collector = _ImgTagCollector()
+    collector.feed(html_content)
+    collector.close()
     images_found = []
     image_extensions = IMAGE_EXTENSIONS
-    for img in soup.find_all("img"):
-        logger.info(f"Processing img tag: {img}")
+    for img in collector.img_attrs:
         img_src = img.get("src")
         img_alt = (img.get("alt") or "").strip()
         img_role = (img.get("role") or "").strip().lower()
@@ -426,7 +944,7 @@ def extract_images_from_html(html_content: str) -> List[str]:
             download_url = img_src
         images_found.append(download_url)
     
-    logger.info(images_found)
+    logger.debug(f"Found {len(images_found)} of {len(collector.img_attrs)} img tags needing alt text")
     return images_found
 
 # Helper function to append image items if images exist
@@ -436,7 +954,9 @@ def append_image_items(
         content_name: str,
         images: List[str],
         content_type: str,
-        content_parent_id: Optional[int]) -> List[Dict[str, Any]]:
+        content_parent_id: Optional[int],
+        content_updated_at: Optional[datetime] = None,
+        content_hash: Optional[str] = None) -> List[Dict[str, Any]]:
 
     # check if images list is not empty before appending
     if len(images) > 0:
@@ -445,7 +965,9 @@ def append_image_items(
             'name': content_name,
             'images': images,
             'type': content_type,
-            'content_parent_id': content_parent_id
+            'content_parent_id': content_parent_id,
+            'content_updated_at': content_updated_at,
+            'content_hash': content_hash
             })
     return images_list
 
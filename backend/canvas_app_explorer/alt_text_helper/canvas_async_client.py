@@ -0,0 +1,171 @@
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+import orjson
+
+from backend.canvas_app_explorer.alt_text_helper.canvas_rate_limiter import CanvasRateLimitScheduler, scheduler_for_token
+from backend.canvas_app_explorer.canvas_lti_manager.exception import CanvasHTTPError
+from backend.canvas_app_explorer.canvas_lti_manager.manager import CanvasLtiManager
+
+logger = logging.getLogger(__name__)
+
+PER_PAGE = 100
+CANVAS_TIMEOUT_SECONDS = 30.0
+CANVAS_MAX_CONNECTIONS = 10
+# attempts after a throttled response before giving up on a request
+CANVAS_RATE_LIMIT_RETRIES = 3
+
+
+def parse_canvas_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Parse a Canvas ISO 8601 timestamp like 2026-01-28T15:08:00Z, returning None when absent or malformed."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        logger.warning(f"Unparseable Canvas timestamp '{value}'")
+        return None
+
+
+class CanvasAsyncClient:
+    """
+    Async Canvas REST client built on a single pooled keep-alive httpx.AsyncClient.
+
+    Connections belong to the event loop that opened them, so use it as
+    ``async with client:`` inside the coroutine that makes the requests.
+    Every request is admitted by the rate limit scheduler shared by the clients using
+    the same access token, whose counters are available as ``client.scheduler.counters``.
+    """
+
+    def __init__(
+            self,
+            canvas_url: str,
+            access_token: str,
+            transport: Optional[httpx.AsyncBaseTransport] = None,
+            scheduler: Optional[CanvasRateLimitScheduler] = None) -> None:
+        self.base_url = f"{canvas_url.rstrip('/')}/api/v1"
+        self._access_token = access_token
+        self._transport = transport
+        self.scheduler = scheduler or scheduler_for_token(access_token)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def __aenter__(self) -> 'CanvasAsyncClient':
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={'Authorization': f'Bearer {self._access_token}', 'Accept': 'application/json'},
+            timeout=CANVAS_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=CANVAS_MAX_CONNECTIONS, max_keepalive_connections=CANVAS_MAX_CONNECTIONS),
+            transport=self._transport,
+        )
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def request(
+            self,
+            method: str,
+            url: str,
+            params: Optional[Dict[str, Any]] = None,
+            json_body: Optional[Dict[str, Any]] = None) -> Tuple[httpx.Response, Any]:
+        """
+        Send a request through the rate limit scheduler and decode the JSON body with orjson.
+        Throttled requests are retried after the scheduler's backoff.
+        Returns (response, data); raises CanvasHTTPError for non-2xx responses.
+        """
+        if self._client is None:
+            raise RuntimeError("CanvasAsyncClient must be opened with 'async with' before making requests")
+        content = orjson.dumps(json_body) if json_body is not None else None
+        headers = {'Content-Type': 'application/json'} if content is not None else None
+        for attempt in range(CANVAS_RATE_LIMIT_RETRIES + 1):
+            async with self.scheduler.slot():
+                resp = await self._client.request(method, url, params=params, content=content, headers=headers)
+                throttled = self.scheduler.record_response(resp)
+            if not throttled or attempt == CANVAS_RATE_LIMIT_RETRIES:
+                break
+            self.scheduler.counters.retries += 1
+        data = self._decode(resp)
+        if resp.is_error:
+            error_data = data.get('errors', data) if isinstance(data, dict) else data
+            raise CanvasHTTPError(error_data if error_data is not None else resp.reason_phrase, resp.status_code)
+        return resp, data
+
+    async def get_paginated(self, url: str, params: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every object of a paginated Canvas list, following the Link header's rel="next" URL."""
+        next_url: Optional[str] = url
+        next_params: Optional[Dict[str, Any]] = {**(params or {}), 'per_page': PER_PAGE}
+        while next_url:
+            resp, data = await self.request('GET', next_url, params=next_params)
+            for obj in data or []:
+                yield obj
+            next_url = resp.links.get('next', {}).get('url')
+            # the next link already carries the full query string
+            next_params = None
+
+    @staticmethod
+    def _decode(resp: httpx.Response) -> Any:
+        if not resp.content:
+            return None
+        try:
+            return orjson.loads(resp.content)
+        except orjson.JSONDecodeError:
+            return resp.text
+
+
+class AsyncCanvasCourse:
+    """
+    Course-scoped view of a CanvasAsyncClient exposing the content the alt text tool reads and updates.
+    Objects are returned as the plain dicts Canvas sends.
+    """
+
+    def __init__(self, canvas: CanvasAsyncClient, course_id: int) -> None:
+        self.canvas = canvas
+        self.id = course_id
+
+    @classmethod
+    def from_manager(cls, manager: CanvasLtiManager) -> 'AsyncCanvasCourse':
+        return cls(CanvasAsyncClient(manager.api_url, manager.api_key), int(manager.course_id))
+
+    def get_assignments(self) -> AsyncIterator[Dict[str, Any]]:
+        return self.canvas.get_paginated(f'courses/{self.id}/assignments')
+
+    def get_pages(self) -> AsyncIterator[Dict[str, Any]]:
+        return self.canvas.get_paginated(f'courses/{self.id}/pages', params={'include[]': ['body']})
+
+    def get_quizzes(self) -> AsyncIterator[Dict[str, Any]]:
+        return self.canvas.get_paginated(f'courses/{self.id}/quizzes')
+
+    def get_quiz_questions(self, quiz_id: int) -> AsyncIterator[Dict[str, Any]]:
+        return self.canvas.get_paginated(f'courses/{self.id}/quizzes/{quiz_id}/questions')
+
+    async def update_assignment(self, assignment_id: int, description: str) -> Dict[str, Any]:
+        _, data = await self.canvas.request(
+            'PUT', f'courses/{self.id}/assignments/{assignment_id}', json_body={'assignment': {'description': description}}
+        )
+        return data
+
+    async def update_page(self, page_url: str, body: str) -> Dict[str, Any]:
+        _, data = await self.canvas.request(
+            'PUT', f'courses/{self.id}/pages/{page_url}', json_body={'wiki_page': {'body': body}}
+        )
+        return data
+
+    async def update_quiz(self, quiz_id: int, description: str) -> Dict[str, Any]:
+        _, data = await self.canvas.request(
+            'PUT', f'courses/{self.id}/quizzes/{quiz_id}', json_body={'quiz': {'description': description}}
+        )
+        return data
+
+    async def update_quiz_question(self, quiz_id: int, question_id: int, question_text: str) -> Dict[str, Any]:
+        _, data = await self.canvas.request(
+            'PUT', f'courses/{self.id}/quizzes/{quiz_id}/questions/{question_id}',
+            json_body={'question': {'question_text': question_text}}
+        )
+        return data
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Canvas gives every access token a leaky bucket of roughly 700 units of request cost
+RATE_LIMIT_INITIAL_CONCURRENCY = 4
+RATE_LIMIT_MIN_CONCURRENCY = 1
+RATE_LIMIT_MAX_CONCURRENCY = 10
+# below the low watermark concurrency is reduced, above the high watermark it is allowed to grow again
+RATE_LIMIT_LOW_WATERMARK = 200.0
+RATE_LIMIT_HIGH_WATERMARK = 500.0
+RATE_LIMIT_BACKOFF_SECONDS = 1.0
+RATE_LIMIT_MAX_BACKOFF_SECONDS = 30.0
+
+
+@dataclass
+class RateLimitCounters:
+    requests: int = 0
+    throttled_responses: int = 0
+    retries: int = 0
+    concurrency_decreases: int = 0
+    concurrency_increases: int = 0
+    total_request_cost: float = 0.0
+    last_remaining: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _header_float(resp: httpx.Response, name: str) -> Optional[float]:
+    value = resp.headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def is_rate_limited(resp: httpx.Response) -> bool:
+    """Canvas signals an empty bucket with 403 "Rate Limit Exceeded"; 429 is treated the same way."""
+    if resp.status_code == 429:
+        return True
+    return resp.status_code == 403 and b'Rate Limit Exceeded' in resp.content
+
+
+class CanvasRateLimitScheduler:
+    """
+    Bounds the number of in-flight Canvas requests for one access token and adapts that bound
+    from the X-Rate-Limit-Remaining and X-Request-Cost headers of each response.
+
+    Concurrency grows by one while the remaining quota is above the high watermark, shrinks by
+    one below the low watermark and is halved, with a pause before the next request, when Canvas
+    throttles. Each response must be passed to ``record_response`` inside its ``slot()``.
+    """
+
+    def __init__(
+            self,
+            initial_concurrency: int = RATE_LIMIT_INITIAL_CONCURRENCY,
+            min_concurrency: int = RATE_LIMIT_MIN_CONCURRENCY,
+            max_concurrency: int = RATE_LIMIT_MAX_CONCURRENCY,
+            backoff_seconds: float = RATE_LIMIT_BACKOFF_SECONDS) -> None:
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.concurrency_limit = max(min_concurrency, min(initial_concurrency, max_concurrency))
+        self.backoff_seconds = backoff_seconds
+        self.counters = RateLimitCounters()
+        self._in_flight = 0
+        self._throttle_streak = 0
+        self._resume_at = 0.0
+        # created on first use, and again for each new event loop, so it binds to the loop making the requests
+        self._condition: Optional[asyncio.Condition] = None
+        self._condition_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._condition_loop is not loop:
+            self._condition = asyncio.Condition()
+            self._condition_loop = loop
+        condition = self._condition
+        async with condition:
+            await condition.wait_for(lambda: self._in_flight < self.concurrency_limit)
+            self._in_flight += 1
+        try:
+            delay = self._resume_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield
+        finally:
+            async with condition:
+                self._in_flight -= 1
+                condition.notify_all()
+
+    def record_response(self, resp: httpx.Response) -> bool:
+        """Update counters and the concurrency limit from a response. Returns True when Canvas throttled it."""
+        self.counters.requests += 1
+        cost = _header_float(resp, 'X-Request-Cost')
+        remaining = _header_float(resp, 'X-Rate-Limit-Remaining')
+        if cost is not None:
+            self.counters.total_request_cost += cost
+        if remaining is not None:
+            self.counters.last_remaining = remaining
+
+        if is_rate_limited(resp):
+            self.counters.throttled_responses += 1
+            self._throttle_streak += 1
+            self._set_limit(self.concurrency_limit // 2)
+            pause = min(self.backoff_seconds * 2 ** (self._throttle_streak - 1), RATE_LIMIT_MAX_BACKOFF_SECONDS)
+            self._resume_at = max(self._resume_at, asyncio.get_running_loop().time() + pause)
+            logger.warning(
+                f"Canvas rate limit exceeded, pausing {pause:.1f}s with concurrency {self.concurrency_limit}"
+            )
+            return True
+
+        self._throttle_streak = 0
+        if remaining is not None:
+            if remaining < RATE_LIMIT_LOW_WATERMARK:
+                self._set_limit(self.concurrency_limit - 1)
+            elif remaining > RATE_LIMIT_HIGH_WATERMARK:
+                self._set_limit(self.concurrency_limit + 1)
+        return False
+
+    def _set_limit(self, limit: int) -> None:
+        limit = max(self.min_concurrency, min(limit, self.max_concurrency))
+        if limit < self.concurrency_limit:
+            self.counters.concurrency_decreases += 1
+            logger.debug(f"Canvas concurrency reduced to {limit}, remaining quota {self.counters.last_remaining}")
+        elif limit > self.concurrency_limit:
+            self.counters.concurrency_increases += 1
+        self.concurrency_limit = limit
+
+
+_schedulers: 'weakref.WeakValueDictionary[str, CanvasRateLimitScheduler]' = weakref.WeakValueDictionary()
+_schedulers_lock = threading.Lock()
+
+
+def scheduler_for_token(access_token: str) -> CanvasRateLimitScheduler:
+    """
+    The scheduler shared by every client of this process using `access_token`, since Canvas keeps one
+    rate limit bucket per token. It lives as long as a client holds it, so its counters cover the
+    requests made with the token while it was in use.
+    """
+    with _schedulers_lock:
+        scheduler = _schedulers.get(access_token)
+        if scheduler is None:
+            scheduler = CanvasRateLimitScheduler()
+            _schedulers[access_token] = scheduler
+        return scheduler
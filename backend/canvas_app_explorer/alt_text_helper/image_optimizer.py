@@ -0,0 +1,146 @@
+import io
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple, Union
+
+from PIL import Image
+
+# Kept free of Django imports: this module is imported by the spawned image worker processes.
+
+logger = logging.getLogger(__name__)
+
+# images are box-reduced to within this factor of the target size before the final LANCZOS resample
+IMAGE_REDUCING_GAP = 2.0
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_workers = 0
+
+
+def calculate_optimal_size(original_size: Tuple[int, int], max_dimension: int) -> Tuple[int, int]:
+    """Calculate optimal dimensions maintaining aspect ratio."""
+    width, height = original_size
+
+    if max(width, height) <= max_dimension:
+        return width, height
+
+    if width > height:
+        new_width = max_dimension
+        new_height = int(height * (max_dimension / width))
+    else:
+        new_height = max_dimension
+        new_width = int(width * (max_dimension / height))
+
+    return new_width, new_height
+
+
+# https://www.buildwithmatija.com/blog/reduce-image-sizes-ai-processing-costs#the-smart-optimization-strategy
+def optimize_image(
+        image_content: Union[bytes, str], max_dimension: int, jpeg_quality: int) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Decode, downscale and re-encode an image as JPEG, returning the JPEG bytes and optimization metrics.
+
+    `image_content` is the encoded image or the path of a file holding it, so large downloads spooled to disk
+    are read by the worker instead of being pickled over to it.
+    Pure CPU work on plain arguments so it can run in a worker process; the caller does the logging.
+    """
+    if isinstance(image_content, str):
+        original_size = os.path.getsize(image_content)
+        source = image_content
+    else:
+        original_size = len(image_content)
+        source = io.BytesIO(image_content)
+    # Open with PIL
+    img = Image.open(source)
+    original_dimensions = img.size
+    original_format = img.format
+    bytes_per_pixel = len(img.getbands())
+
+    # Calculate optimal dimensions
+    new_width, new_height = calculate_optimal_size(img.size, max_dimension)
+    was_resized = max(img.size) > max_dimension
+
+    if was_resized:
+        # JPEG draft mode lets the decoder scale by 1/2, 1/4 or 1/8 while decoding, never below the target size
+        img.draft('RGB', (new_width, new_height))
+    decode_start = time.perf_counter()
+    img.load()
+    decode_seconds = time.perf_counter() - decode_start
+    decoded_dimensions = img.size
+
+    # Resize if necessary, box-reducing by an integer factor first so LANCZOS only works on ~2x the target
+    if was_resized:
+        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS, reducing_gap=IMAGE_REDUCING_GAP)
+
+    # Convert to RGB if necessary (handles RGBA, P, etc.)
+    if img.mode in ('RGBA', 'LA', 'P'):
+        # Create white background for transparency
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+        img = background
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    # Save optimized image to bytes buffer
+    output_buffer = io.BytesIO()
+    img.save(output_buffer, format='JPEG', quality=jpeg_quality, optimize=True)
+    optimized_bytes = output_buffer.getvalue()
+    optimized_size = len(optimized_bytes)
+
+    # Calculate metrics
+    size_reduction_percent = ((original_size - optimized_size) / original_size) * 100
+    original_pixels = original_dimensions[0] * original_dimensions[1]
+    decoded_pixels = decoded_dimensions[0] * decoded_dimensions[1]
+    # decode time grows with pixel count, so a full decode is estimated by scaling the measured one
+    decode_time_saved_ms = decode_seconds * 1000 * (original_pixels / decoded_pixels - 1) if decoded_pixels else 0
+
+    metrics = {
+        'original_size_bytes': original_size,
+        'optimized_size_bytes': optimized_size,
+        'size_reduction_percent': round(size_reduction_percent, 2),
+        'original_dimensions': original_dimensions,
+        'optimized_dimensions': (new_width, new_height) if was_resized else original_dimensions,
+        'was_resized': was_resized,
+        'original_format': original_format,
+        'optimized_format': 'JPEG',
+        'decoded_dimensions': decoded_dimensions,
+        'reduced_resolution_decode': decoded_dimensions != original_dimensions,
+        'decode_time_ms': round(decode_seconds * 1000, 2),
+        'estimated_decode_time_saved_ms': round(decode_time_saved_ms, 2),
+        'decode_memory_saved_bytes': (original_pixels - decoded_pixels) * bytes_per_pixel,
+    }
+    return optimized_bytes, metrics
+
+
+def get_image_process_pool(workers: int) -> Optional[ProcessPoolExecutor]:
+    """
+    Process pool shared by every scan in this process, recreated when the configured size changes.
+
+    Returns None when workers is 0 or this process can't have children (daemonic django-q workers),
+    in which case callers optimize on a thread instead.
+    """
+    global _process_pool, _process_pool_workers
+    if workers <= 0:
+        return None
+    if multiprocessing.current_process().daemon:
+        logger.warning("Image worker processes are unavailable in a daemonic process, optimizing images on threads")
+        return None
+    if _process_pool is None or _process_pool_workers != workers:
+        shutdown_image_process_pool()
+        # spawn rather than fork, the scanning process has event loop and database threads running
+        _process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        _process_pool_workers = workers
+    return _process_pool
+
+
+def shutdown_image_process_pool() -> None:
+    """Discard the shared pool, e.g. after a worker died and left it broken."""
+    global _process_pool, _process_pool_workers
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+    _process_pool = None
+    _process_pool_workers = 0
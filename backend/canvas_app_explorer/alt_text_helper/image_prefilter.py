@@ -0,0 +1,58 @@
+import io
+from dataclasses import dataclass
+from typing import Optional
+
+from PIL import Image, ImageStat
+
+# Kept free of Django imports: classify_trivial_image runs in the spawned image worker processes.
+
+# pixel statistics are taken on a draft-decoded copy of about this size, enough for colour spread and entropy
+PREFILTER_SAMPLE_SIZE = 64
+
+TRIVIAL_IMAGE_SPACER = 'spacer'
+TRIVIAL_IMAGE_SOLID = 'solid'
+TRIVIAL_IMAGE_ICON = 'icon'
+
+
+@dataclass(frozen=True)
+class TrivialImage:
+    """An image settled by the local pre-filter without an AI call, with the alt text proposed for it ('' marks it decorative)."""
+    kind: str
+    reason: str
+    alt_text: str
+
+
+def classify_trivial_image(
+        contents: bytes,
+        max_spacer_pixels: int,
+        max_color_stddev: float,
+        max_entropy: float,
+        icon_max_dimension: int,
+        icon_alt_text: str) -> Optional[TrivialImage]:
+    """
+    Recognize images not worth describing from their optimized bytes, None for everything else.
+
+    - spacer: at most `max_spacer_pixels` pixels (spacer GIFs, tracking pixels), decorative
+    - solid: every channel's standard deviation at most `max_color_stddev` and grayscale entropy at most
+      `max_entropy` bits (blank images, solid-colour bars and dividers), decorative
+    - icon: neither side longer than `icon_max_dimension`, gets `icon_alt_text`
+
+    Optimization only shrinks images above IMAGE_MAX_DIMENSION, so the dimensions of small images are their own.
+    """
+    image = Image.open(io.BytesIO(contents))
+    width, height = image.size
+    if width * height <= max_spacer_pixels:
+        return TrivialImage(TRIVIAL_IMAGE_SPACER, f"Spacer or tracking pixel ({width}x{height})", '')
+
+    image.draft('RGB', (PREFILTER_SAMPLE_SIZE, PREFILTER_SAMPLE_SIZE))
+    image = image.convert('RGB')
+    stddev = max(ImageStat.Stat(image).stddev)
+    entropy = image.convert('L').entropy()
+    if stddev <= max_color_stddev and entropy <= max_entropy:
+        return TrivialImage(
+            TRIVIAL_IMAGE_SOLID, f"Solid colour image ({width}x{height}, stddev {stddev:.1f}, entropy {entropy:.2f})", ''
+        )
+
+    if max(width, height) <= icon_max_dimension:
+        return TrivialImage(TRIVIAL_IMAGE_ICON, f"Small icon ({width}x{height})", icon_alt_text)
+    return None
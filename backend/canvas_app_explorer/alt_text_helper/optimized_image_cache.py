@@ -0,0 +1,143 @@
+import hashlib
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import orjson
+from constance import config
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SUFFIX = '.jpg'
+VALIDATORS_SUFFIX = '.json'
+
+
+@dataclass
+class CachedImage:
+    content: bytes
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Headers that make the image server answer 304 Not Modified when the cached copy is still current."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class OptimizedImageCache:
+    """
+    Local disk cache of optimized JPEG bytes keyed by canonical image URL, so rescans skip image downloads.
+
+    Each entry is stored with the ETag/Last-Modified of the response it came from, and is only reused after the
+    image server confirms it with a 304 to a conditional request. Responses carrying neither validator are not
+    cached. Files live in OPTIMIZED_IMAGE_CACHE_DIR (shared by every worker process on the host; writes are
+    atomic renames) and are trimmed to OPTIMIZED_IMAGE_CACHE_MAX_MB, least recently used first.
+    Filesystem errors are logged and treated as misses so the cache never fails a scan.
+    """
+
+    def __init__(self, max_dimension: int, jpeg_quality: int) -> None:
+        self.enabled: bool = config.OPTIMIZED_IMAGE_CACHE_ENABLED
+        self.max_bytes: int = config.OPTIMIZED_IMAGE_CACHE_MAX_MB * 1024 * 1024
+        self.directory: str = settings.OPTIMIZED_IMAGE_CACHE_DIR
+        # optimized bytes depend on the optimization settings as well as the source image
+        self._settings_suffix = f'\x00{max_dimension}\x00{jpeg_quality}'
+        self.hits = 0
+        self.stored = 0
+
+    def _path(self, image_key: str) -> str:
+        digest = hashlib.sha256((image_key + self._settings_suffix).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def get(self, image_key: str) -> Optional[CachedImage]:
+        """The cached image for a canonical image key; callers must revalidate it before use."""
+        if not self.enabled:
+            return None
+        path = self._path(image_key)
+        try:
+            with open(path + VALIDATORS_SUFFIX, 'rb') as validators_file:
+                validators = orjson.loads(validators_file.read())
+            with open(path + IMAGE_SUFFIX, 'rb') as image_file:
+                content = image_file.read()
+            return CachedImage(content, validators.get('etag'), validators.get('last_modified'))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading optimized image cache entry for {image_key}: {e}")
+            return None
+
+    def record_hit(self, image_key: str) -> None:
+        """Mark an entry revalidated by the server as recently used."""
+        self.hits += 1
+        path = self._path(image_key)
+        try:
+            os.utime(path + IMAGE_SUFFIX)
+        except OSError as e:
+            logger.error(f"Error touching optimized image cache entry for {image_key}: {e}")
+
+    def set(self, image_key: str, content: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        if not self.enabled or not (etag or last_modified):
+            return
+        path = self._path(image_key)
+        validators = orjson.dumps({'url': image_key, 'etag': etag, 'last_modified': last_modified})
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # validators go last so a reader never pairs new validators with stale bytes
+            self._write_atomic(path + IMAGE_SUFFIX, content)
+            self._write_atomic(path + VALIDATORS_SUFFIX, validators)
+            self.stored += 1
+        except OSError as e:
+            logger.error(f"Error storing optimized image cache entry for {image_key}: {e}")
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the cache fits OPTIMIZED_IMAGE_CACHE_MAX_MB. Returns entries deleted."""
+        if not self.enabled or not os.path.isdir(self.directory):
+            return 0
+        try:
+            entries = []
+            total = 0
+            for shard in os.scandir(self.directory):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if entry.name.endswith(IMAGE_SUFFIX):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path[:-len(IMAGE_SUFFIX)]))
+                        total += stat.st_size
+            deleted = 0
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                for suffix in (VALIDATORS_SUFFIX, IMAGE_SUFFIX):
+                    try:
+                        os.unlink(path + suffix)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+                deleted += 1
+            if deleted:
+                logger.info(f"Evicted {deleted} optimized image cache entries")
+            return deleted
+        except OSError as e:
+            logger.error(f"Error evicting optimized image cache entries: {e}")
+            return 0
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'stored': self.stored}
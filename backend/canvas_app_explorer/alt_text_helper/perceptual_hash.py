@@ -0,0 +1,48 @@
+from typing import List
+
+from PIL import Image
+
+# 8x8 gradient comparisons give a 64 bit hash
+DHASH_SIZE = 8
+# the hash is split into bands that are stored and indexed separately, a candidate must match one band exactly
+DHASH_BANDS = 4
+DHASH_BAND_BITS = DHASH_SIZE * DHASH_SIZE // DHASH_BANDS
+
+
+def dhash(image: Image.Image, hash_size: int = DHASH_SIZE) -> int:
+    """
+    Difference hash: shrink to (hash_size + 1) x hash_size grayscale and record whether each pixel is
+    brighter than its right neighbour. Re-encodes, format changes and resizes of the same picture land
+    within a few bits of each other.
+    """
+    gray = image.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = gray.tobytes()
+    width = hash_size + 1
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * width + col]
+            right = pixels[row * width + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def hash_to_hex(value: int) -> str:
+    return f'{value:016x}'
+
+
+def hash_bands(value: int) -> List[int]:
+    """
+    Split a 64 bit hash into DHASH_BANDS integers, most significant band first. Two hashes within
+    DHASH_BANDS - 1 bits of each other always share at least one band (pigeonhole), so an exact
+    match on any band finds every near-duplicate up to that distance.
+    """
+    mask = (1 << DHASH_BAND_BITS) - 1
+    return [
+        (value >> (DHASH_BAND_BITS * (DHASH_BANDS - 1 - i))) & mask
+        for i in range(DHASH_BANDS)
+    ]
@@ -1,37 +1,133 @@
 import logging
 import asyncio
 import io
-from urllib.parse import urlparse
-from typing import Any, Dict, List, Tuple, Optional
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+from typing import IO, Any, AsyncIterator, Dict, List, Optional, Tuple, Union
 from django.conf import settings
+from django.db.models import QuerySet
+from django.utils import timezone
 from constance import config
-from asgiref.sync import async_to_sync
-from backend.canvas_app_explorer.canvas_lti_manager.exception import ImageContentExtractionException
+from asgiref.sync import async_to_sync, sync_to_async
+from backend.canvas_app_explorer.canvas_lti_manager.exception import (
+    ImageContentExtractionException, ImageRejectedException, ScanDeadlineExceeded
+)
 from backend.canvas_app_explorer.alt_text_helper.ai_processor import AltTextProcessor
+from backend.canvas_app_explorer.alt_text_helper.alt_text_telemetry import save_alt_text_calls
+from backend.canvas_app_explorer.alt_text_helper.alt_text_cache import (
+    AltTextCache, alt_text_cache_key, generation_settings_key
+)
+from backend.canvas_app_explorer.alt_text_helper.image_prefilter import TrivialImage, classify_trivial_image
+from backend.canvas_app_explorer.alt_text_helper.image_optimizer import (
+    get_image_process_pool, optimize_image, shutdown_image_process_pool
+)
+from backend.canvas_app_explorer.alt_text_helper.optimized_image_cache import OptimizedImageCache
+from backend.canvas_app_explorer.alt_text_helper.perceptual_hash import DHASH_SIZE, dhash
 from backend.canvas_app_explorer.decorators import log_execution_time
-from PIL import Image
+from PIL import Image, UnidentifiedImageError
 import httpx
-from backend.canvas_app_explorer.models import ImageItem
+from backend.canvas_app_explorer.models import ImageItem, ImageItemStatus
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+IMAGE_DOWNLOAD_TIMEOUT_SECONDS = 30.0
+IMAGE_DOWNLOAD_MAX_CONNECTIONS = 20
+# caps parallel downloads from one host (e.g. the Canvas domain) so a large course can't monopolize it
+IMAGE_DOWNLOAD_MAX_CONNECTIONS_PER_HOST = 6
+IMAGE_DOWNLOAD_KEEPALIVE_EXPIRY_SECONDS = 30.0
+# downloads larger than this are spooled to a named temp file instead of memory, image workers read it from its path
+IMAGE_SPOOL_MEMORY_BYTES = 1024 * 1024
+# enough of the body for Pillow to read format and dimensions of common formats
+IMAGE_HEADER_PROBE_BYTES = 64 * 1024
+# rows per UPDATE statement when alt text is written back to ImageItem
+IMAGE_ITEM_UPDATE_BATCH_SIZE = 100
+# ImageItem columns describing the last alt text generation attempt
+IMAGE_ITEM_STATE_FIELDS = ['processing_status', 'attempt_count', 'last_error', 'next_attempt_at', 'processed_at']
+
+
+def canonical_image_key(image_url: str) -> str:
+    """Identity of the image behind a URL, so the same file is downloaded and captioned once per scan.
+
+    Canvas file URLs (preview, download, with any ``verifier``) map to ``canvas-file:<file id>``.
+    Other URLs are normalized: lower-case scheme and host, default port and fragment dropped, query sorted.
+    """
+    if not image_url:
+        return ''
+    try:
+        parsed = urlparse(image_url.strip())
+        if settings.CANVAS_OAUTH_CANVAS_DOMAIN in parsed.netloc:
+            parts = [p for p in parsed.path.split('/') if p]
+            for i, part in enumerate(parts):
+                if part == 'files' and i + 1 < len(parts):
+                    return f'canvas-file:{parts[i + 1]}'
+        scheme = parsed.scheme.lower()
+        netloc = (parsed.hostname or '').lower()
+        if parsed.port and parsed.port != DEFAULT_PORTS.get(scheme):
+            netloc = f'{netloc}:{parsed.port}'
+        query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+        return urlunparse((scheme, netloc, parsed.path or '/', parsed.params, query, ''))
+    except ValueError:
+        return image_url
+
+
+def course_scan_deadline() -> float:
+    """The `time.monotonic()` at which a course scan task starting now stops generating alt text (COURSE_SCAN_DEADLINE_SECONDS)."""
+    return time.monotonic() + config.COURSE_SCAN_DEADLINE_SECONDS
+
+
+def retryable_failed_images(course_id: int) -> QuerySet:
+    """FAILED ImageItems of a course that still have attempts left (IMAGE_RETRY_MAX_ATTEMPTS)."""
+    return ImageItem.objects.filter(
+        course_id=course_id,
+        processing_status=ImageItemStatus.FAILED,
+        attempt_count__lt=config.IMAGE_RETRY_MAX_ATTEMPTS,
+    )
+
 
 class ProcessContentImages:
-    def __init__(self, course_id: int, bearer_token: Optional[str] = None, auth_header: Optional[Dict[str, str]] = None):
+    def __init__(
+            self,
+            course_id: int,
+            bearer_token: Optional[str] = None,
+            auth_header: Optional[Dict[str, str]] = None,
+            transport: Optional[httpx.AsyncBaseTransport] = None,
+            deadline: Optional[float] = None):
         """Process images for a course.
 
         :param bearer_token: Optional bearer token string to use for Authorization header. If provided,
                              it takes precedence over introspecting the Canvas requester.
         :param auth_header: Optional explicit Authorization header dict to use. Takes highest precedence.
+        :param transport: Optional httpx transport for image downloads, e.g. a local stand-in in tests.
+        :param deadline: Optional `time.monotonic()` after which no more alt text is generated, the images left are
+                         FAILED and retried later. Defaults to `course_scan_deadline()`.
         """
         self.course_id = course_id
         self.max_dimension: int = config.IMAGE_MAX_DIMENSION
         self.jpeg_quality: int = config.IMAGE_JPEG_QUALITY
-        self.alt_text_processor = AltTextProcessor()
+        self.deadline: float = course_scan_deadline() if deadline is None else deadline
+        self.alt_text_processor = AltTextProcessor(deadline=self.deadline)
+        self.alt_text_cache = AltTextCache()
+        self.optimized_image_cache = OptimizedImageCache(self.max_dimension, self.jpeg_quality)
         # Explicit header or token provided by caller — prefer these over internal discovery
         self._auth_header = auth_header
         if bearer_token and not self._auth_header:
             self._auth_header = {'Authorization': f'Bearer {bearer_token}'}
+        # canonical image key -> task captioning that image, shared by every ImageItem referencing it
+        self._unique_image_tasks: Dict[str, asyncio.Task] = {}
+        # canonical image key -> alt text (or error) of an image processed in an earlier chunk of `retrieve_images_with_alt_text`
+        self._processed_image_alt_text: Dict[str, Union[str, TrivialImage, Exception]] = {}
+        # kind of trivial image -> AI calls the local pre-filter saved
+        self.prefilter_stats: Dict[str, int] = defaultdict(int)
+        # pooled download client, open for the duration of `image_download_session`
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._transport = transport
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
 
     @log_execution_time
     def get_images_by_course(self):
@@ -39,68 +135,200 @@ class ProcessContentImages:
         return self.retrieve_images_with_alt_text()
 
     @log_execution_time
-    def retrieve_images_with_alt_text(self) -> Dict[str, Dict[str, Any]]:
-        """Process ImageItem records for this course concurrently and generate alt text.
-
-        - Reads ImageItem rows for course_id
-        - Fetches image content and generates alt text concurrently (bounded to avoid memory/API spikes)
-        - Bulk-updates ImageItem.image_alt_text for successful ones
+    def retrieve_images_with_alt_text(self, only_missing_alt_text: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Process ImageItem records for this course in chunks and generate alt text.
+
+        - Reads ImageItem rows for course_id (only those without alt text when `only_missing_alt_text` is set,
+          so incremental scans keep alt text already generated for unchanged content)
+        - Loads IMAGE_PROCESSING_CHUNK_SIZE rows at a time (keyset pagination on id) so memory stays flat
+        - Fetches image content and generates alt text concurrently within a chunk (bounded to avoid memory/API spikes)
+        - Bulk-updates ImageItem.image_alt_text as each chunk completes, so a crash keeps the alt text already generated
+        - Once `deadline` is reached the remaining images are marked FAILED without being fetched, for the failed image retry
         - If any fetch/generation failed, raises ImageContentExtractionException with list of errors
 
         Returns a dict mapping image_url -> {image_url, image_alt_text}
         """
+        qs = ImageItem.objects.filter(course_id=self.course_id)
+        if only_missing_alt_text:
+            qs = qs.filter(image_alt_text__isnull=True)
+        return self._generate_alt_text_in_chunks(qs, retry=False)
+
+    @log_execution_time
+    def retry_failed_images(self, respect_backoff: bool = True) -> Dict[str, Dict[str, Any]]:
+        """Generate alt text again for this course's FAILED images only, leaving every other image untouched.
+
+        - Images that used up IMAGE_RETRY_MAX_ATTEMPTS are skipped
+        - With `respect_backoff`, images whose `next_attempt_at` hasn't come yet are skipped too
+        - Same results and ImageContentExtractionException as `retrieve_images_with_alt_text`
+        """
+        qs = retryable_failed_images(self.course_id)
+        if respect_backoff:
+            qs = qs.filter(next_attempt_at__lte=timezone.now())
+        return self._generate_alt_text_in_chunks(qs, retry=True)
+
+    def _generate_alt_text_in_chunks(self, qs: QuerySet, retry: bool) -> Dict[str, Dict[str, Any]]:
         try:
-            qs = ImageItem.objects.filter(course_id=self.course_id)
             logger.info(f"Retrieved {qs.count()} ImageItems for course_id: {self.course_id}")
 
+            chunk_size = config.IMAGE_PROCESSING_CHUNK_SIZE
             results: Dict[str, Dict[str, Any]] = {}
-            errors = []
-            to_update = []
-
-            # Collect image models
-            image_models = list(qs.iterator())
-
-            # Process images concurrently: fetch content and generate alt text for each, bounded
-            if image_models:
+            errors: List[Exception] = []
+            self._processed_image_alt_text = {}
+            last_id = 0
+            while True:
+                image_models = list(qs.filter(id__gt=last_id).order_by('id')[:chunk_size])
+                if not image_models:
+                    break
+                last_id = image_models[-1].id
+                # Process images concurrently: fetch content and generate alt text for each, bounded
                 gen_results = self._process_images_concurrently(image_models)
+                self._flush_alt_text_results(gen_results, results, errors, retry)
+            return self._finish_alt_text_results(results, errors)
+        except Exception as e:
+            logger.error(f"Error retrieving images for course_id {self.course_id}: {e}")
+            raise e
 
-                for res in gen_results:
-                    img = res['img']
-                    alt_or_exc = res['alt_text']
-                    img_url = img.image_url
-
-                    if isinstance(alt_or_exc, Exception):
-                        logger.error(f"Processing failed for image {img_url}: {alt_or_exc}")
-                        errors.append(alt_or_exc)
-                        continue
-
-                    # Skip if alt_text is None or empty string
-                    if not alt_or_exc:
-                        logger.warning(f"No alt text generated for image {img_url}")
-                        continue
-
-                    img.image_alt_text = alt_or_exc
-                    to_update.append(img)
-                    results[img_url] = {
-                        'image_url': img_url,
-                        'image_alt_text': alt_or_exc
-                    }
-                    logger.info(f"Generated alt text for image url={img_url}")
-
+    def store_alt_text_results(self, gen_results: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Persist generated alt text from `_worker_async`/`consume_image_queue` results.
 
-            # Bulk update successful alt texts
-            if to_update:
-                ImageItem.objects.bulk_update(to_update, ['image_alt_text'])
-                logger.info(f"Updated {len(to_update)} ImageItem records with alt text for course {self.course_id}")
+        - Bulk-updates ImageItem.image_alt_text for successful ones
+        - Records ImageItem.rejection_reason for images rejected before processing (these are not errors)
+        - Stores the canned alt text of trivial images skipped by `prefilter_image_async`, with the reason
+        - If any fetch/generation failed, raises ImageContentExtractionException with list of errors
 
-            if errors:
-                # Return successful results but raise to let caller handle failures
-                raise ImageContentExtractionException(errors)
+        Returns a dict mapping image_url -> {image_url, image_alt_text}
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        errors: List[Exception] = []
+        self._flush_alt_text_results(gen_results, results, errors)
+        return self._finish_alt_text_results(results, errors)
+
+    def _flush_alt_text_results(
+            self,
+            gen_results: List[Dict[str, Any]],
+            results: Dict[str, Dict[str, Any]],
+            errors: List[Exception],
+            retry: bool = False) -> None:
+        """Bulk-update the ImageItems in `gen_results`, adding successes to `results` and failures to `errors`.
+
+        Every ImageItem gets its processing state: a scan counts as the first attempt, a retry adds one.
+        Failed images are scheduled for a retry after IMAGE_RETRY_BACKOFF_SECONDS, doubled on every attempt.
+        Images left when the scan's deadline was reached are FAILED too, without using up an attempt.
+        """
+        to_update = []
+        to_reject = []
+        to_fail = []
+        past_deadline = 0
+        now = timezone.now()
+
+        for res in gen_results:
+            img = res['img']
+            alt_or_exc = res['alt_text']
+            img_url = img.image_url
+            if isinstance(alt_or_exc, ScanDeadlineExceeded):
+                # not an attempt (attempt_count stays as it was, 0 on a first scan), the failed image retry takes it
+                errors.append(alt_or_exc)
+                to_fail.append(self._mark_failed(img, str(alt_or_exc), now))
+                past_deadline += 1
+                continue
+            img.attempt_count = img.attempt_count + 1 if retry else 1
+            img.next_attempt_at = None
+            img.processed_at = now
+
+            if isinstance(alt_or_exc, TrivialImage):
+                logger.info(f"Skipped trivial image {img_url}: {alt_or_exc.reason}")
+                img.image_alt_text = alt_or_exc.alt_text
+                img.rejection_reason = alt_or_exc.reason[:255]
+                img.processing_status = ImageItemStatus.SKIPPED
+                img.last_error = None
+                to_update.append(img)
+                results[img_url] = {
+                    'image_url': img_url,
+                    'image_alt_text': alt_or_exc.alt_text
+                }
+                continue
+
+            if isinstance(alt_or_exc, ImageRejectedException):
+                logger.warning(f"Rejected image {img_url}: {alt_or_exc.reason}")
+                img.rejection_reason = alt_or_exc.reason[:255]
+                img.processing_status = ImageItemStatus.REJECTED
+                img.last_error = None
+                to_reject.append(img)
+                continue
+
+            if isinstance(alt_or_exc, Exception):
+                logger.error(f"Processing failed for image {img_url}: {alt_or_exc}")
+                errors.append(alt_or_exc)
+                to_fail.append(self._mark_failed(img, str(alt_or_exc) or type(alt_or_exc).__name__, now))
+                continue
+
+            # Skip if alt_text is None or empty string
+            if not alt_or_exc:
+                logger.warning(f"No alt text generated for image {img_url}")
+                to_fail.append(self._mark_failed(img, "No alt text generated", now))
+                continue
+
+            img.image_alt_text = alt_or_exc
+            img.rejection_reason = None
+            img.processing_status = ImageItemStatus.COMPLETED
+            img.last_error = None
+            to_update.append(img)
+            results[img_url] = {
+                'image_url': img_url,
+                'image_alt_text': alt_or_exc
+            }
+            logger.info(f"Generated alt text for image url={img_url}")
 
-            return results
-        except Exception as e:
-            logger.error(f"Error retrieving images for course_id {self.course_id}: {e}")
-            raise e
+        # Bulk update successful alt texts
+        if to_update:
+            ImageItem.objects.bulk_update(
+                to_update, ['image_alt_text', 'rejection_reason'] + IMAGE_ITEM_STATE_FIELDS,
+                batch_size=IMAGE_ITEM_UPDATE_BATCH_SIZE
+            )
+            logger.info(f"Updated {len(to_update)} ImageItem records with alt text for course {self.course_id}")
+        if to_reject:
+            ImageItem.objects.bulk_update(
+                to_reject, ['rejection_reason'] + IMAGE_ITEM_STATE_FIELDS, batch_size=IMAGE_ITEM_UPDATE_BATCH_SIZE
+            )
+            logger.info(f"Recorded {len(to_reject)} rejected ImageItem records for course {self.course_id}")
+        if past_deadline:
+            logger.warning(f"Course scan deadline reached, left {past_deadline} ImageItems of course {self.course_id} for retry")
+        if to_fail:
+            ImageItem.objects.bulk_update(to_fail, IMAGE_ITEM_STATE_FIELDS, batch_size=IMAGE_ITEM_UPDATE_BATCH_SIZE)
+            logger.info(f"Recorded {len(to_fail)} failed ImageItem records for course {self.course_id}")
+        call_records = self.alt_text_processor.drain_call_records()
+        if call_records:
+            save_alt_text_calls(self.course_id, call_records, self.max_dimension, self.jpeg_quality)
+
+    @staticmethod
+    def _mark_failed(img: ImageItem, error: str, now: datetime) -> ImageItem:
+        img.processing_status = ImageItemStatus.FAILED
+        img.last_error = error[:255]
+        if img.attempt_count < config.IMAGE_RETRY_MAX_ATTEMPTS:
+            backoff_seconds = config.IMAGE_RETRY_BACKOFF_SECONDS * 2 ** max(img.attempt_count - 1, 0)
+            img.next_attempt_at = now + timedelta(seconds=backoff_seconds)
+        return img
+
+    def _finish_alt_text_results(
+            self, results: Dict[str, Dict[str, Any]], errors: List[Exception]) -> Dict[str, Dict[str, Any]]:
+        logger.info(f"Alt text cache stats for course {self.course_id}: {self.alt_text_cache.stats()}")
+        self.alt_text_cache.evict()
+        logger.info(f"Optimized image cache stats for course {self.course_id}: {self.optimized_image_cache.stats()}")
+        logger.info(
+            f"Azure OpenAI deployment stats of this process after course {self.course_id}: "
+            f"{self.alt_text_processor.deployment_pool.stats()}"
+        )
+        logger.info(
+            f"Trivial image pre-filter skipped {sum(self.prefilter_stats.values())} AI calls for course {self.course_id}: "
+            f"{dict(self.prefilter_stats)}"
+        )
+        self.optimized_image_cache.evict()
+
+        if errors:
+            # Return successful results but raise to let caller handle failures
+            raise ImageContentExtractionException(errors)
+
+        return results
 
     async def get_image_content_async(self, img_url):
         if not img_url:
@@ -119,13 +347,43 @@ class ProcessContentImages:
         else:
             headers = {}
 
+        if self._http_client is None:
+            # called outside a scan, open a session just for this download
+            async with self.image_download_session():
+                return await self.get_image_content_async(img_url)
+
+        # a cached copy is only reused after the server answers 304 to a conditional request
+        image_key = canonical_image_key(img_url)
+        cached = await asyncio.to_thread(self.optimized_image_cache.get, image_key)
+        if cached:
+            headers = {**headers, **cached.conditional_headers()}
+
         try:
-            async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-                resp = await client.get(img_url, headers=headers)
-                resp.raise_for_status()
-                image_content = resp.content
-                optimized_image_content = self.get_optimized_images(image_content, img_url)
-                return optimized_image_content
+            image_file, resp_headers = await self._download_image(img_url, headers, domain)
+            if image_file is None:
+                if cached is None:
+                    # only a conditional request can be answered with the cached copy
+                    err = ValueError(f"Image server answered 304 Not Modified to an unconditional request for {img_url}")
+                    logger.error(err)
+                    return err
+                logger.info(f"Image {img_url} not modified, using cached optimized image")
+                await asyncio.to_thread(self.optimized_image_cache.record_hit, image_key)
+                return cached.content
+            with image_file:
+                if isinstance(image_file, io.BytesIO):
+                    image_content: Union[bytes, str] = image_file.getvalue()
+                else:
+                    # a download spooled to disk is opened by the image worker, not copied through this process
+                    image_file.flush()
+                    image_content = image_file.name
+                optimized_bytes = await self.optimize_image_async(image_content, img_url)
+            await asyncio.to_thread(
+                self.optimized_image_cache.set, image_key, optimized_bytes,
+                resp_headers.get('ETag'), resp_headers.get('Last-Modified')
+            )
+            return optimized_bytes
+        except ImageRejectedException as rejected:
+            return rejected
         except httpx.HTTPStatusError as http_err:
             logger.error(f"HTTP error fetching image {img_url}: {http_err}")
             return http_err
@@ -133,120 +391,360 @@ class ProcessContentImages:
             logger.error(f"Error fetching image content for image_id {img_url}: {req_err}")
             return req_err
 
+    async def _download_image(
+            self, img_url: str, headers: Dict[str, str], host: str) -> Tuple[Optional[IO[bytes]], httpx.Headers]:
+        """Stream an image into memory, or a named temp file past IMAGE_SPOOL_MEMORY_BYTES, rejecting it as soon as
+        headers or the first bytes show it's too big.
+
+        - Content-Length over IMAGE_MAX_DOWNLOAD_BYTES or a text/* Content-Type is rejected before reading the body
+        - Once IMAGE_HEADER_PROBE_BYTES have arrived Pillow reads the dimensions, over IMAGE_MAX_PIXELS is rejected;
+          if it can't identify the image yet, the dimensions are checked once more after the whole body arrived
+        - Bodies exceeding IMAGE_MAX_DOWNLOAD_BYTES are cut off mid-stream
+        Returns the file and the response headers, the file is None when a conditional request got 304 Not Modified.
+        Raises ImageRejectedException with the reason; the caller owns (and must close) the returned file.
+        """
+        max_bytes = config.IMAGE_MAX_DOWNLOAD_BYTES
+        spool: IO[bytes] = io.BytesIO()
+        try:
+            async with self._host_semaphore(host):
+                async with self._http_client.stream('GET', img_url, headers=headers) as resp:
+                    if resp.status_code == httpx.codes.NOT_MODIFIED:
+                        spool.close()
+                        return None, resp.headers
+                    resp.raise_for_status()
+                    self._check_image_response_headers(resp, max_bytes)
+                    received = 0
+                    probed = False
+                    dimensions_checked = False
+                    async for chunk in resp.aiter_bytes():
+                        received += len(chunk)
+                        if received > max_bytes:
+                            raise ImageRejectedException(f"Image is larger than the {max_bytes} byte download limit")
+                        spool.write(chunk)
+                        if isinstance(spool, io.BytesIO) and received > IMAGE_SPOOL_MEMORY_BYTES:
+                            spool = self._spool_to_disk(spool)
+                        if not probed and received >= IMAGE_HEADER_PROBE_BYTES:
+                            # probed once, an inconclusive probe is settled by the check after the last chunk
+                            probed = True
+                            dimensions_checked = self._check_image_dimensions(spool)
+            if not dimensions_checked and not self._check_image_dimensions(spool):
+                raise ImageRejectedException("Downloaded file is not a recognizable image")
+            spool.seek(0)
+            return spool, resp.headers
+        except BaseException:
+            spool.close()
+            raise
+
+    @staticmethod
+    def _spool_to_disk(buffer: io.BytesIO) -> IO[bytes]:
+        """Move a download that outgrew IMAGE_SPOOL_MEMORY_BYTES to a temp file with a path image workers can open."""
+        spool = tempfile.NamedTemporaryFile(prefix='image-download-')
+        try:
+            spool.write(buffer.getbuffer())
+        except BaseException:
+            spool.close()
+            raise
+        return spool
+
+    @staticmethod
+    def _check_image_response_headers(resp: httpx.Response, max_bytes: int) -> None:
+        content_length = resp.headers.get('Content-Length')
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            raise ImageRejectedException(
+                f"Image is larger than the {max_bytes} byte download limit (Content-Length {content_length})"
+            )
+        content_type = resp.headers.get('Content-Type', '')
+        if content_type.startswith('text/'):
+            raise ImageRejectedException(f"Response is not an image (Content-Type {content_type})")
+
+    @staticmethod
+    def _check_image_dimensions(image_file: IO[bytes]) -> bool:
+        """Read format and dimensions from what has been downloaded so far without decoding pixels.
+
+        Returns False while Pillow can't identify the image yet, raises ImageRejectedException when it has too many pixels.
+        """
+        max_pixels = config.IMAGE_MAX_PIXELS
+        image_file.seek(0)
+        try:
+            with Image.open(image_file) as img:
+                width, height = img.size
+        except Image.DecompressionBombError as e:
+            raise ImageRejectedException(f"Image rejected as a decompression bomb: {e}")
+        except (UnidentifiedImageError, OSError, SyntaxError):
+            return False
+        finally:
+            image_file.seek(0, io.SEEK_END)
+        if width * height > max_pixels:
+            raise ImageRejectedException(f"Image dimensions {width}x{height} exceed the {max_pixels} pixel limit")
+        return True
+
+    @asynccontextmanager
+    async def image_download_session(self) -> AsyncIterator[None]:
+        """Open one pooled HTTP/2 keep-alive client for every image download of a scan and close it afterwards.
+
+        Canvas file downloads redirect to the file CDN; redirects are followed on the same client so
+        CDN connections are pooled too (httpx drops the Authorization header on cross-origin redirects).
+        Nested sessions reuse the outer client.
+        """
+        if self._http_client is not None:
+            yield
+            return
+        self._http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=IMAGE_DOWNLOAD_TIMEOUT_SECONDS,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=IMAGE_DOWNLOAD_MAX_CONNECTIONS,
+                max_keepalive_connections=IMAGE_DOWNLOAD_MAX_CONNECTIONS,
+                keepalive_expiry=IMAGE_DOWNLOAD_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            transport=self._transport,
+        )
+        self._host_semaphores = {}
+        try:
+            yield
+        finally:
+            client, self._http_client = self._http_client, None
+            await client.aclose()
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(IMAGE_DOWNLOAD_MAX_CONNECTIONS_PER_HOST)
+        return self._host_semaphores[host]
+
     async def _worker_async(self, image_models: List[ImageItem], concurrency: int) -> List[Dict[str, Any]]:
         """Process images concurrently using semaphore for concurrency control.
 
-        - Fetches image content (async) then generates alt text (in thread)
+        - Groups ImageItems by `canonical_image_key` and processes one image per group,
+          groups already processed in an earlier chunk reuse that alt text
+        - Fetches image content then generates alt text, both on the event loop
         - Limits concurrent in-flight tasks via asyncio.Semaphore
-        - Returns a list of dicts: {'img': ImageItem, 'alt_text': str|Exception}
+        - Returns a list of dicts: {'img': ImageItem, 'alt_text': str|Exception}, one per ImageItem
         """
         sem = asyncio.Semaphore(concurrency)
 
-        async def _process_single_image(img: ImageItem) -> Dict[str, Any]:
+        async def _bounded_process_single_image(img: ImageItem) -> Dict[str, Any]:
             async with sem:
-                img_url = img.image_url
-                try:
-                    # Fetch image content
-                    contents = await self.get_image_content_async(img_url)
-                    if isinstance(contents, Exception):
-                        return {'img': img, 'alt_text': contents}
-
-                    # Convert to PIL Image and generate alt text
-                    pil_image = Image.open(io.BytesIO(contents))
-                    alt_text = await asyncio.to_thread(self.alt_text_processor.generate_alt_text, pil_image)
-                    # Handle None return value by providing empty string fallback
-                    return {'img': img, 'alt_text': alt_text or ''}
-                except Exception as e:
-                    logger.error(f"Processing exception for image {img_url}: {e}")
-                    return {'img': img, 'alt_text': e}
-
-        tasks = [_process_single_image(img) for img in image_models]
-        return await asyncio.gather(*tasks, return_exceptions=False)
+                return await self._process_single_image(img)
+
+        groups: Dict[str, List[ImageItem]] = defaultdict(list)
+        for img in image_models:
+            groups[canonical_image_key(img.image_url)].append(img)
+        # images already processed in an earlier chunk of this run reuse that result
+        pending = {key: group for key, group in groups.items() if key not in self._processed_image_alt_text}
+        logger.info(f"Processing {len(pending)} unique images for {len(image_models)} ImageItems in course {self.course_id}")
+
+        tasks = [_bounded_process_single_image(group[0]) for group in pending.values()]
+        async with self.image_download_session(), self.alt_text_processor.async_session():
+            unique_results = await asyncio.gather(*tasks, return_exceptions=False)
+        for key, res in zip(pending.keys(), unique_results):
+            self._processed_image_alt_text[key] = res['alt_text']
+        return [
+            {'img': img, 'alt_text': self._processed_image_alt_text[key]}
+            for key, group in groups.items()
+            for img in group
+        ]
+
+    async def consume_image_queue(self, image_queue: asyncio.Queue, concurrency: int) -> List[Dict[str, Any]]:
+        """Process ImageItems from a queue filled by the streaming course scan.
+
+        - Runs `concurrency` consumers, each stops when it takes a `None` sentinel off the queue
+          (the producer puts one sentinel per consumer)
+        - An image already seen in this scan (same `canonical_image_key`) reuses the first one's result
+        - Returns the same list of dicts as `_worker_async`: {'img': ImageItem, 'alt_text': str|Exception}
+        """
+        self._unique_image_tasks = {}
+
+        async def _consumer() -> List[Dict[str, Any]]:
+            consumer_results = []
+            while True:
+                img = await image_queue.get()
+                if img is None:
+                    return consumer_results
+                consumer_results.append(await self._process_deduplicated_image(img))
+
+        async with self.image_download_session(), self.alt_text_processor.async_session():
+            consumer_batches = await asyncio.gather(*[_consumer() for _ in range(concurrency)])
+        results = [res for batch in consumer_batches for res in batch]
+        logger.info(
+            f"Processed {len(self._unique_image_tasks)} unique images for {len(results)} ImageItems "
+            f"in course {self.course_id}"
+        )
+        return results
+
+    async def _process_deduplicated_image(self, img: ImageItem) -> Dict[str, Any]:
+        """Process `img` unless an image with the same canonical key was queued earlier, then share its alt text."""
+        key = canonical_image_key(img.image_url)
+        task = self._unique_image_tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._process_single_image(img))
+            self._unique_image_tasks[key] = task
+        else:
+            logger.debug(f"Reusing alt text of an earlier image with key {key} for {img.image_url}")
+        res = await task
+        return {'img': img, 'alt_text': res['alt_text']}
+
+    async def _process_single_image(self, img: ImageItem) -> Dict[str, Any]:
+        """Fetch one image and generate its alt text, returning {'img': ImageItem, 'alt_text': str|Exception}."""
+        img_url = img.image_url
+        if time.monotonic() >= self.deadline:
+            return {'img': img, 'alt_text': ScanDeadlineExceeded("Course scan deadline reached before the image was processed")}
+        try:
+            # Fetch image content
+            contents = await self.get_image_content_async(img_url)
+            if isinstance(contents, Exception):
+                return {'img': img, 'alt_text': contents}
+
+            # spacers, solid colour images and tiny icons get canned alt text without an AI call
+            trivial = await self.prefilter_image_async(contents)
+            if trivial:
+                return {'img': img, 'alt_text': trivial}
+
+            # Identical or near-duplicate images seen in any earlier scan reuse their alt text instead of another AI call
+            reused_alt_text, cache_entry = await self.find_reusable_alt_text(contents)
+            if reused_alt_text:
+                return {'img': img, 'alt_text': reused_alt_text}
+
+            # The optimized JPEG goes to the AI request as-is, without another decode and lossy encode,
+            # together with other images of the scan when AZURE_ALT_TEXT_BATCH_SIZE > 1
+            alt_text = await self.alt_text_processor.generate_alt_text_batched_async(contents)
+            await sync_to_async(self.remember_alt_text)(alt_text, cache_entry)
+            # Handle None return value by providing empty string fallback
+            return {'img': img, 'alt_text': alt_text or ''}
+        except Exception as e:
+            logger.error(f"Processing exception for image {img_url}: {e}")
+            return {'img': img, 'alt_text': e}
+
+    async def prefilter_image_async(self, contents: bytes) -> Optional[TrivialImage]:
+        """Classify optimized image bytes with the IMAGE_PREFILTER_* thresholds, counting the AI calls it saves.
+
+        The decode and pixel statistics run in the image process pool like `optimize_image_async`, off the event loop.
+        """
+        if not config.IMAGE_PREFILTER_ENABLED:
+            return None
+        try:
+            trivial = await self._run_in_image_worker(
+                classify_trivial_image,
+                contents,
+                config.IMAGE_PREFILTER_MAX_SPACER_PIXELS,
+                config.IMAGE_PREFILTER_MAX_COLOR_STDDEV,
+                config.IMAGE_PREFILTER_MAX_ENTROPY,
+                config.IMAGE_PREFILTER_ICON_MAX_DIMENSION,
+                config.IMAGE_PREFILTER_ICON_ALT_TEXT,
+            )
+        except Exception as e:
+            # the model can still describe what the pre-filter couldn't read
+            logger.warning(f"Trivial image pre-filter failed, describing the image with the AI model: {e}")
+            return None
+        if trivial:
+            self.prefilter_stats[trivial.kind] += 1
+        return trivial
+
+    async def find_reusable_alt_text(self, contents: bytes) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Alt text cached for these optimized image bytes or a near-duplicate of them, if any.
+
+        Also returns the cache entry (cache_key, model, generation_key, perceptual_hash) that `remember_alt_text`
+        stores newly generated alt text under. Any deployment of the pool may answer, so the model is the pool's
+        `model_signature`.
+        """
+        model = self.alt_text_processor.deployment_pool.model_signature()
+        prompt, temperature = config.AZURE_ALT_TEXT_PROMPT, config.AZURE_ALT_TEXT_TEMPERATURE
+        cache_entry: Dict[str, Any] = {
+            'cache_key': alt_text_cache_key(contents, model, prompt, temperature),
+            'model': model,
+            'generation_key': generation_settings_key(model, prompt, temperature),
+            'perceptual_hash': None,
+        }
+        cached_alt_text = await sync_to_async(self.alt_text_cache.get)(cache_entry['cache_key'])
+        if cached_alt_text:
+            return cached_alt_text, cache_entry
+
+        # Look for a near-duplicate (re-exported or resized copy) before generating
+        if self.alt_text_cache.enabled and self.alt_text_cache.similar_matching:
+            cache_entry['perceptual_hash'] = self._perceptual_hash(contents)
+            similar_alt_text = await sync_to_async(self.alt_text_cache.get_similar)(
+                cache_entry['perceptual_hash'], cache_entry['generation_key']
+            )
+            if similar_alt_text:
+                return similar_alt_text, cache_entry
+        return None, cache_entry
+
+    def remember_alt_text(self, alt_text: Optional[str], cache_entry: Dict[str, Any]) -> None:
+        """Cache generated alt text under the entry returned by `find_reusable_alt_text`."""
+        if alt_text:
+            # batch jobs submitted before cache entries carried their model were keyed by the pool's models too
+            model = cache_entry.get('model') or self.alt_text_processor.deployment_pool.model_signature()
+            self.alt_text_cache.set(
+                cache_entry['cache_key'], model, alt_text,
+                cache_entry['generation_key'], cache_entry['perceptual_hash']
+            )
+
+    @staticmethod
+    def _perceptual_hash(contents: bytes) -> int:
+        pil_image = Image.open(io.BytesIO(contents))
+        # the hash only needs a 9x8 thumbnail, so let JPEG decode at the smallest DCT scale that covers it
+        pil_image.draft('L', (DHASH_SIZE * 8, DHASH_SIZE * 8))
+        return dhash(pil_image)
 
     @log_execution_time
     def _process_images_concurrently(self, image_models: List[ImageItem]) -> List[Dict[str, Any]]:
         """Process images concurrently: fetch content and generate alt text for each, bounded.
 
         - Uses asyncio.Semaphore to limit concurrent in-flight image processing tasks (from settings IMAGE_PROCESSING_CONCURRENCY)
-        - Each task fetches image content (async) then generates alt text (in thread)
+        - Each task fetches image content then generates alt text on the pooled async AI client
         - Returns a list of dicts: {'img': ImageItem, 'alt_text': str|Exception}
         """
         concurrency = config.IMAGE_PROCESSING_CONCURRENCY
         return async_to_sync(self._worker_async)(image_models, concurrency)
 
-    # https://www.buildwithmatija.com/blog/reduce-image-sizes-ai-processing-costs#the-smart-optimization-strategy
-    def get_optimized_images(self, image_content, image_id):
-        original_size = len(image_content)
+    def get_optimized_images(self, image_content: Union[bytes, IO[bytes]], image_id):
+        """Optimize an image in this process. Scans use `optimize_image_async`, which keeps the work off the event loop."""
+        if not isinstance(image_content, (bytes, bytearray)):
+            image_content.seek(0)
+            image_content = image_content.read()
         try:
-            # Open with PIL
-            img = Image.open(io.BytesIO(image_content))
-            original_dimensions = img.size
-            original_format = img.format
-
-            # Calculate optimal dimensions
-            new_width, new_height = self._calculate_optimal_size(img.size)
-
-            # Resize if necessary
-            if max(img.size) > self.max_dimension:
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                was_resized = True
-            else:
-                was_resized = False
-
-            # Convert to RGB if necessary (handles RGBA, P, etc.)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                # Create white background for transparency
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-                img = background
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-
-            # Save optimized image to bytes buffer
-            output_buffer = io.BytesIO()
-            img.save(output_buffer, format='JPEG', quality=self.jpeg_quality, optimize=True)
-            optimized_bytes = output_buffer.getvalue()
-            optimized_size = len(optimized_bytes)
-
-            # Calculate metrics
-            size_reduction_percent = ((original_size - optimized_size) / original_size) * 100
-
-            metrics = {
-                'original_size_bytes': original_size,
-                'optimized_size_bytes': optimized_size,
-                'size_reduction_percent': round(size_reduction_percent, 2),
-                'original_dimensions': original_dimensions,
-                'optimized_dimensions': (new_width, new_height) if was_resized else original_dimensions,
-                'was_resized': was_resized,
-                'original_format': original_format,
-                'optimized_format': 'JPEG'
-            }
-
-            logger.debug(f"Optimization metrics for {image_id}: {metrics}")
-            logger.info(
-                f"Optimized {image_id}: {original_size} \u2192 {optimized_size} bytes "
-                f"({size_reduction_percent:.1f}% reduction)"
-            )
-            return optimized_bytes
-
+            optimized_bytes, metrics = optimize_image(bytes(image_content), self.max_dimension, self.jpeg_quality)
         except Exception as e:
             logger.error(f"Failed to optimize image with ID {image_id} due to {e}")
             raise e
+        self._log_optimization_metrics(image_id, metrics)
+        return optimized_bytes
 
-    def _calculate_optimal_size(self, original_size: Tuple[int, int]) -> Tuple[int, int]:
-        """Calculate optimal dimensions maintaining aspect ratio."""
-        width, height = original_size
-
-        if max(width, height) <= self.max_dimension:
-            return width, height
-
-        if width > height:
-            new_width = self.max_dimension
-            new_height = int(height * (self.max_dimension / width))
-        else:
-            new_height = self.max_dimension
-            new_width = int(width * (self.max_dimension / height))
+    async def optimize_image_async(self, image_content: Union[bytes, str], image_id) -> bytes:
+        """Decode, resize and encode in the shared image process pool (IMAGE_PROCESSING_WORKERS) so the loop only does I/O.
 
-        return new_width, new_height
\ No newline at end of file
+        `image_content` is the encoded image or the path of a file holding it, which the worker reads itself.
+        """
+        try:
+            optimized_bytes, metrics = await self._run_in_image_worker(
+                optimize_image, image_content, self.max_dimension, self.jpeg_quality
+            )
+        except BrokenProcessPool as e:
+            logger.error(f"Image worker process died while optimizing image with ID {image_id}: {e}")
+            raise e
+        except Exception as e:
+            logger.error(f"Failed to optimize image with ID {image_id} due to {e}")
+            raise e
+        self._log_optimization_metrics(image_id, metrics)
+        return optimized_bytes
+
+    @staticmethod
+    async def _run_in_image_worker(fn, *args):
+        """Run `fn(*args)` in the shared image process pool, or on a thread when IMAGE_PROCESSING_WORKERS is 0."""
+        pool = get_image_process_pool(config.IMAGE_PROCESSING_WORKERS)
+        if pool is None:
+            return await asyncio.to_thread(fn, *args)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            # a worker died (e.g. killed while decoding a huge image), start a fresh pool for the next image
+            shutdown_image_process_pool()
+            raise
+
+    @staticmethod
+    def _log_optimization_metrics(image_id, metrics: Dict[str, Any]) -> None:
+        logger.debug(f"Optimization metrics for {image_id}: {metrics}")
+        logger.info(
+            f"Optimized {image_id}: {metrics['original_size_bytes']} \u2192 {metrics['optimized_size_bytes']} bytes "
+            f"({metrics['size_reduction_percent']:.1f}% reduction)"
+        )
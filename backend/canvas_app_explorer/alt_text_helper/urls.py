@@ -9,6 +9,18 @@ urlpatterns = [
             'get':'get_last_scan'}),
         name='alt_text_start_scan'
     ),
+    path(
+        'scan/retry-failed',
+        views.AltTextScanViewSet.as_view({
+            'post': 'retry_failed_images'}),
+        name='alt_text_retry_failed_images'
+    ),
+    path(
+        'scan/telemetry',
+        views.AltTextScanViewSet.as_view({
+            'get': 'get_scan_telemetry'}),
+        name='alt_text_scan_telemetry'
+    ),
     path(
         'content-images',
         views.AltTextContentGetAndUpdateViewSet.as_view({
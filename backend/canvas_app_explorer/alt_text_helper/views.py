@@ -1,13 +1,13 @@
 
 from http import HTTPStatus
 import logging
-from canvasapi import Canvas
 
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import authentication, permissions, viewsets
 from rest_framework.request import Request
 from rest_framework.response import Response
 from django.urls import reverse
+from django.utils.dateparse import parse_datetime
 from rest_framework_tracking.mixins import LoggingMixin
 from django_q.tasks import async_task
 from django.db.utils import DatabaseError
@@ -18,6 +18,9 @@ from backend.canvas_app_explorer.canvas_lti_manager.django_factory import Django
 from backend.canvas_app_explorer.models import CourseScan, CourseScanStatus
 from backend.canvas_app_explorer.serializers import ContentQuerySerializer, ReviewContentItemSerializer
 from backend.canvas_app_explorer.alt_text_helper.alt_text_update import AltTextUpdate, ContentPayload
+from backend.canvas_app_explorer.alt_text_helper.canvas_async_client import CanvasAsyncClient
+from backend.canvas_app_explorer.alt_text_helper.process_content_images import retryable_failed_images
+from backend.canvas_app_explorer.alt_text_helper.alt_text_telemetry import summarize_alt_text_calls
 
 logger = logging.getLogger(__name__)
 
@@ -72,6 +75,62 @@ class AltTextScanViewSet(LoggingMixin, CourseIdRequiredMixin, viewsets.ViewSet):
             logger.error(message)
             return Response(status=HTTPStatus.INTERNAL_SERVER_ERROR, data={"status_code": HTTPStatus.INTERNAL_SERVER_ERROR, "message": message})
     
+    def retry_failed_images(self, request: Request) -> Response:
+        """Start generating alt text again for the images that failed in the last scan, right away."""
+        course_id, error_resp = self._require_course_id(request)
+        if error_resp:
+            return error_resp
+
+        task_payload = {
+            'course_id': course_id,
+            'user_id': request.user.id,
+            'canvas_callback_url': request.build_absolute_uri(reverse('canvas-oauth-callback')),
+            'respect_backoff': False,
+        }
+        try:
+            image_count = retryable_failed_images(int(course_id)).count()
+            if image_count == 0:
+                return Response({'course_id': course_id, 'image_count': 0}, status=HTTPStatus.OK)
+            task_id = async_task('backend.canvas_app_explorer.alt_text_helper.background_tasks.canvas_tools_alt_text_scan.retry_failed_course_images', task=task_payload)
+            logger.info(f"Started retry of {image_count} failed images task {task_id} for course_id: {course_id}")
+            resp = {
+                    'course_id': course_id,
+                    'q_task_id': str(task_id),
+                    'image_count': image_count,
+                }
+            return Response(resp, status=HTTPStatus.OK)
+        except (DatabaseError, Exception) as e:
+            message = f"Failed to initiate retry of failed images due to {e}"
+            logger.error(message)
+            return Response(status=HTTPStatus.INTERNAL_SERVER_ERROR, data={"status_code": HTTPStatus.INTERNAL_SERVER_ERROR, "message": message})
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='since', description='Only count alt text calls made at or after this ISO 8601 datetime', required=False, type=str),
+        ]
+    )
+    def get_scan_telemetry(self, request: Request) -> Response:
+        """Token usage, estimated cost, latency percentiles and retries of the course's alt text calls."""
+        course_id, error_resp = self._require_course_id(request)
+        if error_resp:
+            return error_resp
+        params = getattr(request, 'query_params', request.GET)
+        since = None
+        if params.get('since'):
+            try:
+                since = parse_datetime(params['since'])
+            except ValueError:
+                since = None
+            if since is None:
+                message = f"Invalid since datetime {params['since']}"
+                return Response(status=HTTPStatus.BAD_REQUEST, data={"status_code": HTTPStatus.BAD_REQUEST, "message": message})
+        try:
+            return Response(summarize_alt_text_calls(int(course_id), since), status=HTTPStatus.OK)
+        except (DatabaseError, Exception) as e:
+            message = f"Failed to retrieve alt text telemetry for course_id {course_id} due to {e}"
+            logger.error(message)
+            return Response(status=HTTPStatus.INTERNAL_SERVER_ERROR, data={"status_code": HTTPStatus.INTERNAL_SERVER_ERROR, "message": message})
+
     def get_last_scan(self, request: Request) -> Response:
         course_id, error_resp = self._require_course_id(request)
         if error_resp:
@@ -194,8 +253,8 @@ class AltTextContentGetAndUpdateViewSet(LoggingMixin, CourseIdRequiredMixin, vie
              content_types = list({item.get('content_type') for item in serializer.validated_data if item.get('content_type')})
              logger.info(f"Processing alt text update for course_id {course_id} and content_types {content_types}")
              manager = MANAGER_FACTORY.create_manager(request)
-             canvas_api: Canvas = manager.canvas_api
-             service = AltTextUpdate(course_id, canvas_api, serializer.validated_data, content_types)
+             canvas = CanvasAsyncClient(manager.api_url, manager.api_key)
+             service = AltTextUpdate(course_id, canvas, serializer.validated_data, content_types)
              results_from_alt_text_update: bool|List[ContentPayload] = service.process_alt_text_update()
              
              if results_from_alt_text_update is True:
@@ -55,3 +55,25 @@ class ImageContentExtractionException(Exception):
         self.errors = errors
         super().__init__(f"Image content extraction failed with {len(errors)} errors {errors}")
 
+
+class ImageRejectedException(Exception):
+    """Raised when an image is skipped before alt text generation, e.g. it is too large or not an image.
+
+    Attributes:
+        reason (str): why the image was rejected, recorded on its ImageItem
+    """
+    def __init__(self, reason):
+        self.reason = reason
+        super().__init__(reason)
+
+
+class AltTextBatchException(Exception):
+    """Raised for an image whose request in an Azure OpenAI batch job failed or got no result."""
+
+
+class AltTextRequestTimeout(Exception):
+    """Raised when an alt text request to a deployment got no answer within AZURE_CALL_DEADLINE_SECONDS."""
+
+
+class ScanDeadlineExceeded(Exception):
+    """Raised for an image whose alt text wasn't generated before the course scan's deadline (COURSE_SCAN_DEADLINE_SECONDS)."""
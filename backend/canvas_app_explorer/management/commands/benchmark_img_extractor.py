@@ -0,0 +1,77 @@
+import timeit
+from typing import List
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend.canvas_app_explorer.alt_text_helper.background_tasks.canvas_tools_alt_text_scan import (
+    IMAGE_EXTENSIONS, _parse_canvas_file_src, extract_images_from_html
+)
+
+
+def extract_images_with_beautifulsoup(html_content: str) -> List[str]:
+    """The previous tree-building extractor, kept here as the benchmark baseline."""
+    if not html_content:
+        return []
+    soup = BeautifulSoup(html_content, "html.parser")
+    images_found = []
+    for img in soup.find_all("img"):
+        img_src = img.get("src")
+        img_alt = (img.get("alt") or "").strip()
+        img_role = (img.get("role") or "").strip().lower()
+        if img_role == "presentation":
+            continue
+        if img_alt and not img_alt.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        if settings.CANVAS_OAUTH_CANVAS_DOMAIN in urlparse(img_src).netloc:
+            images_found.append(_parse_canvas_file_src(img_src))
+        else:
+            images_found.append(img_src)
+    return images_found
+
+
+def build_page(paragraphs: int) -> str:
+    """A page body shaped like large Canvas content: mostly text and tables with an image every few blocks."""
+    domain = settings.CANVAS_OAUTH_CANVAS_DOMAIN
+    blocks = []
+    for i in range(paragraphs):
+        blocks.append(
+            f'<p>Paragraph {i} with <strong>bold</strong>, <a href="https://example.com/{i}">a link</a> '
+            f'and <span style="color: #333;">styled text</span> &amp; entities.</p>'
+            f'<table><tr><td>Cell {i}</td><td>Value {i}</td></tr></table>'
+        )
+        if i % 3 == 0:
+            blocks.append(
+                f'<img src="https://{domain}/courses/1/files/{i}/preview?verifier=abc" alt="upload_{i}.png" />'
+            )
+        elif i % 3 == 1:
+            blocks.append(f'<img src="https://example.com/image_{i}.jpg">')
+        else:
+            blocks.append(f'<img src="https://example.com/decorative_{i}.png" role="presentation" alt="">')
+    return f'<div>{"".join(blocks)}</div>'
+
+
+#  manage.py benchmark_img_extractor --paragraphs 2000 --number 20
+class Command(BaseCommand):
+    help = 'Benchmark the img tag tokenizer used by course scans against a BeautifulSoup tree parse'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--paragraphs', type=int, default=2000, help="Text blocks in the generated page")
+        parser.add_argument('--number', type=int, default=20, help="Extractions timed per implementation")
+
+    def handle(self, *args, **options):
+        html = build_page(options['paragraphs'])
+        number = options['number']
+
+        if extract_images_from_html(html) != extract_images_with_beautifulsoup(html):
+            self.stderr.write(self.style.ERROR('Extractors disagree on the generated page'))
+            return
+
+        tokenizer_seconds = timeit.timeit(lambda: extract_images_from_html(html), number=number) / number
+        soup_seconds = timeit.timeit(lambda: extract_images_with_beautifulsoup(html), number=number) / number
+        self.stdout.write(f'Page size: {len(html) / 1024:.0f} KiB, images kept: {len(extract_images_from_html(html))}')
+        self.stdout.write(f'BeautifulSoup: {soup_seconds * 1000:.2f} ms per page')
+        self.stdout.write(f'Tokenizer:     {tokenizer_seconds * 1000:.2f} ms per page')
+        self.stdout.write(self.style.SUCCESS(f'Speedup: {soup_seconds / tokenizer_seconds:.1f}x'))
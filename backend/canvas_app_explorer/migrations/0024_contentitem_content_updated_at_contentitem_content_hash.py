@@ -0,0 +1,23 @@
+# Generated by Django 4.2.27 on 2026-10-16 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('canvas_app_explorer', '0023_alter_coursescan_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contentitem',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='contentitem',
+            name='content_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.27 on 2026-10-16 21:10
+
+import django.core.validators
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('canvas_app_explorer', '0024_contentitem_content_updated_at_contentitem_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AltTextCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('cache_key', models.CharField(max_length=64, unique=True)),
+                ('model', models.CharField(max_length=100)),
+                ('alt_text', models.TextField(validators=[django.core.validators.MaxLengthValidator(2000)])),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'canvas_app_explorer_alt_text_cache_entry',
+            },
+        ),
+    ]
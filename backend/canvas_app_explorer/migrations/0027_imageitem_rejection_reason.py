@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-16 22:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('canvas_app_explorer', '0026_alttextcacheentry_perceptual_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageitem',
+            name='rejection_reason',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.27 on 2026-10-16 22:30
+
+from django.db import migrations, models
+
+
+def mark_images_with_alt_text_completed(apps, schema_editor):
+    ImageItem = apps.get_model('canvas_app_explorer', 'ImageItem')
+    ImageItem.objects.filter(image_alt_text__isnull=False).update(processing_status='completed')
+    ImageItem.objects.filter(rejection_reason__isnull=False).update(processing_status='rejected')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('canvas_app_explorer', '0027_imageitem_rejection_reason'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageitem',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('rejected', 'Rejected'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='imageitem',
+            name='attempt_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='imageitem',
+            name='last_error',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='imageitem',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='coursescan',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('failed', 'Failed'), ('completed', 'Completed'), ('completed_with_errors', 'Completed with errors')], default='pending', max_length=50),
+        ),
+        migrations.RunPython(mark_images_with_alt_text_completed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.27 on 2026-10-16 22:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('canvas_app_explorer', '0028_imageitem_processing_status_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AltTextBatchJob',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('batch_id', models.CharField(max_length=255, unique=True)),
+                ('input_file_id', models.CharField(max_length=255)),
+                ('status', models.CharField(max_length=50)),
+                ('request_count', models.PositiveIntegerField(default=0)),
+                ('requests', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('course', models.ForeignKey(db_column='course_id', on_delete=django.db.models.deletion.CASCADE, related_name='alt_text_batch_jobs', to='canvas_app_explorer.coursescan', to_field='course_id')),
+            ],
+            options={
+                'db_table': 'canvas_app_explorer_alt_text_batch_job',
+            },
+        ),
+    ]
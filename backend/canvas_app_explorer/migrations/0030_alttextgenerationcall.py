@@ -0,0 +1,37 @@
+# Generated by Django 4.2.27 on 2026-10-16 23:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('canvas_app_explorer', '0029_alttextbatchjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AltTextGenerationCall',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('deployment', models.CharField(max_length=255)),
+                ('model', models.CharField(max_length=100)),
+                ('image_count', models.PositiveSmallIntegerField(default=1)),
+                ('image_bytes', models.PositiveIntegerField(default=0)),
+                ('image_max_dimension', models.PositiveIntegerField()),
+                ('image_jpeg_quality', models.PositiveSmallIntegerField()),
+                ('prompt_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('completion_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('latency_ms', models.PositiveIntegerField()),
+                ('wait_ms', models.PositiveIntegerField(default=0)),
+                ('retries', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('course', models.ForeignKey(db_column='course_id', on_delete=django.db.models.deletion.CASCADE, related_name='alt_text_generation_calls', to='canvas_app_explorer.coursescan', to_field='course_id')),
+            ],
+            options={
+                'db_table': 'canvas_app_explorer_alt_text_generation_call',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-17 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('canvas_app_explorer', '0030_alttextgenerationcall'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='imageitem',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('rejected', 'Rejected'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-17 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('canvas_app_explorer', '0031_alter_imageitem_processing_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageitem',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.core.validators import MaxLengthValidator
 from django.db import models
+from django.utils import timezone
 from django.utils.deconstruct import deconstructible
 from django.utils.html import strip_tags
 from db_file_storage.model_utils import delete_file, delete_file_if_needed
@@ -65,6 +66,8 @@ class CourseScanStatus(models.TextChoices):
     RUNNING = "running", "Running"
     FAILED = "failed", "Failed"
     COMPLETED = "completed", "Completed"
+    # alt text generation failed for some images, those are retried without rescanning the course
+    COMPLETED_WITH_ERRORS = "completed_with_errors", "Completed with errors"
 
 
 class CourseScan(models.Model):
@@ -116,6 +119,10 @@ class ContentItem(models.Model):
     content_name = models.CharField(max_length=255, null=True, blank=True)
     # for quiz question
     content_parent_id = models.BigIntegerField(null=True, blank=True)
+    # Canvas `updated_at` of the content when it was scanned, watermark for incremental rescans
+    content_updated_at = models.DateTimeField(null=True, blank=True)
+    # sha256 of the scanned HTML body, catches edits that don't move `updated_at` (e.g. quiz questions)
+    content_hash = models.CharField(max_length=64, null=True, blank=True)
 
     class Meta:
         db_table = 'canvas_app_explorer_content_item'
@@ -124,6 +131,15 @@ class ContentItem(models.Model):
         return f"ContentItem(id={self.id}, course_id={self.course_id}, type={self.content_type}, content_name={self.content_name}, content_parent_id={self.content_parent_id})"
 
 
+class ImageItemStatus(models.TextChoices):
+    PENDING = "pending", "Pending"
+    COMPLETED = "completed", "Completed"
+    REJECTED = "rejected", "Rejected"
+    FAILED = "failed", "Failed"
+    # trivial image (spacer, solid colour, tiny icon) given canned alt text without an AI call
+    SKIPPED = "skipped", "Skipped"
+
+
 class ImageItem(models.Model):
     id = models.BigAutoField(primary_key=True)
     # FK to CourseScan using DB column `course_id`
@@ -145,9 +161,113 @@ class ImageItem(models.Model):
     image_url = models.URLField(max_length=2048)
     # optional alt text produced by AI or provided by user; limit to ~2000 characters
     image_alt_text = models.TextField(blank=True, null=True, validators=[MaxLengthValidator(2000)])
+    # why the image was skipped before alt text generation (too large, too many pixels, not an image)
+    rejection_reason = models.CharField(max_length=255, blank=True, null=True)
+    # outcome of the last alt text generation attempt, failed images are retried up to IMAGE_RETRY_MAX_ATTEMPTS
+    processing_status = models.CharField(max_length=20, default=ImageItemStatus.PENDING, choices=ImageItemStatus.choices)
+    # attempts since the last course scan, a scan counts as the first
+    attempt_count = models.PositiveIntegerField(default=0)
+    last_error = models.CharField(max_length=255, blank=True, null=True)
+    # failed images aren't retried before this (exponential backoff)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    # when the outcome of the last attempt was stored, places a skipped or failed image in a scan's window
+    processed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = 'canvas_app_explorer_image_item'
 
     def __str__(self):
         return f"ImageItem(id={self.id}, course_id={self.course_id}, content_item_id={self.content_item_id})"
+
+
+class AltTextCacheEntry(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    # sha256 of the optimized image bytes, model, prompt and temperature that produced the alt text
+    cache_key = models.CharField(max_length=64, unique=True)
+    model = models.CharField(max_length=100)
+    alt_text = models.TextField(validators=[MaxLengthValidator(2000)])
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # refreshed on every hit, entries unused for the TTL are evicted first
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+    # sha256 of model, prompt and temperature, near-duplicates only reuse alt text generated with the same settings
+    generation_key = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    # 64 bit dHash of the optimized image as hex, and its four 16 bit bands used to look up near-duplicates
+    perceptual_hash = models.CharField(max_length=16, null=True, blank=True)
+    phash_band_0 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    phash_band_1 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    phash_band_2 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    phash_band_3 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        db_table = 'canvas_app_explorer_alt_text_cache_entry'
+
+    def __str__(self):
+        return f"AltTextCacheEntry(id={self.id}, model={self.model}, hit_count={self.hit_count}, last_used_at={self.last_used_at})"
+
+
+class AltTextBatchJob(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    # FK to CourseScan using DB column `course_id`
+    course = models.ForeignKey(
+        CourseScan,
+        to_field='course_id',
+        on_delete=models.CASCADE,
+        db_column='course_id',
+        related_name='alt_text_batch_jobs',
+    )
+    # ids of the Azure OpenAI batch and of its uploaded JSONL input file
+    batch_id = models.CharField(max_length=255, unique=True)
+    input_file_id = models.CharField(max_length=255)
+    # Azure OpenAI batch status (validating, in_progress, finalizing, completed, failed, expired, cancelled...)
+    status = models.CharField(max_length=50)
+    request_count = models.PositiveIntegerField(default=0)
+    # custom_id of each request -> ImageItem ids it describes and the alt text cache keys of its image
+    requests = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # when the results were stored on the ImageItems
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'canvas_app_explorer_alt_text_batch_job'
+
+    def __str__(self):
+        return f"AltTextBatchJob(id={self.id}, course_id={self.course_id}, batch_id={self.batch_id}, status={self.status})"
+
+
+class AltTextGenerationCall(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    # FK to CourseScan using DB column `course_id`
+    course = models.ForeignKey(
+        CourseScan,
+        to_field='course_id',
+        on_delete=models.CASCADE,
+        db_column='course_id',
+        related_name='alt_text_generation_calls',
+    )
+    # pool deployment that answered (or last failed) the call and its model
+    deployment = models.CharField(max_length=255)
+    model = models.CharField(max_length=100)
+    # images described by the call and the size of their optimized bytes
+    image_count = models.PositiveSmallIntegerField(default=1)
+    image_bytes = models.PositiveIntegerField(default=0)
+    # image optimization settings the images were sent with
+    image_max_dimension = models.PositiveIntegerField()
+    image_jpeg_quality = models.PositiveSmallIntegerField()
+    # token usage reported by Azure OpenAI, unknown for failed calls
+    prompt_tokens = models.PositiveIntegerField(null=True, blank=True)
+    completion_tokens = models.PositiveIntegerField(null=True, blank=True)
+    # time spent in requests, and waiting for the rate limit budget
+    latency_ms = models.PositiveIntegerField()
+    wait_ms = models.PositiveIntegerField(default=0)
+    # SDK retries plus failovers to other deployments
+    retries = models.PositiveSmallIntegerField(default=0)
+    error = models.CharField(max_length=255, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'canvas_app_explorer_alt_text_generation_call'
+
+    def __str__(self):
+        return f"AltTextGenerationCall(id={self.id}, course_id={self.course_id}, deployment={self.deployment}, latency_ms={self.latency_ms})"
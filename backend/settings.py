@@ -362,9 +362,18 @@ Q_CLUSTER = {
     'retry': int(os.getenv('Q_CLUSTER_RETRY', 3600)), # 1hr
     'bulk': int(os.getenv('Q_CLUSTER_BULK', 5)),
     'max_attempts': int(os.getenv('Q_CLUSTER_MAX_ATTEMPTS', 1)),
+    # workers start the image optimization process pool (IMAGE_PROCESSING_WORKERS), daemonic processes can't have children
+    'daemonize_workers': os.getenv('Q_CLUSTER_DAEMONIZE_WORKERS', 'false').lower() in ('true', '1', 't'),
     'orm': 'default'
 }
 
+# Optimized image cache, shared by every worker process on the host
+OPTIMIZED_IMAGE_CACHE_DIR = os.getenv('OPTIMIZED_IMAGE_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'optimized_images'))
+
+# Where the Azure OpenAI rate limit budget is kept: 'redis' (the default cache) shares it between every Q worker,
+# 'local' keeps one per worker process
+AZURE_RATE_LIMIT_BACKEND = os.getenv('AZURE_RATE_LIMIT_BACKEND', 'redis')
+
 # Constance configuration for dynamic settings
 CONSTANCE_CONFIG = {
     'AZURE_API_KEY': (
@@ -399,6 +408,70 @@ option with no further explanation.""").strip(),
         float(os.getenv('AZURE_ALT_TEXT_TEMPERATURE', 0.0)),
         'Temperature for alt text generation: 0 = deterministic/consistent responses, 2 = maximum creativity/randomness'
     ),
+    'AZURE_ALT_TEXT_BATCH_SIZE': (
+        int(os.getenv('AZURE_ALT_TEXT_BATCH_SIZE', 1)),
+        'Images described together in one alt text request (sent once the batch fills or 0.2 seconds pass); 1 sends one request per image. Batches can\'t be larger than IMAGE_PROCESSING_CONCURRENCY'
+    ),
+    'AZURE_BATCH_MODE': (
+        os.getenv('AZURE_BATCH_MODE', 'false').lower() in ('true', '1', 't'),
+        'Generate the alt text of course scans with an Azure OpenAI Batch API job (results within 24 hours at lower cost) instead of live requests'
+    ),
+    'AZURE_BATCH_MODEL': (
+        os.getenv('AZURE_BATCH_MODEL', ''),
+        'Azure OpenAI global batch deployment used for batch jobs; empty uses AZURE_MODEL'
+    ),
+    'AZURE_BATCH_POLL_SECONDS': (
+        int(os.getenv('AZURE_BATCH_POLL_SECONDS', 300)),
+        'Seconds between checks of a running alt text batch job'
+    ),
+    'AZURE_REQUEST_TIMEOUT_SECONDS': (
+        float(os.getenv('AZURE_REQUEST_TIMEOUT_SECONDS', 60.0)),
+        'Seconds to wait for an alt text generation request before it is abandoned (and retried by the OpenAI client)'
+    ),
+    'AZURE_MAX_CONNECTIONS': (
+        int(os.getenv('AZURE_MAX_CONNECTIONS', 32)),
+        'Maximum open connections to Azure OpenAI per scan, shared by all in-flight alt text generations'
+    ),
+    'AZURE_CALL_DEADLINE_SECONDS': (
+        float(os.getenv('AZURE_CALL_DEADLINE_SECONDS', 90.0)),
+        'Hard limit on one alt text request to a deployment, including the OpenAI client\'s retries; '
+        'a request without an answer by then fails over to the next deployment'
+    ),
+    'AZURE_HEDGE_ENABLED': (
+        os.getenv('AZURE_HEDGE_ENABLED', 'false').lower() in ('true', '1', 't'),
+        'Send a duplicate of an alt text request that is slower than AZURE_HEDGE_PERCENTILE of recent requests '
+        'and use whichever answer arrives first'
+    ),
+    'AZURE_HEDGE_PERCENTILE': (
+        int(os.getenv('AZURE_HEDGE_PERCENTILE', 95)),
+        'Latency percentile of the scan\'s recent alt text requests after which a hedged duplicate is sent'
+    ),
+    'AZURE_EXTRA_DEPLOYMENTS': (
+        os.getenv('AZURE_EXTRA_DEPLOYMENTS', '[]'),
+        'JSON list of further Azure OpenAI deployments to balance alt text requests over, e.g. '
+        '[{"api_base": "https://other.openai.azure.com/", "model": "gpt-4o", "api_key": "...", "weight": 2}]. '
+        'Missing values are taken from the AZURE_* settings'
+    ),
+    'AZURE_DEPLOYMENT_EJECT_LATENCY_SECONDS': (
+        float(os.getenv('AZURE_DEPLOYMENT_EJECT_LATENCY_SECONDS', 30.0)),
+        'Average alt text request latency above which a deployment stops getting requests for a while'
+    ),
+    'AZURE_PROMPT_TOKEN_PRICE_PER_MILLION': (
+        float(os.getenv('AZURE_PROMPT_TOKEN_PRICE_PER_MILLION', 2.5)),
+        'Price of one million prompt (input) tokens, used for the estimated cost in alt text telemetry'
+    ),
+    'AZURE_COMPLETION_TOKEN_PRICE_PER_MILLION': (
+        float(os.getenv('AZURE_COMPLETION_TOKEN_PRICE_PER_MILLION', 10.0)),
+        'Price of one million completion (output) tokens, used for the estimated cost in alt text telemetry'
+    ),
+    'AZURE_REQUESTS_PER_MINUTE': (
+        int(os.getenv('AZURE_REQUESTS_PER_MINUTE', 300)),
+        'Requests per minute of the Azure OpenAI deployment, shared by every worker (0 = no limit)'
+    ),
+    'AZURE_TOKENS_PER_MINUTE': (
+        int(os.getenv('AZURE_TOKENS_PER_MINUTE', 50000)),
+        'Tokens per minute of the Azure OpenAI deployment, shared by every worker (0 = no limit)'
+    ),
     'IMAGE_MAX_DIMENSION': (
         int(os.getenv('IMAGE_MAX_DIMENSION', 512)),
         'Maximum dimension for image optimization (pixels)'
@@ -407,10 +480,100 @@ option with no further explanation.""").strip(),
         int(os.getenv('IMAGE_JPEG_QUALITY', 85)),
         'JPEG quality for image optimization (1-100)'
     ),
+    'IMAGE_MAX_DOWNLOAD_BYTES': (
+        int(os.getenv('IMAGE_MAX_DOWNLOAD_BYTES', 20 * 1024 * 1024)),
+        'Images larger than this many bytes are rejected without being downloaded in full'
+    ),
+    'IMAGE_MAX_PIXELS': (
+        int(os.getenv('IMAGE_MAX_PIXELS', 40_000_000)),
+        'Images with more pixels (width x height) than this are rejected before being decoded, guards against decompression bombs'
+    ),
+    'IMAGE_PREFILTER_ENABLED': (
+        os.getenv('IMAGE_PREFILTER_ENABLED', 'true').lower() in ('true', '1', 't'),
+        'Give spacers, solid colour images and tiny icons canned alt text without an AI call'
+    ),
+    'IMAGE_PREFILTER_MAX_SPACER_PIXELS': (
+        int(os.getenv('IMAGE_PREFILTER_MAX_SPACER_PIXELS', 4)),
+        'Images with at most this many pixels (width x height) are spacers or tracking pixels and marked decorative'
+    ),
+    'IMAGE_PREFILTER_MAX_COLOR_STDDEV': (
+        float(os.getenv('IMAGE_PREFILTER_MAX_COLOR_STDDEV', 3.0)),
+        'Images whose colour channels vary at most this much (standard deviation, 0-255) and whose entropy is '
+        'at most IMAGE_PREFILTER_MAX_ENTROPY are solid colour and marked decorative'
+    ),
+    'IMAGE_PREFILTER_MAX_ENTROPY': (
+        float(os.getenv('IMAGE_PREFILTER_MAX_ENTROPY', 1.0)),
+        'Grayscale entropy (bits) at most which a low-variance image counts as solid colour'
+    ),
+    'IMAGE_PREFILTER_ICON_MAX_DIMENSION': (
+        int(os.getenv('IMAGE_PREFILTER_ICON_MAX_DIMENSION', 16)),
+        'Images with neither side longer than this are icons and get IMAGE_PREFILTER_ICON_ALT_TEXT (0 = describe icons)'
+    ),
+    'IMAGE_PREFILTER_ICON_ALT_TEXT': (
+        os.getenv('IMAGE_PREFILTER_ICON_ALT_TEXT', ''),
+        'Alt text proposed for icons, empty marks them decorative'
+    ),
     'IMAGE_PROCESSING_CONCURRENCY': (
         int(os.getenv('IMAGE_PROCESSING_CONCURRENCY', 4)),
         'Number of concurrent image processing tasks (note: values over 4 were not tested and may timeout)'
     ),
+    'IMAGE_PROCESSING_CHUNK_SIZE': (
+        int(os.getenv('IMAGE_PROCESSING_CHUNK_SIZE', 200)),
+        'ImageItems loaded and processed at a time when generating alt text for a course; alt text is saved after each chunk'
+    ),
+    'IMAGE_RETRY_MAX_ATTEMPTS': (
+        int(os.getenv('IMAGE_RETRY_MAX_ATTEMPTS', 3)),
+        'Attempts (including the course scan) at generating alt text for an image before its failure is final'
+    ),
+    'IMAGE_RETRY_BACKOFF_SECONDS': (
+        int(os.getenv('IMAGE_RETRY_BACKOFF_SECONDS', 300)),
+        'Seconds before images that failed in a course scan are retried, doubled after every failed retry'
+    ),
+    'IMAGE_PROCESSING_WORKERS': (
+        int(os.getenv('IMAGE_PROCESSING_WORKERS', 2)),
+        'Worker processes per scan process that decode, resize and encode images; 0 optimizes on a thread in the scanning process instead'
+    ),
+    'OPTIMIZED_IMAGE_CACHE_ENABLED': (
+        os.getenv('OPTIMIZED_IMAGE_CACHE_ENABLED', 'true').lower() in ('true', '1', 't'),
+        'Keep optimized images on local disk and only download them again when the image server reports a change (ETag/Last-Modified)'
+    ),
+    'OPTIMIZED_IMAGE_CACHE_MAX_MB': (
+        int(os.getenv('OPTIMIZED_IMAGE_CACHE_MAX_MB', 1024)),
+        'Maximum size of the optimized image cache in megabytes, the least recently used images are evicted beyond this'
+    ),
+    'INCREMENTAL_COURSE_SCAN': (
+        os.getenv('INCREMENTAL_COURSE_SCAN', 'false').lower() in ('true', '1', 't'),
+        'Rescan only content that changed since the last course scan, keeping existing images and alt text for unchanged content'
+    ),
+    'STREAMING_COURSE_SCAN': (
+        os.getenv('STREAMING_COURSE_SCAN', 'false').lower() in ('true', '1', 't'),
+        'Start downloading images and generating alt text while Canvas content is still being fetched, instead of after the whole course is fetched'
+    ),
+    'COURSE_SCAN_DEADLINE_SECONDS': (
+        int(os.getenv('COURSE_SCAN_DEADLINE_SECONDS', Q_CLUSTER['timeout'] - 120)),
+        'Seconds after the start of a course scan task when it stops generating alt text, saves what is done and '
+        'leaves the remaining images to the failed image retry; keep it below the Q_CLUSTER timeout'
+    ),
+    'ALT_TEXT_CACHE_ENABLED': (
+        os.getenv('ALT_TEXT_CACHE_ENABLED', 'true').lower() in ('true', '1', 't'),
+        'Reuse alt text generated earlier for identical images (same optimized bytes, model, prompt and temperature), across courses'
+    ),
+    'ALT_TEXT_CACHE_TTL_DAYS': (
+        int(os.getenv('ALT_TEXT_CACHE_TTL_DAYS', 365)),
+        'Days an unused alt text cache entry is kept before it is evicted'
+    ),
+    'ALT_TEXT_CACHE_MAX_ENTRIES': (
+        int(os.getenv('ALT_TEXT_CACHE_MAX_ENTRIES', 200000)),
+        'Maximum alt text cache entries, the least recently used are evicted beyond this'
+    ),
+    'PERCEPTUAL_HASH_MATCHING': (
+        os.getenv('PERCEPTUAL_HASH_MATCHING', 'true').lower() in ('true', '1', 't'),
+        'Propose cached alt text for images that look the same as an earlier image (re-exported or resized) without calling the AI model'
+    ),
+    'PERCEPTUAL_HASH_MAX_DISTANCE': (
+        int(os.getenv('PERCEPTUAL_HASH_MAX_DISTANCE', 3)),
+        'Maximum differing bits (of 64) between perceptual hashes to treat two images as the same (values over 3 may miss some matches)'
+    ),
     'HELP_URL': (
         os.getenv('HELP_URL', 'https://github.com/tl-its-umich-edu/canvas-app-explorer'),
         'URL for external help resource'
@@ -420,5 +583,6 @@ option with no further explanation.""").strip(),
 # Use in-memory backend for constance during tests to avoid database migration issues
 if 'test' in sys.argv:
     CONSTANCE_BACKEND = 'constance.backends.memory.MemoryBackend'
+    AZURE_RATE_LIMIT_BACKEND = 'local'
 else:
     CONSTANCE_BACKEND = 'constance.backends.database.DatabaseBackend'
\ No newline at end of file
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import httpx
+from asgiref.sync import async_to_sync
+from constance.test import override_config
+from django.test import TestCase
+from backend.canvas_app_explorer.alt_text_helper.ai_processor import AltTextProcessor
+from backend.canvas_app_explorer.alt_text_helper.azure_deployment_pool import reset_deployment_pool
+
+
+def _completion(content):
+    return {
+        'id': 'chatcmpl-1',
+        'object': 'chat.completion',
+        'created': 0,
+        'model': 'gpt-4o',
+        'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': content}}],
+    }
+
+
+@override_config(AZURE_API_KEY='key', AZURE_API_BASE='https://azure.test', AZURE_MODEL='gpt-4o')
+class TestAltTextProcessorAsync(TestCase):
+    def setUp(self):
+        # deployment health and rate limit counters would otherwise carry over between tests
+        reset_deployment_pool()
+
+    def test_async_session_shares_one_client(self):
+        """Generations in a session go through one pooled async client and send the image bytes as a data URL."""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json=_completion('A red square'))
+
+        processor = AltTextProcessor(transport=httpx.MockTransport(handler))
+        clients = []
+
+        async def generate():
+            async with processor.async_session():
+                results = []
+                for image_bytes in (b'first', b'second'):
+                    clients.append(processor._http_client)
+                    results.append(await processor.generate_alt_text_from_bytes_async(image_bytes))
+                return results
+
+        self.assertEqual(async_to_sync(generate)(), ['A red square', 'A red square'])
+        self.assertIs(clients[0], clients[1])
+        self.assertIsNone(processor._http_client)
+        self.assertEqual(requests[0].url.path, '/openai/deployments/gpt-4o/chat/completions')
+        image_url = json.loads(requests[0].content)['messages'][1]['content'][0]['image_url']['url']
+        self.assertEqual(image_url, 'data:image/jpeg;base64,Zmlyc3Q=')
+
+    def test_cancelling_a_generation_aborts_the_request(self):
+        """A cancelled generation stops waiting on the AI request and closes the session's client."""
+        started = []
+
+        async def handler(request):
+            started.append(request)
+            await asyncio.sleep(30)
+            return httpx.Response(200, json=_completion('Too late'))
+
+        processor = AltTextProcessor(transport=httpx.MockTransport(handler))
+
+        async def generate():
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(processor.generate_alt_text_from_bytes_async(b'image'), timeout=0.1)
+
+        async_to_sync(generate)()
+        self.assertEqual(len(started), 1)
+        self.assertIsNone(processor._http_client)
+
+    @override_config(AZURE_ALT_TEXT_BATCH_SIZE=2)
+    def test_batched_generation_sends_images_in_one_request(self):
+        """Concurrent generations are sent as one request and each caller gets its entry of the JSON answer."""
+        requests = []
+
+        def handler(request):
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, json=_completion(json.dumps({'alt_texts': ['A red square', 'A blue circle']})))
+
+        processor = AltTextProcessor(transport=httpx.MockTransport(handler))
+
+        async def generate():
+            async with processor.async_session():
+                return await asyncio.gather(
+                    processor.generate_alt_text_batched_async(b'red'),
+                    processor.generate_alt_text_batched_async(b'blue'),
+                )
+
+        self.assertEqual(async_to_sync(generate)(), ['A red square', 'A blue circle'])
+        self.assertEqual(len(requests), 1)
+        self.assertEqual(len(requests[0]['messages'][1]['content']), 2)
+        self.assertEqual(requests[0]['response_format'], {'type': 'json_object'})
+
+    @override_config(AZURE_ALT_TEXT_BATCH_SIZE=2)
+    def test_malformed_batch_answer_falls_back_to_single_requests(self):
+        """When the batched answer can't be mapped to the images, each image gets a request of its own."""
+        requests = []
+
+        def handler(request):
+            body = json.loads(request.content)
+            requests.append(body)
+            if 'response_format' in body:
+                return httpx.Response(200, json=_completion('A red square and a blue circle'))
+            image_url = body['messages'][1]['content'][0]['image_url']['url']
+            return httpx.Response(200, json=_completion(f'Single {image_url[-4:]}'))
+
+        processor = AltTextProcessor(transport=httpx.MockTransport(handler))
+
+        async def generate():
+            async with processor.async_session():
+                return await asyncio.gather(
+                    processor.generate_alt_text_batched_async(b'red'),
+                    processor.generate_alt_text_batched_async(b'blue'),
+                )
+
+        # base64 of b'red' and b'blue'
+        self.assertEqual(async_to_sync(generate)(), ['Single cmVk', 'Single ZQ=='])
+        self.assertEqual(len(requests), 3)
+
+    @override_config(AZURE_ALT_TEXT_BATCH_SIZE=2)
+    def test_closing_the_session_fails_unanswered_batches(self):
+        """Batches in flight are cancelled and images still waiting for a batch fail before the clients close."""
+        async def handler(request):
+            await asyncio.sleep(30)
+            return httpx.Response(200, json=_completion('Too late'))
+
+        processor = AltTextProcessor(transport=httpx.MockTransport(handler))
+
+        async def generate():
+            async with processor.async_session():
+                in_flight = [
+                    asyncio.ensure_future(processor.generate_alt_text_batched_async(image)) for image in (b'red', b'blue')
+                ]
+                await asyncio.sleep(0.05)
+                waiting = asyncio.ensure_future(processor.generate_alt_text_batched_async(b'green'))
+                await asyncio.sleep(0)
+            return await asyncio.gather(*in_flight, waiting, return_exceptions=True)
+
+        results = async_to_sync(generate)()
+        self.assertEqual([type(result) for result in results], [RuntimeError] * 3)
+        self.assertEqual(processor._batch_tasks, set())
+        self.assertIsNone(processor._http_client)
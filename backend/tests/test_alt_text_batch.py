@@ -0,0 +1,126 @@
+import io
+import json
+import tempfile
+import httpx
+from constance.test import override_config
+from django.test import TestCase, override_settings
+from PIL import Image
+from backend.canvas_app_explorer.alt_text_helper.alt_text_batch import AltTextBatch
+from backend.canvas_app_explorer.alt_text_helper.process_content_images import ProcessContentImages
+from backend.canvas_app_explorer.canvas_lti_manager.exception import ImageContentExtractionException
+from backend.canvas_app_explorer.models import CourseScan, ContentItem, ImageItem, ImageItemStatus
+
+
+class StandInBatchService:
+    """Minimal stand-in for the Azure OpenAI Files and Batch endpoints, answering each request with `answer(body)`."""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.input_lines = []
+        self.retrieved = 0
+
+    def handler(self, request):
+        path = request.url.path
+        if request.method == 'POST' and path == '/openai/files':
+            # the JSONL file is a part of the multipart body
+            self.input_lines = [
+                json.loads(line) for line in request.read().splitlines() if line.startswith(b'{"custom_id"')
+            ]
+            return httpx.Response(200, json=self._file('file-input', 'batch'))
+        if request.method == 'POST' and path == '/openai/batches':
+            return httpx.Response(200, json=self._batch('in_progress'))
+        if request.method == 'GET' and path == '/openai/batches/batch-1':
+            self.retrieved += 1
+            status = 'in_progress' if self.retrieved == 1 else 'completed'
+            return httpx.Response(200, json=self._batch(status, output_file_id='file-output' if status == 'completed' else None))
+        if request.method == 'GET' and path == '/openai/files/file-output/content':
+            return httpx.Response(200, content='\n'.join(json.dumps(self.answer(line)) for line in self.input_lines))
+        return httpx.Response(404)
+
+    @staticmethod
+    def _file(file_id, purpose):
+        return {'id': file_id, 'object': 'file', 'bytes': 0, 'created_at': 0, 'filename': 'alt_text_batch.jsonl',
+                'purpose': purpose, 'status': 'processed'}
+
+    @staticmethod
+    def _batch(status, output_file_id=None):
+        return {'id': 'batch-1', 'object': 'batch', 'endpoint': '/chat/completions', 'input_file_id': 'file-input',
+                'completion_window': '24h', 'created_at': 0, 'status': status, 'output_file_id': output_file_id,
+                'request_counts': {'total': 2, 'completed': 0, 'failed': 0}}
+
+
+def _image_bytes(color):
+    buf = io.BytesIO()
+    Image.new('RGB', (32, 32), color=color).save(buf, format='PNG')
+    return buf.getvalue()
+
+
+@override_config(
+    AZURE_API_KEY='key', AZURE_API_BASE='https://azure.test', AZURE_MODEL='gpt-4o', AZURE_BATCH_MODEL='gpt-4o-batch',
+    IMAGE_PREFILTER_ENABLED=False,
+)
+class TestAltTextBatch(TestCase):
+    def setUp(self):
+        self.course_id = 123456
+        course_scan = CourseScan.objects.create(course_id=self.course_id)
+        content_item = ContentItem.objects.create(course=course_scan, content_type='page', content_id=1, content_name='Page 1')
+        self.red = ImageItem.objects.create(course=course_scan, content_item=content_item, image_url='https://example.com/red.png')
+        self.blue = ImageItem.objects.create(course=course_scan, content_item=content_item, image_url='https://example.com/blue.png')
+        self.images = {'/red.png': _image_bytes((255, 0, 0)), '/blue.png': _image_bytes((0, 0, 255))}
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        settings_override = override_settings(OPTIMIZED_IMAGE_CACHE_DIR=cache_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _batch(self, service):
+        proc = ProcessContentImages(
+            course_id=self.course_id,
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, content=self.images[request.url.path])),
+        )
+        return AltTextBatch(proc, transport=httpx.MockTransport(service.handler))
+
+    def test_batch_job_results_are_stored_once_it_completes(self):
+        """Submitting writes one request per image, polling returns nothing until the batch has completed."""
+        def answer(line):
+            alt_text = 'A red square' if line['custom_id'] == f'image-{self.red.id}' else 'A blue square'
+            return {'custom_id': line['custom_id'], 'response': {'status_code': 200, 'body': {
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': alt_text}}]}}}
+
+        service = StandInBatchService(answer)
+        job, settled = self._batch(service).submit([self.red, self.blue])
+
+        self.assertEqual(settled, [])
+        self.assertEqual(job.request_count, 2)
+        self.assertEqual({line['body']['model'] for line in service.input_lines}, {'gpt-4o-batch'})
+
+        self.assertIsNone(self._batch(service).poll(job))
+        batch = self._batch(service)
+        gen_results = batch.poll(job)
+        batch.process_content_images.store_alt_text_results(gen_results)
+
+        self.assertEqual(job.status, 'completed')
+        self.assertIsNotNone(job.completed_at)
+        self.assertEqual(ImageItem.objects.get(id=self.red.id).image_alt_text, 'A red square')
+        self.assertEqual(ImageItem.objects.get(id=self.blue.id).image_alt_text, 'A blue square')
+
+    def test_failed_batch_request_marks_its_image_failed(self):
+        """A per-request error in the batch output records that image as failed, the others are still stored."""
+        def answer(line):
+            if line['custom_id'] == f'image-{self.blue.id}':
+                return {'custom_id': line['custom_id'], 'response': {'status_code': 400, 'body': {
+                    'error': {'message': 'content filtered'}}}}
+            return {'custom_id': line['custom_id'], 'response': {'status_code': 200, 'body': {
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': 'A red square'}}]}}}
+
+        service = StandInBatchService(answer)
+        job, _ = self._batch(service).submit([self.red, self.blue])
+        self._batch(service).poll(job)
+        batch = self._batch(service)
+        with self.assertRaises(ImageContentExtractionException):
+            batch.process_content_images.store_alt_text_results(batch.poll(job))
+
+        self.assertEqual(ImageItem.objects.get(id=self.red.id).image_alt_text, 'A red square')
+        blue = ImageItem.objects.get(id=self.blue.id)
+        self.assertEqual(blue.processing_status, ImageItemStatus.FAILED)
+        self.assertIn('content filtered', blue.last_error)
@@ -0,0 +1,93 @@
+import io
+import json
+from datetime import timedelta
+from unittest.mock import patch
+from constance.test import override_config
+from django.test import TestCase
+from django.utils import timezone
+from PIL import Image
+from backend.canvas_app_explorer.alt_text_helper.alt_text_cache import AltTextCache, alt_text_cache_key
+from backend.canvas_app_explorer.alt_text_helper.process_content_images import ProcessContentImages
+from backend.canvas_app_explorer.models import AltTextCacheEntry, CourseScan, ContentItem, ImageItem
+
+
+def _jpeg_bytes():
+    buf = io.BytesIO()
+    Image.new('RGB', (10, 10), color=(0, 128, 0)).save(buf, format='JPEG')
+    return buf.getvalue()
+
+
+class TestAltTextCache(TestCase):
+    def test_key_depends_on_generation_settings(self):
+        key = alt_text_cache_key(b'image', 'gpt-4o', 'prompt', 0.0)
+        self.assertEqual(key, alt_text_cache_key(b'image', 'gpt-4o', 'prompt', 0))
+        self.assertNotEqual(key, alt_text_cache_key(b'image', 'gpt-4o', 'prompt', 0.5))
+        self.assertNotEqual(key, alt_text_cache_key(b'image', 'gpt-4o', 'other prompt', 0.0))
+        self.assertNotEqual(key, alt_text_cache_key(b'image', 'gpt-4o-mini', 'prompt', 0.0))
+        self.assertNotEqual(key, alt_text_cache_key(b'other image', 'gpt-4o', 'prompt', 0.0))
+
+    def test_get_counts_hits_and_misses(self):
+        cache = AltTextCache()
+        self.assertIsNone(cache.get('missing'))
+        cache.set('key', 'gpt-4o', 'A red square')
+        self.assertEqual(cache.get('key'), 'A red square')
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'similar_hits': 0, 'hit_rate': 0.5})
+        self.assertEqual(AltTextCacheEntry.objects.get(cache_key='key').hit_count, 1)
+
+    @override_config(ALT_TEXT_CACHE_TTL_DAYS=30, ALT_TEXT_CACHE_MAX_ENTRIES=2)
+    def test_evict_removes_expired_then_least_recently_used(self):
+        now = timezone.now()
+        for i, age_days in enumerate([60, 3, 2, 1]):
+            AltTextCacheEntry.objects.create(
+                cache_key=f'key-{i}', model='gpt-4o', alt_text=f'alt {i}', last_used_at=now - timedelta(days=age_days)
+            )
+        cache = AltTextCache()
+        self.assertIsNone(cache.get('key-0'))
+
+        self.assertEqual(cache.evict(), 2)
+        self.assertEqual(set(AltTextCacheEntry.objects.values_list('cache_key', flat=True)), {'key-2', 'key-3'})
+
+    @override_config(IMAGE_PREFILTER_ENABLED=False)
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.ProcessContentImages.get_image_content_async')
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.AltTextProcessor.generate_alt_text_from_bytes_async')
+    def test_course_copy_reuses_cached_alt_text(self, mock_generate_alt, mock_get_content):
+        mock_get_content.return_value = _jpeg_bytes()
+        mock_generate_alt.return_value = 'A green square'
+
+        for course_id, content_id in [(1001, 1), (2002, 2)]:
+            course_scan = CourseScan.objects.create(course_id=course_id)
+            content_item = ContentItem.objects.create(
+                course=course_scan, content_type='page', content_id=content_id, content_name='Page'
+            )
+            ImageItem.objects.create(course=course_scan, content_item=content_item, image_url=f'https://example.com/{course_id}.png')
+            ProcessContentImages(course_id=course_id).retrieve_images_with_alt_text()
+
+        mock_generate_alt.assert_called_once()
+        self.assertEqual(
+            list(ImageItem.objects.order_by('course_id').values_list('image_alt_text', flat=True)),
+            ['A green square', 'A green square'],
+        )
+
+    @override_config(
+        IMAGE_PREFILTER_ENABLED=False, AZURE_MODEL='gpt-4o',
+        AZURE_EXTRA_DEPLOYMENTS=json.dumps([{'api_base': 'https://backup.test', 'model': 'gpt-4o-mini'}]),
+    )
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.ProcessContentImages.get_image_content_async')
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.AltTextProcessor.generate_alt_text_from_bytes_async')
+    def test_entries_are_keyed_by_every_model_of_the_pool(self, mock_generate_alt, mock_get_content):
+        """Alt text generated while another model could answer isn't reused once only the primary model is left."""
+        mock_get_content.return_value = _jpeg_bytes()
+        mock_generate_alt.return_value = 'A green square'
+        course_scan = CourseScan.objects.create(course_id=3003)
+        content_item = ContentItem.objects.create(course=course_scan, content_type='page', content_id=3, content_name='Page')
+        ImageItem.objects.create(course=course_scan, content_item=content_item, image_url='https://example.com/3003.png')
+
+        ProcessContentImages(course_id=3003).retrieve_images_with_alt_text()
+        self.assertEqual(AltTextCacheEntry.objects.get().model, 'gpt-4o+gpt-4o-mini')
+
+        with override_config(AZURE_EXTRA_DEPLOYMENTS='[]'):
+            ProcessContentImages(course_id=3003).retrieve_images_with_alt_text()
+        self.assertEqual(mock_generate_alt.call_count, 2)
+        self.assertEqual(
+            set(AltTextCacheEntry.objects.values_list('model', flat=True)), {'gpt-4o+gpt-4o-mini', 'gpt-4o'}
+        )
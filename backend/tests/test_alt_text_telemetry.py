@@ -0,0 +1,105 @@
+from datetime import timedelta
+import httpx
+from asgiref.sync import async_to_sync
+from constance.test import override_config
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+from backend.canvas_app_explorer.alt_text_helper.ai_processor import AltTextProcessor
+from backend.canvas_app_explorer.alt_text_helper.azure_deployment_pool import reset_deployment_pool
+from backend.canvas_app_explorer.alt_text_helper.alt_text_telemetry import (
+    AltTextCallRecord, save_alt_text_calls, summarize_alt_text_calls,
+)
+from backend.canvas_app_explorer.alt_text_helper.views import AltTextScanViewSet
+from backend.canvas_app_explorer.models import (
+    AltTextGenerationCall, ContentItem, CourseScan, ImageItem, ImageItemStatus,
+)
+
+
+User = get_user_model()
+
+
+@override_config(AZURE_PROMPT_TOKEN_PRICE_PER_MILLION=2.5, AZURE_COMPLETION_TOKEN_PRICE_PER_MILLION=10.0)
+class TestAltTextTelemetry(TestCase):
+    def setUp(self):
+        reset_deployment_pool()
+        self.course_scan = CourseScan.objects.create(course_id=4444)
+
+    @override_config(AZURE_API_KEY='key', AZURE_API_BASE='https://azure.test', AZURE_MODEL='gpt-4o')
+    def test_processor_records_tokens_and_deployment_of_each_call(self):
+        def handler(request):
+            return httpx.Response(200, json={
+                'id': 'chatcmpl-1', 'object': 'chat.completion', 'created': 0, 'model': 'gpt-4o',
+                'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': 'A red square'}}],
+                'usage': {'prompt_tokens': 300, 'completion_tokens': 12, 'total_tokens': 312},
+            })
+
+        processor = AltTextProcessor(transport=httpx.MockTransport(handler))
+        async_to_sync(processor.generate_alt_text_from_bytes_async)(b'red')
+
+        records = processor.drain_call_records()
+        self.assertEqual(len(records), 1)
+        record = records[0]
+        self.assertEqual((record.deployment, record.model), ('primary', 'gpt-4o'))
+        self.assertEqual((record.prompt_tokens, record.completion_tokens), (300, 12))
+        self.assertEqual((record.image_count, record.image_bytes, record.retries, record.error), (1, 3, 0, None))
+        self.assertGreater(record.latency_seconds, 0)
+        self.assertEqual(processor.drain_call_records(), [])
+
+    def test_summary_aggregates_calls_per_deployment_and_image_settings(self):
+        records = [
+            AltTextCallRecord(image_count=1, image_bytes=1000, deployment='primary', model='gpt-4o',
+                              prompt_tokens=400, completion_tokens=20, latency_seconds=latency / 1000)
+            for latency in range(100, 2100, 100)
+        ]
+        records.append(AltTextCallRecord(image_count=2, image_bytes=3000, deployment='backup', model='gpt-4o',
+                                         latency_seconds=5.0, retries=1, error='InternalServerError: unavailable'))
+        save_alt_text_calls(self.course_scan.course_id, records[:10], 512, 85)
+        save_alt_text_calls(self.course_scan.course_id, records[10:], 1024, 75)
+
+        summary = summarize_alt_text_calls(self.course_scan.course_id)
+
+        self.assertEqual((summary['calls'], summary['failed_calls'], summary['images']), (21, 1, 22))
+        self.assertEqual((summary['prompt_tokens'], summary['completion_tokens']), (8000, 400))
+        self.assertEqual(summary['estimated_cost'], 0.024)
+        self.assertEqual(summary['latency_ms'], {'p50': 1100, 'p95': 2000, 'max': 5000})
+        self.assertEqual(summary['retries'], 1)
+        self.assertEqual(summary['by_deployment']['backup']['failed_calls'], 1)
+        self.assertEqual(summary['by_image_settings']['512px_q85']['prompt_tokens_per_image'], 400)
+        self.assertEqual(summary['by_image_settings']['1024px_q75']['calls'], 11)
+
+    def test_skipped_trivial_images_are_counted_in_the_summary_window(self):
+        content_item = ContentItem.objects.create(course=self.course_scan, content_type='page', content_id=1, content_name='Page')
+        now = timezone.now()
+        for i, processed_at in enumerate([now - timedelta(days=7), now]):
+            ImageItem.objects.create(
+                course=self.course_scan, content_item=content_item, image_url=f'https://example.com/{i}.png',
+                processing_status=ImageItemStatus.SKIPPED, processed_at=processed_at,
+            )
+
+        self.assertEqual(summarize_alt_text_calls(self.course_scan.course_id)['skipped_trivial_images'], 2)
+        since = now - timedelta(hours=1)
+        self.assertEqual(summarize_alt_text_calls(self.course_scan.course_id, since)['skipped_trivial_images'], 1)
+
+    def test_telemetry_view_returns_course_summary(self):
+        save_alt_text_calls(self.course_scan.course_id, [
+            AltTextCallRecord(image_count=1, image_bytes=1000, deployment='primary', model='gpt-4o',
+                              prompt_tokens=400, completion_tokens=20, latency_seconds=1.5),
+        ], 512, 85)
+        self.assertEqual(AltTextGenerationCall.objects.get().latency_ms, 1500)
+        factory = APIRequestFactory()
+        user = User.objects.create_user(username='testuser', password='pw')
+
+        request = factory.get('/alt-text/scan/telemetry')
+        request.user = user
+        request.session = {'course_id': self.course_scan.course_id}
+        response = AltTextScanViewSet().get_scan_telemetry(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['calls'], 1)
+        self.assertEqual(response.data['total_tokens'], 420)
+
+        request = factory.get('/alt-text/scan/telemetry', {'since': 'yesterday'})
+        request.user = user
+        request.session = {'course_id': self.course_scan.course_id}
+        self.assertEqual(AltTextScanViewSet().get_scan_telemetry(request).status_code, 400)
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import time
+import httpx
+from asgiref.sync import async_to_sync
+from constance.test import override_config
+from django.test import TestCase
+from backend.canvas_app_explorer.alt_text_helper.ai_processor import AltTextProcessor
+from backend.canvas_app_explorer.alt_text_helper.azure_deployment_pool import (
+    AzureDeploymentPool, get_deployment_pool, reset_deployment_pool,
+)
+from backend.canvas_app_explorer.alt_text_helper.azure_rate_limiter import LocalBudgetStore
+from backend.canvas_app_explorer.canvas_lti_manager.exception import ScanDeadlineExceeded
+
+BACKUP_DEPLOYMENTS = json.dumps([{'name': 'backup', 'api_base': 'https://backup.test', 'model': 'gpt-4o-backup', 'weight': 2}])
+
+
+def _completion(content):
+    return {
+        'id': 'chatcmpl-1', 'object': 'chat.completion', 'created': 0, 'model': 'gpt-4o',
+        'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': content}}],
+    }
+
+
+@override_config(
+    AZURE_API_KEY='key', AZURE_API_BASE='https://azure.test', AZURE_MODEL='gpt-4o',
+    AZURE_EXTRA_DEPLOYMENTS=BACKUP_DEPLOYMENTS, AZURE_REQUESTS_PER_MINUTE=60, AZURE_TOKENS_PER_MINUTE=60000,
+)
+class TestAzureDeploymentPool(TestCase):
+    def setUp(self):
+        # deployment health would otherwise carry over between tests
+        reset_deployment_pool()
+
+    def test_extra_deployments_inherit_missing_settings(self):
+        pool = AzureDeploymentPool.from_config(store=LocalBudgetStore())
+        primary, backup = [pooled.deployment for pooled in pool.deployments]
+        self.assertEqual((primary.name, primary.api_base, primary.model), ('primary', 'https://azure.test', 'gpt-4o'))
+        self.assertEqual((backup.api_base, backup.model, backup.weight), ('https://backup.test', 'gpt-4o-backup', 2.0))
+        self.assertEqual(backup.api_key, 'key')
+
+    def test_choose_prefers_weighted_remaining_quota(self):
+        pool = AzureDeploymentPool.from_config(store=LocalBudgetStore())
+        primary, backup = pool.deployments
+        self.assertIs(pool.choose(exclude=set()), backup)
+        backup.rate_limiter.counters.last_remaining_tokens = 6000
+        self.assertIs(pool.choose(exclude=set()), primary)
+        self.assertIsNone(pool.choose(exclude={'primary', 'backup'}))
+
+    def test_failing_deployment_is_ejected(self):
+        pool = AzureDeploymentPool.from_config(store=LocalBudgetStore())
+        primary, backup = pool.deployments
+        for _ in range(3):
+            pool.record_failure(backup, ConnectionError('unreachable'), 1.0)
+
+        self.assertIs(pool.choose(exclude=set()), primary)
+        stats = pool.stats()
+        self.assertFalse(stats['backup']['healthy'])
+        self.assertEqual(stats['backup']['errors'], 3)
+        self.assertEqual(stats['backup']['ejections'], 1)
+        # with every deployment ejected the one coming back first still gets the call
+        for _ in range(3):
+            pool.record_failure(primary, ConnectionError('unreachable'), 1.0)
+        self.assertIs(pool.choose(exclude=set()), backup)
+
+    @override_config(AZURE_DEPLOYMENT_EJECT_LATENCY_SECONDS=5.0)
+    def test_slow_deployment_is_ejected(self):
+        pool = AzureDeploymentPool.from_config(store=LocalBudgetStore())
+        primary, backup = pool.deployments
+        pool.record_success(backup, 2.0)
+        self.assertIs(pool.choose(exclude=set()), backup)
+        pool.record_success(backup, 60.0)
+        self.assertIs(pool.choose(exclude=set()), primary)
+        self.assertEqual(pool.stats()['backup']['max_latency_seconds'], 60.0)
+
+    def test_processors_share_the_pool_and_its_health(self):
+        """A deployment ejected during one scan stays ejected for the next, until the deployment settings change."""
+        pool = get_deployment_pool()
+        backup = pool.deployments[1]
+        for _ in range(3):
+            pool.record_failure(backup, ConnectionError('unreachable'), 1.0)
+
+        processor = AltTextProcessor()
+        self.assertIs(processor.deployment_pool, pool)
+        self.assertFalse(processor.deployment_pool.stats()['backup']['healthy'])
+        with override_config(AZURE_EXTRA_DEPLOYMENTS='[]'):
+            self.assertIsNot(AltTextProcessor().deployment_pool, pool)
+
+    def test_generation_fails_over_to_the_next_deployment(self):
+        """A 5xx from the chosen deployment is retried on the other one and counted in its stats."""
+        hosts = []
+
+        def handler(request):
+            hosts.append(request.url.host)
+            if request.url.host == 'backup.test':
+                return httpx.Response(503, json={'error': {'message': 'unavailable'}})
+            return httpx.Response(200, json=_completion('A red square'))
+
+        processor = AltTextProcessor(transport=httpx.MockTransport(handler))
+        for pooled in processor.deployment_pool.deployments:
+            pooled.rate_limiter.store = LocalBudgetStore()
+
+        self.assertEqual(async_to_sync(processor.generate_alt_text_from_bytes_async)(b'red'), 'A red square')
+        self.assertEqual(hosts, ['backup.test', 'azure.test'])
+        stats = processor.deployment_pool.stats()
+        self.assertEqual(stats['backup']['errors'], 1)
+        self.assertIn('InternalServerError', stats['backup']['last_error'])
+        self.assertEqual((stats['primary']['requests'], stats['primary']['errors']), (1, 0))
+
+    @override_config(AZURE_CALL_DEADLINE_SECONDS=0.05)
+    def test_request_without_answer_by_the_deadline_fails_over(self):
+        async def handler(request):
+            if request.url.host == 'backup.test':
+                await asyncio.sleep(5)
+            return httpx.Response(200, json=_completion('A red square'))
+
+        processor = AltTextProcessor(transport=httpx.MockTransport(handler))
+        for pooled in processor.deployment_pool.deployments:
+            pooled.rate_limiter.store = LocalBudgetStore()
+
+        self.assertEqual(async_to_sync(processor.generate_alt_text_from_bytes_async)(b'red'), 'A red square')
+        stats = processor.deployment_pool.stats()
+        self.assertIn('AltTextRequestTimeout', stats['backup']['last_error'])
+        self.assertEqual(processor.drain_call_records()[0].retries, 1)
+
+    @override_config(AZURE_HEDGE_ENABLED=True, AZURE_HEDGE_PERCENTILE=95)
+    def test_slow_request_is_hedged_and_first_answer_wins(self):
+        hosts = []
+
+        async def handler(request):
+            hosts.append(request.url.host)
+            if request.url.host == 'backup.test':
+                await asyncio.sleep(5)
+            return httpx.Response(200, json=_completion(f'Answer from {request.url.host}'))
+
+        processor = AltTextProcessor(transport=httpx.MockTransport(handler))
+        for pooled in processor.deployment_pool.deployments:
+            pooled.rate_limiter.store = LocalBudgetStore()
+        self.assertIsNone(processor.deployment_pool.hedge_delay())
+        processor.deployment_pool.recent_latencies.extend([0.01] * 18 + [0.05] * 2)
+        self.assertEqual(processor.deployment_pool.hedge_delay(), 0.05)
+
+        self.assertEqual(async_to_sync(processor.generate_alt_text_from_bytes_async)(b'red'), 'Answer from azure.test')
+        self.assertEqual(hosts, ['backup.test', 'azure.test'])
+        stats = processor.deployment_pool.stats()
+        self.assertEqual((stats['primary']['hedged_requests'], stats['primary']['hedge_wins']), (1, 1))
+        # the slow request was cancelled, not counted as an error
+        self.assertEqual(stats['backup']['errors'], 0)
+        # the call's telemetry is the winning request's
+        record = processor.drain_call_records()[0]
+        self.assertEqual((record.deployment, record.model, record.error), ('primary', 'gpt-4o', None))
+        self.assertLess(record.latency_seconds, 1)
+
+    def test_generation_past_the_scan_deadline_is_not_sent(self):
+        hosts = []
+
+        async def handler(request):
+            hosts.append(request.url.host)
+            await asyncio.sleep(5)
+            return httpx.Response(200, json=_completion('A red square'))
+
+        processor = AltTextProcessor(transport=httpx.MockTransport(handler), deadline=time.monotonic() - 1)
+        with self.assertRaises(ScanDeadlineExceeded):
+            async_to_sync(processor.generate_alt_text_from_bytes_async)(b'red')
+        self.assertEqual(hosts, [])
+
+        processor.deadline = time.monotonic() + 0.05
+        for pooled in processor.deployment_pool.deployments:
+            pooled.rate_limiter.store = LocalBudgetStore()
+        with self.assertRaises(ScanDeadlineExceeded):
+            async_to_sync(processor.generate_alt_text_from_bytes_async)(b'red')
+        self.assertEqual(len(hosts), 1)
@@ -0,0 +1,83 @@
+import httpx
+from asgiref.sync import async_to_sync
+from constance.test import override_config
+from django.test import TestCase
+from openai import RateLimitError
+from backend.canvas_app_explorer.alt_text_helper.ai_processor import AltTextProcessor
+from backend.canvas_app_explorer.alt_text_helper.azure_deployment_pool import reset_deployment_pool
+from backend.canvas_app_explorer.alt_text_helper.azure_rate_limiter import AzureOpenAIRateLimiter, LocalBudgetStore
+
+
+def _headers(remaining_requests, remaining_tokens):
+    return {'x-ratelimit-remaining-requests': str(remaining_requests), 'x-ratelimit-remaining-tokens': str(remaining_tokens)}
+
+
+@override_config(AZURE_API_BASE='https://azure.test', AZURE_REQUESTS_PER_MINUTE=60, AZURE_TOKENS_PER_MINUTE=6000)
+class TestAzureOpenAIRateLimiter(TestCase):
+    def setUp(self):
+        # deployment health and rate limit counters would otherwise carry over between tests
+        reset_deployment_pool()
+
+    def _call(self, limiter, headers, total_tokens, estimated_tokens=1000):
+        async def call():
+            async with limiter.slot(estimated_tokens) as reservation:
+                await limiter.record_response(reservation, headers, total_tokens)
+        async_to_sync(call)()
+
+    def test_budget_waits_until_tokens_refill(self):
+        """A take larger than what is left returns the refill time and takes nothing."""
+        store = LocalBudgetStore()
+        self.assertEqual(store.take('budget', 60, 6000, 1, 5000), 0)
+        wait = store.take('budget', 60, 6000, 1, 2000)
+        self.assertAlmostEqual(wait, 10.0, delta=0.1)
+        self.assertEqual(store.take('budget', 60, 6000, 1, 1000), 0)
+
+    def test_workers_share_the_budget_reported_by_azure(self):
+        """Remaining quota reported to one worker lowers the budget every worker takes from."""
+        store = LocalBudgetStore()
+        first_worker = AzureOpenAIRateLimiter('gpt-4o', store=store)
+        second_worker = AzureOpenAIRateLimiter('gpt-4o', store=store)
+
+        self._call(first_worker, _headers(0, 5000), total_tokens=400)
+
+        self.assertGreater(store.take(second_worker.key, 60, 6000, 1, 0), 0)
+        self.assertEqual(first_worker.counters.tokens_used, 400)
+        self.assertEqual(first_worker.counters.last_remaining_requests, 0)
+
+    def test_concurrency_grows_with_headroom_and_halves_on_429(self):
+        limiter = AzureOpenAIRateLimiter('gpt-4o', store=LocalBudgetStore(), initial_concurrency=4, backoff_seconds=0)
+        self._call(limiter, _headers(50, 5000), total_tokens=400)
+        self.assertEqual(limiter.concurrency_limit, 5)
+        self._call(limiter, _headers(5, 5000), total_tokens=400)
+        self.assertEqual(limiter.concurrency_limit, 5)
+
+        request = httpx.Request('POST', 'https://azure.test/openai/deployments/gpt-4o/chat/completions')
+        throttled = httpx.Response(429, headers={'retry-after': '0'}, request=request)
+
+        async def call():
+            async with limiter.slot(1000):
+                raise RateLimitError('Too many requests', response=throttled, body=None)
+
+        with self.assertRaises(RateLimitError):
+            async_to_sync(call)()
+        self.assertEqual(limiter.concurrency_limit, 2)
+        self.assertEqual(limiter.counters.throttled_responses, 1)
+
+    @override_config(AZURE_API_KEY='key', AZURE_MODEL='gpt-4o')
+    def test_alt_text_processor_records_usage_and_quota(self):
+        """Generations go through the processor's limiter, which records the response headers and token usage."""
+        def handler(request):
+            return httpx.Response(200, headers=_headers(42, 4200), json={
+                'id': 'chatcmpl-1', 'object': 'chat.completion', 'created': 0, 'model': 'gpt-4o',
+                'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': 'A red square'}}],
+                'usage': {'prompt_tokens': 300, 'completion_tokens': 12, 'total_tokens': 312},
+            })
+
+        processor = AltTextProcessor(transport=httpx.MockTransport(handler))
+        rate_limiter = processor.deployment_pool.deployments[0].rate_limiter
+        rate_limiter.store = LocalBudgetStore()
+
+        self.assertEqual(async_to_sync(processor.generate_alt_text_from_bytes_async)(b'red'), 'A red square')
+        self.assertEqual(rate_limiter.counters.calls, 1)
+        self.assertEqual(rate_limiter.counters.tokens_used, 312)
+        self.assertEqual(rate_limiter.counters.last_remaining_tokens, 4200)
@@ -0,0 +1,54 @@
+import httpx
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from backend.canvas_app_explorer.alt_text_helper.canvas_async_client import AsyncCanvasCourse, CanvasAsyncClient
+from backend.canvas_app_explorer.canvas_lti_manager.exception import CanvasHTTPError
+
+
+def _canvas_handler(request: httpx.Request) -> httpx.Response:
+    path = request.url.path
+    if path == '/api/v1/courses/1/pages' and request.url.params.get('page') is None:
+        next_url = 'https://canvas.test/api/v1/courses/1/pages?page=2&per_page=100'
+        return httpx.Response(200, json=[{'page_id': 1}], headers={'Link': f'<{next_url}>; rel="next"'})
+    if path == '/api/v1/courses/1/pages':
+        return httpx.Response(200, json=[{'page_id': 2}])
+    if path == '/api/v1/courses/1/assignments/5' and request.method == 'PUT':
+        return httpx.Response(200, content=request.content)
+    return httpx.Response(404, json={'errors': [{'message': 'The specified resource does not exist.'}]})
+
+
+class TestCanvasAsyncClient(TestCase):
+    def setUp(self):
+        self.requests = []
+
+        def handler(request):
+            self.requests.append(request)
+            return _canvas_handler(request)
+
+        canvas = CanvasAsyncClient('https://canvas.test', 'token', transport=httpx.MockTransport(handler))
+        self.course = AsyncCanvasCourse(canvas, 1)
+
+    def test_pages_follow_link_header(self):
+        async def collect():
+            async with self.course.canvas:
+                return [p['page_id'] async for p in self.course.get_pages()]
+
+        self.assertEqual(async_to_sync(collect)(), [1, 2])
+        self.assertEqual(self.requests[0].url.params.get_list('include[]'), ['body'])
+        self.assertEqual(self.requests[0].headers['Authorization'], 'Bearer token')
+
+    def test_update_sends_json_body(self):
+        async def update():
+            async with self.course.canvas:
+                return await self.course.update_assignment(5, '<p>updated</p>')
+
+        self.assertEqual(async_to_sync(update)(), {'assignment': {'description': '<p>updated</p>'}})
+
+    def test_error_response_raises_canvas_http_error(self):
+        async def fetch():
+            async with self.course.canvas:
+                return [q async for q in self.course.get_quizzes()]
+
+        with self.assertRaises(CanvasHTTPError) as ctx:
+            async_to_sync(fetch)()
+        self.assertEqual(ctx.exception.status_code, 404)
@@ -0,0 +1,96 @@
+import asyncio
+import httpx
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from backend.canvas_app_explorer.alt_text_helper.canvas_async_client import AsyncCanvasCourse, CanvasAsyncClient
+from backend.canvas_app_explorer.alt_text_helper.canvas_rate_limiter import CanvasRateLimitScheduler, scheduler_for_token
+
+
+def _response(status_code=200, remaining=None, cost='1.5', content=b'[]'):
+    headers = {'X-Request-Cost': cost}
+    if remaining is not None:
+        headers['X-Rate-Limit-Remaining'] = str(remaining)
+    return httpx.Response(status_code, content=content, headers=headers)
+
+
+class TestCanvasRateLimitScheduler(TestCase):
+    def _record(self, scheduler, resp):
+        async def record():
+            async with scheduler.slot():
+                return scheduler.record_response(resp)
+        return async_to_sync(record)()
+
+    def test_concurrency_follows_remaining_quota(self):
+        scheduler = CanvasRateLimitScheduler(initial_concurrency=4, backoff_seconds=0)
+        self._record(scheduler, _response(remaining=650))
+        self.assertEqual(scheduler.concurrency_limit, 5)
+        self._record(scheduler, _response(remaining=100))
+        self.assertEqual(scheduler.concurrency_limit, 4)
+        self.assertEqual(scheduler.counters.concurrency_increases, 1)
+        self.assertEqual(scheduler.counters.concurrency_decreases, 1)
+        self.assertEqual(scheduler.counters.total_request_cost, 3.0)
+        self.assertEqual(scheduler.counters.last_remaining, 100.0)
+
+    def test_throttled_response_halves_concurrency(self):
+        scheduler = CanvasRateLimitScheduler(initial_concurrency=8, backoff_seconds=0)
+        throttled = self._record(scheduler, _response(403, remaining=0, content=b'403 Forbidden (Rate Limit Exceeded)'))
+        self.assertTrue(throttled)
+        self.assertEqual(scheduler.concurrency_limit, 4)
+        self.assertEqual(scheduler.counters.throttled_responses, 1)
+
+    def test_forbidden_without_rate_limit_is_not_throttling(self):
+        scheduler = CanvasRateLimitScheduler(backoff_seconds=0)
+        self.assertFalse(self._record(scheduler, _response(403, content=b'{"errors": [{"message": "forbidden"}]}')))
+        self.assertEqual(scheduler.counters.throttled_responses, 0)
+
+    def test_in_flight_requests_never_exceed_limit(self):
+        scheduler = CanvasRateLimitScheduler(initial_concurrency=2, max_concurrency=2, backoff_seconds=0)
+        in_flight = []
+        peak = []
+
+        async def request():
+            async with scheduler.slot():
+                in_flight.append(1)
+                peak.append(len(in_flight))
+                await asyncio.sleep(0)
+                in_flight.pop()
+
+        async def run():
+            await asyncio.gather(*[request() for _ in range(10)])
+
+        async_to_sync(run)()
+        self.assertEqual(max(peak), 2)
+
+    def test_client_retries_throttled_request(self):
+        responses = [
+            _response(403, remaining=0, content=b'403 Forbidden (Rate Limit Exceeded)'),
+            _response(200, remaining=300, content=b'[{"id": 1}]'),
+        ]
+        scheduler = CanvasRateLimitScheduler(backoff_seconds=0)
+        canvas = CanvasAsyncClient(
+            'https://canvas.test', 'token', transport=httpx.MockTransport(lambda request: responses.pop(0)),
+            scheduler=scheduler,
+        )
+        course = AsyncCanvasCourse(canvas, 1)
+
+        async def fetch():
+            async with canvas:
+                return [q async for q in course.get_quizzes()]
+
+        self.assertEqual(async_to_sync(fetch)(), [{'id': 1}])
+        self.assertEqual(scheduler.counters.retries, 1)
+        self.assertEqual(scheduler.counters.requests, 2)
+
+    def test_clients_with_the_same_token_share_a_scheduler(self):
+        first = CanvasAsyncClient('https://canvas.test', 'shared-token')
+        second = CanvasAsyncClient('https://canvas.test', 'shared-token')
+        other = CanvasAsyncClient('https://canvas.test', 'other-token')
+        self.assertIs(first.scheduler, second.scheduler)
+        self.assertIs(first.scheduler, scheduler_for_token('shared-token'))
+        self.assertIsNot(first.scheduler, other.scheduler)
+
+    def test_shared_scheduler_is_usable_from_each_event_loop(self):
+        scheduler = CanvasRateLimitScheduler(backoff_seconds=0)
+        self._record(scheduler, _response(remaining=300))
+        self._record(scheduler, _response(remaining=300))
+        self.assertEqual(scheduler.counters.requests, 2)
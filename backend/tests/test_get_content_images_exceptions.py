@@ -1,6 +1,7 @@
 from backend.canvas_app_explorer.alt_text_helper.process_content_images import ProcessContentImages
 from backend.canvas_app_explorer.canvas_lti_manager.exception import ImageContentExtractionException
 from backend.canvas_app_explorer.models import CourseScan, ContentItem, ImageItem
+from constance.test import override_config
 from django.test import TestCase
 
 
@@ -22,6 +23,7 @@ class DummyProcessImages(ProcessContentImages):
         buf.seek(0)
         return buf.getvalue()
 
+@override_config(IMAGE_PREFILTER_ENABLED=False)
 class TestGetContentImages(TestCase):
     def setUp(self):
         # Create CourseScan and ContentItem necessary for FK constraints
@@ -34,8 +36,11 @@ class TestGetContentImages(TestCase):
     def test_retrieve_images_updates_successful_and_raises_on_errors(self):
         proc = DummyProcessImages(course_id=1)
         # stub alt_text_generator to deterministic value
-        # The generate_alt_text receives a PIL Image object, not bytes
-        proc.alt_text_processor.generate_alt_text = lambda img: 'GENERATED'
+        # generate_alt_text_from_bytes_async receives the optimized JPEG bytes
+        async def generate_alt_text(image_bytes):
+            return 'GENERATED'
+
+        proc.alt_text_processor.generate_alt_text_from_bytes_async = generate_alt_text
 
         with self.assertRaises(ImageContentExtractionException) as cm:
             proc.retrieve_images_with_alt_text()
@@ -0,0 +1,102 @@
+import io
+from unittest.mock import patch
+from asgiref.sync import async_to_sync
+from constance.test import override_config
+from django.test import TestCase
+from PIL import Image, ImageDraw
+from backend.canvas_app_explorer.alt_text_helper import image_optimizer
+from backend.canvas_app_explorer.alt_text_helper.image_prefilter import (
+    TRIVIAL_IMAGE_ICON, TRIVIAL_IMAGE_SOLID, TRIVIAL_IMAGE_SPACER, classify_trivial_image,
+)
+from backend.canvas_app_explorer.alt_text_helper.process_content_images import ProcessContentImages
+from backend.canvas_app_explorer.models import CourseScan, ContentItem, ImageItem, ImageItemStatus
+
+
+def _image_bytes(image, image_format='PNG'):
+    buf = io.BytesIO()
+    image.save(buf, format=image_format)
+    return buf.getvalue()
+
+
+def _diagram(size):
+    image = Image.new('RGB', (size, size), 'white')
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([size // 10, size // 10, size // 2, size // 2], fill=(200, 30, 30))
+    draw.ellipse([size // 2, size // 2, size - 1, size - 1], fill=(30, 30, 200))
+    draw.line([0, size, size, 0], fill='black', width=3)
+    return image
+
+
+def _classify(contents):
+    return classify_trivial_image(
+        contents, max_spacer_pixels=4, max_color_stddev=3.0, max_entropy=1.0, icon_max_dimension=16,
+        icon_alt_text='Icon',
+    )
+
+
+class TestImagePrefilter(TestCase):
+    def test_tracking_pixel_is_a_spacer(self):
+        trivial = _classify(_image_bytes(Image.new('RGBA', (1, 1), (0, 0, 0, 0)), 'GIF'))
+        self.assertEqual((trivial.kind, trivial.alt_text), (TRIVIAL_IMAGE_SPACER, ''))
+
+    def test_solid_colour_bar_is_decorative(self):
+        trivial = _classify(_image_bytes(Image.new('RGB', (600, 8), (0, 51, 102)), 'JPEG'))
+        self.assertEqual((trivial.kind, trivial.alt_text), (TRIVIAL_IMAGE_SOLID, ''))
+        self.assertIn('600x8', trivial.reason)
+
+    def test_small_detailed_image_is_an_icon(self):
+        trivial = _classify(_image_bytes(_diagram(16)))
+        self.assertEqual((trivial.kind, trivial.alt_text), (TRIVIAL_IMAGE_ICON, 'Icon'))
+
+    def test_detailed_image_is_not_trivial(self):
+        self.assertIsNone(_classify(_image_bytes(_diagram(400))))
+        self.assertIsNone(_classify(_image_bytes(_diagram(400), 'JPEG')))
+
+    @override_config(ALT_TEXT_CACHE_ENABLED=False)
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.ProcessContentImages.get_image_content_async')
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.AltTextProcessor.generate_alt_text_from_bytes_async')
+    def test_trivial_images_are_stored_without_an_ai_call(self, mock_generate_alt, mock_get_content):
+        course_scan = CourseScan.objects.create(course_id=7070)
+        content_item = ContentItem.objects.create(course=course_scan, content_type='page', content_id=1, content_name='Page')
+        bar = ImageItem.objects.create(course=course_scan, content_item=content_item, image_url='https://example.com/bar.png')
+        diagram = ImageItem.objects.create(course=course_scan, content_item=content_item, image_url='https://example.com/d.png')
+        images = {
+            bar.image_url: _image_bytes(Image.new('RGB', (600, 8), (0, 51, 102))),
+            diagram.image_url: _image_bytes(_diagram(400)),
+        }
+
+        async def get_content(img_url):
+            return images[img_url]
+
+        mock_get_content.side_effect = get_content
+        mock_generate_alt.return_value = 'A red rectangle and a blue circle'
+
+        proc = ProcessContentImages(course_id=course_scan.course_id)
+        proc.retrieve_images_with_alt_text()
+
+        self.assertEqual(mock_generate_alt.call_count, 1)
+        self.assertEqual(dict(proc.prefilter_stats), {TRIVIAL_IMAGE_SOLID: 1})
+        bar.refresh_from_db()
+        self.assertEqual((bar.image_alt_text, bar.processing_status), ('', ImageItemStatus.SKIPPED))
+        self.assertIsNotNone(bar.processed_at)
+        self.assertIn('Solid colour image', bar.rejection_reason)
+        diagram.refresh_from_db()
+        self.assertEqual(diagram.image_alt_text, 'A red rectangle and a blue circle')
+
+    @override_config(IMAGE_PREFILTER_ENABLED=False)
+    def test_disabled_prefilter_lets_every_image_through(self):
+        proc = ProcessContentImages(course_id=7071)
+        self.assertIsNone(async_to_sync(proc.prefilter_image_async)(_image_bytes(Image.new('RGB', (1, 1)))))
+        self.assertEqual(dict(proc.prefilter_stats), {})
+
+    @override_config(IMAGE_PROCESSING_WORKERS=1)
+    def test_prefilter_runs_in_worker_process(self):
+        """The pre-filter decodes images in the shared image process pool, not on the scan's event loop."""
+        proc = ProcessContentImages(course_id=7072)
+        try:
+            trivial = async_to_sync(proc.prefilter_image_async)(_image_bytes(Image.new('RGB', (600, 8), (0, 51, 102))))
+            self.assertIsNotNone(image_optimizer._process_pool)
+        finally:
+            image_optimizer.shutdown_image_process_pool()
+        self.assertEqual(trivial.kind, TRIVIAL_IMAGE_SOLID)
+        self.assertEqual(dict(proc.prefilter_stats), {TRIVIAL_IMAGE_SOLID: 1})
@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from backend.canvas_app_explorer.alt_text_helper.background_tasks.canvas_tools_alt_text_scan import (
+    _hash_content,
+    _scan_content,
+    load_content_watermarks,
+    save_scan_results,
+)
+from backend.canvas_app_explorer.models import CourseScan, ContentItem, ImageItem
+
+
+PAGE_HTML = '<p><img src="https://example.com/a.png" alt="a.png" /></p>'
+EDITED_PAGE_HTML = '<p><img src="https://example.com/b.png" alt="b.png" /></p>'
+
+
+class TestIncrementalCourseScan(TestCase):
+    def setUp(self):
+        self.course_id = 4242
+        self.updated_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        course_scan = CourseScan.objects.create(course_id=self.course_id)
+        self.page = ContentItem.objects.create(
+            course=course_scan, content_type='page', content_id=1, content_name='Page 1',
+            content_updated_at=self.updated_at, content_hash=_hash_content(PAGE_HTML),
+        )
+        self.image = ImageItem.objects.create(
+            course=course_scan, content_item=self.page, image_url='https://example.com/a.png', image_alt_text='Existing alt'
+        )
+        self.removed = ContentItem.objects.create(
+            course=course_scan, content_type='assignment', content_id=2, content_name='Removed',
+        )
+        ImageItem.objects.create(course=course_scan, content_item=self.removed, image_url='https://example.com/c.png')
+
+    def test_unchanged_content_is_not_parsed(self):
+        watermarks = load_content_watermarks(self.course_id)
+        items = async_to_sync(_scan_content)([], watermarks, 1, 'Page 1', PAGE_HTML, 'page', None, self.updated_at)
+        self.assertEqual(len(items), 1)
+        self.assertTrue(items[0]['unchanged'])
+        self.assertEqual(items[0]['images'], [])
+
+    def test_changed_body_is_parsed_even_without_updated_at(self):
+        watermarks = load_content_watermarks(self.course_id)
+        items = async_to_sync(_scan_content)([], watermarks, 1, 'Page 1', EDITED_PAGE_HTML, 'page', None, None)
+        self.assertNotIn('unchanged', items[0])
+        self.assertEqual(items[0]['images'], ['https://example.com/b.png'])
+        self.assertEqual(items[0]['content_hash'], _hash_content(EDITED_PAGE_HTML))
+
+    def test_save_keeps_unchanged_and_drops_removed(self):
+        items = [
+            {'id': 1, 'name': 'Page 1', 'images': [], 'type': 'page', 'content_parent_id': None, 'unchanged': True},
+            {'id': 3, 'name': 'Page 3', 'images': ['https://example.com/d.png'], 'type': 'page',
+             'content_parent_id': None, 'content_updated_at': self.updated_at, 'content_hash': 'abc'},
+        ]
+        save_scan_results(self.course_id, items)
+
+        # unchanged content keeps its image row and alt text
+        self.assertEqual(ImageItem.objects.get(id=self.image.id).image_alt_text, 'Existing alt')
+        # content missing from the scan is removed along with its images
+        self.assertFalse(ContentItem.objects.filter(content_id=2).exists())
+        # new content is stored with its watermark
+        new_page = ContentItem.objects.get(content_id=3)
+        self.assertEqual(new_page.content_hash, 'abc')
+        self.assertEqual(ImageItem.objects.filter(content_item=new_page).count(), 1)
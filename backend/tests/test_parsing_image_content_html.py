@@ -5,6 +5,7 @@ from backend.canvas_app_explorer.alt_text_helper.background_tasks.canvas_tools_a
     extract_images_from_html,
     get_courses_images,
 )
+from backend.canvas_app_explorer.alt_text_helper.canvas_async_client import AsyncCanvasCourse, CanvasAsyncClient
 
 class TestParsingImageContentHTML(TestCase):
     def test_extract_images_from_html_parses_canvas_preview_urls(self):
@@ -97,6 +98,17 @@ class TestParsingImageContentHTML(TestCase):
         self.assertIn("88888888", images[1])
         
         self.assertIn("99999999", images[2])
+
+    def test_extract_images_handles_unclosed_and_uppercase_tags(self):
+        # Canvas content is not always well formed; img tags may be upper case, unclosed or carry entities
+        html = (
+            '<div><IMG SRC="https://example.com/one.png">'
+            '<p>text <img src="https://example.com/two.png?a=1&amp;b=2" alt>'
+            '<img src="https://example.com/three.png" ROLE="Presentation">'
+        )
+
+        images = extract_images_from_html(html)
+        self.assertEqual(images, ["https://example.com/one.png", "https://example.com/two.png?a=1&b=2"])
     
     def test_get_courses_images_filters_out_items_with_empty_images(self):
     # sample payload: some items have empty images lists and should be filtered out
@@ -153,7 +165,7 @@ class TestParsingImageContentHTML(TestCase):
         # Patch the async fetch helpers to return our sample data (no network calls)
         module_path = "backend.canvas_app_explorer.alt_text_helper.background_tasks.canvas_tools_alt_text_scan"
         
-        async def mock_fetch_content_items(fn, course):
+        async def mock_fetch_content_items(fn, course, *args):
             if fn.__name__ == 'get_assignments':
                 return sample_assignments
             elif fn.__name__ == 'get_pages':
@@ -166,8 +178,7 @@ class TestParsingImageContentHTML(TestCase):
              patch(f"{module_path}.save_scan_results") as mock_save:
 
             # Create a dummy course object and a dummy canvas_api (non-None) to exercise the canvas_api path
-            from canvasapi.course import Course
-            dummy_course = Course(None, {'id': 403334})
+            dummy_course = AsyncCanvasCourse(CanvasAsyncClient('https://canvas.test', 'token'), 403334)
 
             # 1. Call get_courses_images to get raw results
             # Note: get_courses_images is async, so wrap it with async_to_sync
@@ -206,8 +217,7 @@ class TestParsingImageContentHTML(TestCase):
             warnings.simplefilter("always")
             
             # Call the async function via async_to_sync
-            from canvasapi.course import Course
-            dummy_course = Course(None, {'id': 403334})
+            dummy_course = AsyncCanvasCourse(CanvasAsyncClient('https://canvas.test', 'token'), 403334)
             
             with patch("backend.canvas_app_explorer.alt_text_helper.background_tasks.canvas_tools_alt_text_scan.fetch_content_items_async", new_callable=AsyncMock, return_value=[]):
                 raw_results = async_to_sync(get_courses_images)(dummy_course)
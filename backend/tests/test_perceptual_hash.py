@@ -0,0 +1,53 @@
+import io
+from django.test import TestCase
+from PIL import Image, ImageDraw
+from backend.canvas_app_explorer.alt_text_helper.alt_text_cache import AltTextCache, generation_settings_key
+from backend.canvas_app_explorer.alt_text_helper.perceptual_hash import dhash, hamming_distance, hash_bands
+
+
+def _diagram(size):
+    image = Image.new('RGB', (size, size), 'white')
+    draw = ImageDraw.Draw(image)
+    scale = size / 400
+    draw.rectangle([40 * scale, 40 * scale, 200 * scale, 160 * scale], fill=(200, 30, 30))
+    draw.ellipse([220 * scale, 180 * scale, 380 * scale, 360 * scale], fill=(30, 30, 200))
+    draw.line([0, 400 * scale, 400 * scale, 0], fill='black', width=int(8 * scale))
+    return image
+
+
+def _reencode(image, image_format, **params):
+    buf = io.BytesIO()
+    image.save(buf, format=image_format, **params)
+    return Image.open(io.BytesIO(buf.getvalue()))
+
+
+class TestPerceptualHash(TestCase):
+    def setUp(self):
+        self.generation_key = generation_settings_key('gpt-4o', 'prompt', 0.0)
+
+    def test_reexported_and_resized_copies_hash_close(self):
+        png = _reencode(_diagram(400), 'PNG')
+        jpeg = _reencode(_diagram(800).resize((300, 300)), 'JPEG', quality=70)
+        self.assertLessEqual(hamming_distance(dhash(png), dhash(jpeg)), 3)
+
+    def test_different_images_hash_far_apart(self):
+        other = Image.new('RGB', (400, 400), 'white')
+        ImageDraw.Draw(other).polygon([(0, 0), (400, 100), (100, 400)], fill='green')
+        self.assertGreater(hamming_distance(dhash(_diagram(400)), dhash(other)), 10)
+
+    def test_hash_bands_round_trip(self):
+        value = dhash(_diagram(400))
+        bands = hash_bands(value)
+        self.assertEqual(len(bands), 4)
+        self.assertEqual(int(''.join(f'{band:016b}' for band in bands), 2), value)
+
+    def test_cache_proposes_alt_text_for_near_duplicate(self):
+        cache = AltTextCache()
+        original = dhash(_diagram(400))
+        cache.set('png-key', 'gpt-4o', 'Red rectangle and blue circle', self.generation_key, original)
+
+        # flip two bits to stand in for a re-export of the same diagram
+        self.assertEqual(cache.get_similar(original ^ 0b101, self.generation_key), 'Red rectangle and blue circle')
+        self.assertIsNone(cache.get_similar(original ^ 0b1111, self.generation_key))
+        self.assertIsNone(cache.get_similar(original, generation_settings_key('gpt-4o', 'new prompt', 0.0)))
+        self.assertEqual(cache.stats()['similar_hits'], 1)
@@ -1,15 +1,33 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+import time
+import httpx
+from asgiref.sync import async_to_sync
+from constance.test import override_config
+from django.conf import settings
+from django.test import TestCase, override_settings
 from unittest.mock import patch, MagicMock
-from backend.canvas_app_explorer.alt_text_helper.process_content_images import ProcessContentImages
+from PIL import Image
+from backend.canvas_app_explorer.alt_text_helper import image_optimizer
+from backend.canvas_app_explorer.alt_text_helper.process_content_images import ProcessContentImages, canonical_image_key
 from backend.canvas_app_explorer.alt_text_helper.background_tasks.canvas_tools_alt_text_scan import (
     retrieve_and_store_alt_text,
     fetch_and_scan_course,
 )
-from backend.canvas_app_explorer.models import CourseScan, ContentItem, ImageItem, CourseScanStatus
+from backend.canvas_app_explorer.alt_text_helper.canvas_async_client import AsyncCanvasCourse, CanvasAsyncClient
+from backend.canvas_app_explorer.models import CourseScan, ContentItem, ImageItem, ImageItemStatus, CourseScanStatus
 from backend.canvas_app_explorer.canvas_lti_manager.exception import ImageContentExtractionException
 from django.contrib.auth.models import User
 
 
+def _image_bytes(size=(10, 10), color=(255, 0, 0), image_format='JPEG'):
+    buf = io.BytesIO()
+    Image.new('RGB', size, color=color).save(buf, format=image_format)
+    return buf.getvalue()
+
+
+@override_config(IMAGE_PREFILTER_ENABLED=False)
 class TestProcessContentImages(TestCase):
     EXPECTED_ALT_TEXT = 'A descriptive alt text'
 
@@ -21,16 +39,11 @@ class TestProcessContentImages(TestCase):
         self.image_item = ImageItem.objects.create(course=course_scan, content_item=content_item, image_url='http://example.com/img.jpg')
 
     @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.ProcessContentImages.get_image_content_async')
-    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.AltTextProcessor.generate_alt_text')
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.AltTextProcessor.generate_alt_text_from_bytes_async')
     def test_retrieve_images_with_alt_text_success_updates_db(self, mock_generate_alt, mock_get_content):
         # create a small in-memory JPEG to simulate a real image response
-        from PIL import Image
-        import io
-        img = Image.new('RGB', (10, 10), color=(255, 0, 0))
-        buf = io.BytesIO()
-        img.save(buf, format='JPEG')
-        buf.seek(0)
-        mock_get_content.return_value = buf.getvalue()
+        contents = _image_bytes()
+        mock_get_content.return_value = contents
         mock_generate_alt.return_value = self.EXPECTED_ALT_TEXT
 
         proc = ProcessContentImages(course_id=self.course_id)
@@ -39,6 +52,8 @@ class TestProcessContentImages(TestCase):
         # ensure results contain our image_url and generated alt text
         self.assertIn('http://example.com/img.jpg', results)
         self.assertEqual(results['http://example.com/img.jpg']['image_alt_text'], self.EXPECTED_ALT_TEXT)
+        # the optimized bytes are sent to the AI request without being re-encoded
+        mock_generate_alt.assert_called_once_with(contents)
 
         # DB record should be updated
         img = ImageItem.objects.get(id=self.image_item.id)
@@ -65,12 +80,11 @@ class TestProcessContentImages(TestCase):
         mock_instance = mock_proc_cls.return_value
         mock_instance.retrieve_images_with_alt_text.return_value = {'http://example.com/img.jpg': {'image_alt_text': 'alt'}}
 
-        from canvasapi.course import Course
-        dummy_course = Course(None, {'id': self.course_id})
+        dummy_course = AsyncCanvasCourse(CanvasAsyncClient('https://canvas.test', 'token'), self.course_id)
 
         result = retrieve_and_store_alt_text(dummy_course, bearer_token=None)
 
-        mock_proc_cls.assert_called_once_with(course_id=self.course_id, bearer_token=None)
+        mock_proc_cls.assert_called_once_with(course_id=self.course_id, bearer_token=None, deadline=None)
         self.assertEqual(result, {'http://example.com/img.jpg': {'image_alt_text': 'alt'}})
 
     @patch('backend.canvas_app_explorer.alt_text_helper.background_tasks.canvas_tools_alt_text_scan.retrieve_and_store_alt_text')
@@ -80,7 +94,7 @@ class TestProcessContentImages(TestCase):
     def test_fetch_and_scan_course_handles_image_extraction_exception(
         self, mock_factory, mock_get_images, mock_unpack, mock_retrieve_alt
     ):
-        """Test that fetch_and_scan_course sets scan status to FAILED when ImageContentExtractionException is raised."""
+        """Failed images don't fail the scan, it ends COMPLETED_WITH_ERRORS so they can be retried on their own."""
         course_id = 999
         user = User.objects.create_user(username='testuser', password='testpass')
         
@@ -90,8 +104,8 @@ class TestProcessContentImages(TestCase):
         # Setup mocks
         mock_manager = MagicMock()
         mock_factory.create_manager.return_value = mock_manager
-        mock_canvas_api = MagicMock()
-        mock_manager.canvas_api = mock_canvas_api
+        mock_manager.api_url = 'https://canvas.test'
+        mock_manager.api_key = 'token'
         
         mock_get_images.return_value = ([], [], [])
         mock_unpack.return_value = True
@@ -110,22 +124,16 @@ class TestProcessContentImages(TestCase):
         # Call the function - it should not raise an exception
         fetch_and_scan_course(task)
         
-        # Verify that CourseScan status was set to FAILED
+        # Verify that CourseScan status was set to COMPLETED_WITH_ERRORS
         course_scan.refresh_from_db()
-        self.assertEqual(course_scan.status, CourseScanStatus.FAILED.value)
+        self.assertEqual(course_scan.status, CourseScanStatus.COMPLETED_WITH_ERRORS.value)
 
     @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.ProcessContentImages.get_image_content_async')
-    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.AltTextProcessor.generate_alt_text')
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.AltTextProcessor.generate_alt_text_from_bytes_async')
     def test_retrieve_images_skips_when_generate_alt_text_returns_none(self, mock_generate_alt, mock_get_content):
         """Test that when generate_alt_text returns None, the image is skipped and not updated in DB."""
-        from PIL import Image
-        import io
-        
-        img = Image.new('RGB', (10, 10), color=(255, 0, 0))
-        buf = io.BytesIO()
-        img.save(buf, format='JPEG')
-        buf.seek(0)
-        mock_get_content.return_value = buf.getvalue()
+        
+        mock_get_content.return_value = _image_bytes()
         mock_generate_alt.return_value = None  # Simulate API failure returning None
 
         proc = ProcessContentImages(course_id=self.course_id)
@@ -139,18 +147,11 @@ class TestProcessContentImages(TestCase):
         self.assertIsNone(img_record.image_alt_text)
 
     @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.ProcessContentImages.get_image_content_async')
-    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.AltTextProcessor.generate_alt_text')
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.AltTextProcessor.generate_alt_text_from_bytes_async')
     def test_process_images_concurrently_converts_none_to_empty_string(self, mock_generate_alt, mock_get_content):
         """Test that _worker_async converts None return to empty string."""
-        from PIL import Image
-        import io
-        from django.conf import settings
-        
-        img = Image.new('RGB', (10, 10), color=(255, 0, 0))
-        buf = io.BytesIO()
-        img.save(buf, format='JPEG')
-        buf.seek(0)
-        mock_get_content.return_value = buf.getvalue()
+        
+        mock_get_content.return_value = _image_bytes()
         mock_generate_alt.return_value = None
 
         proc = ProcessContentImages(course_id=self.course_id)
@@ -167,23 +168,19 @@ class TestProcessContentImages(TestCase):
         # alt_text should be empty string, not None
         self.assertEqual(results[0]['alt_text'], '')
 
+    # both images return the same bytes, which would otherwise be served from the alt text cache
+    @override_config(ALT_TEXT_CACHE_ENABLED=False)
     @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.ProcessContentImages.get_image_content_async')
-    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.AltTextProcessor.generate_alt_text')
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.AltTextProcessor.generate_alt_text_from_bytes_async')
     def test_retrieve_images_handles_mixed_success_and_none_returns(self, mock_generate_alt, mock_get_content):
         """Test that when some images return alt text and some return None, only successful ones are updated."""
-        from PIL import Image
-        import io
         
         # Add another image
         image_item_2 = ImageItem.objects.create(
             course=self.image_item.course, content_item=self.image_item.content_item, image_url='http://example.com/img2.jpg'
         )
         
-        img = Image.new('RGB', (10, 10), color=(255, 0, 0))
-        buf = io.BytesIO()
-        img.save(buf, format='JPEG')
-        buf.seek(0)
-        mock_get_content.return_value = buf.getvalue()
+        mock_get_content.return_value = _image_bytes()
         
         # First image gets alt text, second returns None
         mock_generate_alt.side_effect = ['First image alt text', None]
@@ -203,3 +200,268 @@ class TestProcessContentImages(TestCase):
         # Second image should NOT be updated (remain None)
         img2 = ImageItem.objects.get(id=image_item_2.id)
         self.assertIsNone(img2.image_alt_text)
+
+    @override_config(ALT_TEXT_CACHE_ENABLED=False)
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.ProcessContentImages.get_image_content_async')
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.AltTextProcessor.generate_alt_text_from_bytes_async')
+    def test_retrieve_images_processes_each_canvas_file_once(self, mock_generate_alt, mock_get_content):
+        """The same Canvas file referenced with different verifiers is fetched and captioned once for all ImageItems."""
+        domain = settings.CANVAS_OAUTH_CANVAS_DOMAIN
+        shared_urls = [
+            f'https://{domain}/files/42/download?verifier=abc&download_frd=1',
+            f'https://{domain}/files/42/download?verifier=xyz&download_frd=1',
+        ]
+        shared_items = [
+            ImageItem.objects.create(course=self.image_item.course, content_item=self.image_item.content_item, image_url=url)
+            for url in shared_urls
+        ]
+
+        mock_get_content.return_value = _image_bytes()
+        mock_generate_alt.return_value = self.EXPECTED_ALT_TEXT
+
+        proc = ProcessContentImages(course_id=self.course_id, bearer_token='token')
+        proc.retrieve_images_with_alt_text()
+
+        # one call for the shared Canvas file and one for the external image
+        self.assertEqual(mock_get_content.call_count, 2)
+        self.assertEqual(mock_generate_alt.call_count, 2)
+        for item in shared_items + [self.image_item]:
+            self.assertEqual(ImageItem.objects.get(id=item.id).image_alt_text, self.EXPECTED_ALT_TEXT)
+
+    @override_config(ALT_TEXT_CACHE_ENABLED=False, IMAGE_PROCESSING_CHUNK_SIZE=2)
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.ProcessContentImages.get_image_content_async')
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.AltTextProcessor.generate_alt_text_from_bytes_async')
+    def test_retrieve_images_saves_alt_text_after_each_chunk(self, mock_generate_alt, mock_get_content):
+        """Images are processed IMAGE_PROCESSING_CHUNK_SIZE at a time, and a chunk's alt text is saved before the next starts."""
+        urls = ['http://example.com/img.jpg', 'http://example.com/a.jpg', 'http://example.com/b.jpg', 'http://example.com/a.jpg']
+        for url in urls[1:]:
+            ImageItem.objects.create(course=self.image_item.course, content_item=self.image_item.content_item, image_url=url)
+
+        contents = _image_bytes()
+        events = []
+
+        async def get_content(img_url):
+            events.append('fetch')
+            return contents
+
+        mock_get_content.side_effect = get_content
+        mock_generate_alt.return_value = self.EXPECTED_ALT_TEXT
+
+        proc = ProcessContentImages(course_id=self.course_id)
+        flush = proc._flush_alt_text_results
+
+        def record_flush(gen_results, results, errors, retry):
+            events.append(f'flush {len(gen_results)}')
+            flush(gen_results, results, errors, retry)
+
+        proc._flush_alt_text_results = record_flush
+        results = proc.retrieve_images_with_alt_text()
+
+        # the repeated image in the second chunk reuses the alt text generated in the first
+        self.assertEqual(events, ['fetch', 'fetch', 'flush 2', 'fetch', 'flush 2'])
+        self.assertEqual(set(results), set(urls))
+        self.assertEqual(ImageItem.objects.filter(image_alt_text=self.EXPECTED_ALT_TEXT).count(), 4)
+
+    @override_config(ALT_TEXT_CACHE_ENABLED=False, IMAGE_RETRY_MAX_ATTEMPTS=3, IMAGE_RETRY_BACKOFF_SECONDS=60)
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.ProcessContentImages.get_image_content_async')
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.AltTextProcessor.generate_alt_text_from_bytes_async')
+    def test_retry_failed_images_reprocesses_only_failed_images(self, mock_generate_alt, mock_get_content):
+        """A failed image keeps its error and backoff, and a retry fetches only that image again."""
+        failing_item = ImageItem.objects.create(
+            course=self.image_item.course, content_item=self.image_item.content_item, image_url='http://example.com/broken.jpg'
+        )
+        contents = _image_bytes()
+        fetched = []
+
+        async def get_content(img_url):
+            fetched.append(img_url)
+            if img_url == failing_item.image_url and len(fetched) <= 2:
+                return Exception('fetch failed')
+            return contents
+
+        mock_get_content.side_effect = get_content
+        mock_generate_alt.return_value = self.EXPECTED_ALT_TEXT
+
+        with self.assertRaises(ImageContentExtractionException):
+            ProcessContentImages(course_id=self.course_id).retrieve_images_with_alt_text()
+
+        failed = ImageItem.objects.get(id=failing_item.id)
+        self.assertEqual(failed.processing_status, ImageItemStatus.FAILED)
+        self.assertEqual(failed.attempt_count, 1)
+        self.assertEqual(failed.last_error, 'fetch failed')
+        self.assertIsNotNone(failed.next_attempt_at)
+        self.assertEqual(ImageItem.objects.get(id=self.image_item.id).processing_status, ImageItemStatus.COMPLETED)
+
+        # the backoff hasn't passed yet
+        self.assertEqual(ProcessContentImages(course_id=self.course_id).retry_failed_images(), {})
+        self.assertEqual(len(fetched), 2)
+
+        results = ProcessContentImages(course_id=self.course_id).retry_failed_images(respect_backoff=False)
+
+        self.assertEqual(fetched[2:], [failing_item.image_url])
+        self.assertEqual(list(results), [failing_item.image_url])
+        retried = ImageItem.objects.get(id=failing_item.id)
+        self.assertEqual(retried.processing_status, ImageItemStatus.COMPLETED)
+        self.assertEqual(retried.attempt_count, 2)
+        self.assertIsNone(retried.last_error)
+        self.assertEqual(retried.image_alt_text, self.EXPECTED_ALT_TEXT)
+
+    @override_config(IMAGE_RETRY_MAX_ATTEMPTS=3, IMAGE_RETRY_BACKOFF_SECONDS=60)
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.ProcessContentImages.get_image_content_async')
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.AltTextProcessor.generate_alt_text_from_bytes_async')
+    def test_images_past_the_scan_deadline_are_left_for_retry(self, mock_generate_alt, mock_get_content):
+        """Once the deadline has passed images are neither fetched nor described, but FAILED for the retry."""
+        proc = ProcessContentImages(course_id=self.course_id, deadline=time.monotonic() - 1)
+        self.assertEqual(proc.alt_text_processor.deadline, proc.deadline)
+
+        with self.assertRaises(ImageContentExtractionException):
+            proc.retrieve_images_with_alt_text()
+
+        mock_get_content.assert_not_called()
+        mock_generate_alt.assert_not_called()
+        img = ImageItem.objects.get(id=self.image_item.id)
+        self.assertEqual((img.processing_status, img.attempt_count), (ImageItemStatus.FAILED, 0))
+        self.assertIn('deadline', img.last_error)
+        self.assertIsNotNone(img.next_attempt_at)
+
+        # a retry cut short by the deadline doesn't use up an attempt either
+        with self.assertRaises(ImageContentExtractionException):
+            ProcessContentImages(course_id=self.course_id, deadline=time.monotonic() - 1).retry_failed_images(
+                respect_backoff=False
+            )
+        self.assertEqual(ImageItem.objects.get(id=self.image_item.id).attempt_count, 0)
+
+    def test_canonical_image_key_normalizes_external_urls(self):
+        self.assertEqual(
+            canonical_image_key('HTTPS://Example.com:443/a.png?b=2&a=1#top'),
+            canonical_image_key('https://example.com/a.png?a=1&b=2'),
+        )
+        self.assertNotEqual(canonical_image_key('https://example.com/a.png'), canonical_image_key('https://example.com/b.png'))
+
+    def test_download_session_reuses_one_client_across_redirects(self):
+        """Image downloads in a session share one pooled client, and Canvas redirects to the CDN drop the token."""
+        contents = _image_bytes()
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            if request.url.host == settings.CANVAS_OAUTH_CANVAS_DOMAIN:
+                return httpx.Response(302, headers={'Location': f'https://cdn.example.com{request.url.path}'})
+            return httpx.Response(200, content=contents)
+
+        proc = ProcessContentImages(
+            course_id=self.course_id, bearer_token='token', transport=httpx.MockTransport(handler)
+        )
+        clients = []
+
+        async def download():
+            async with proc.image_download_session():
+                for file_id in (1, 2):
+                    clients.append(proc._http_client)
+                    url = f'https://{settings.CANVAS_OAUTH_CANVAS_DOMAIN}/files/{file_id}/download?download_frd=1'
+                    self.assertIsInstance(await proc.get_image_content_async(url), bytes)
+
+        async_to_sync(download)()
+
+        self.assertIs(clients[0], clients[1])
+        self.assertIsNone(proc._http_client)
+        self.assertEqual(requests[0].headers['Authorization'], 'Bearer token')
+        self.assertNotIn('Authorization', requests[1].headers)
+
+    def test_unchanged_image_is_served_from_optimized_image_cache(self):
+        """A second download sends the cached ETag, and a 304 answer reuses the cached optimized bytes."""
+        contents = _image_bytes((1024, 768), (0, 128, 255), 'PNG')
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            if request.headers.get('If-None-Match') == '"v1"':
+                return httpx.Response(304, headers={'ETag': '"v1"'})
+            return httpx.Response(200, content=contents, headers={'ETag': '"v1"'})
+
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(OPTIMIZED_IMAGE_CACHE_DIR=cache_dir):
+            first = ProcessContentImages(course_id=self.course_id, transport=httpx.MockTransport(handler))
+            downloaded = async_to_sync(first.get_image_content_async)('https://example.com/a.png?b=2&a=1')
+            second = ProcessContentImages(course_id=self.course_id, transport=httpx.MockTransport(handler))
+            revalidated = async_to_sync(second.get_image_content_async)('https://example.com/a.png?a=1&b=2')
+
+        self.assertEqual(revalidated, downloaded)
+        self.assertNotIn('If-None-Match', requests[0].headers)
+        self.assertEqual(requests[1].headers['If-None-Match'], '"v1"')
+        self.assertEqual(first.optimized_image_cache.stats(), {'hits': 0, 'stored': 1})
+        self.assertEqual(second.optimized_image_cache.stats(), {'hits': 1, 'stored': 0})
+
+    @override_config(OPTIMIZED_IMAGE_CACHE_ENABLED=False)
+    def test_not_modified_without_a_cached_copy_is_an_error(self):
+        transport = httpx.MockTransport(lambda request: httpx.Response(304))
+        proc = ProcessContentImages(course_id=self.course_id, transport=transport)
+        result = async_to_sync(proc.get_image_content_async)('https://example.com/a.png')
+        self.assertIsInstance(result, ValueError)
+        self.assertIn('304 Not Modified to an unconditional request', str(result))
+
+    @override_config(OPTIMIZED_IMAGE_CACHE_ENABLED=False, IMAGE_PROCESSING_WORKERS=0)
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.IMAGE_SPOOL_MEMORY_BYTES', 1024)
+    def test_download_spooled_to_disk_is_optimized_from_its_path(self):
+        """A download larger than the in-memory spool reaches the optimizer as a file path, removed afterwards."""
+        contents = _image_bytes((1024, 768), (0, 128, 255), 'PNG')
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=contents))
+        proc = ProcessContentImages(course_id=self.course_id, transport=transport)
+        optimize = proc.optimize_image_async
+        received = []
+
+        async def record_optimize(image_content, image_id):
+            received.append(image_content)
+            return await optimize(image_content, image_id)
+
+        proc.optimize_image_async = record_optimize
+        optimized = async_to_sync(proc.get_image_content_async)('https://example.com/large.png')
+
+        self.assertIsInstance(received[0], str)
+        self.assertFalse(os.path.exists(received[0]))
+        self.assertEqual(optimized, proc.get_optimized_images(contents, 'large.png'))
+
+    @override_config(IMAGE_MAX_PIXELS=100)
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.AltTextProcessor.generate_alt_text_from_bytes_async')
+    def test_oversized_image_is_rejected_with_reason(self, mock_generate_alt):
+        """Images over the pixel limit are rejected from their header, recorded on the ImageItem and not sent to the AI."""
+        contents = _image_bytes((20, 20), (255, 0, 0), 'PNG')
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, content=contents, headers={'Content-Type': 'image/png'})
+        )
+
+        proc = ProcessContentImages(course_id=self.course_id, transport=transport)
+        results = proc.retrieve_images_with_alt_text()
+
+        self.assertEqual(results, {})
+        mock_generate_alt.assert_not_called()
+        img = ImageItem.objects.get(id=self.image_item.id)
+        self.assertIsNone(img.image_alt_text)
+        self.assertEqual(img.rejection_reason, 'Image dimensions 20x20 exceed the 100 pixel limit')
+
+    def test_large_jpeg_is_decoded_at_reduced_resolution(self):
+        """Large JPEGs are draft-decoded near the target size and the saving is reported in the metrics."""
+        contents = _image_bytes((4000, 3000), (0, 128, 255), 'JPEG')
+
+        proc = ProcessContentImages(course_id=self.course_id)
+        with self.assertLogs('backend.canvas_app_explorer.alt_text_helper.process_content_images', level='DEBUG') as logs:
+            optimized = proc.get_optimized_images(contents, 'large.jpg')
+
+        self.assertEqual(Image.open(io.BytesIO(optimized)).size, (512, 384))
+        metrics = next(line for line in logs.output if 'Optimization metrics' in line)
+        self.assertIn("'decoded_dimensions': (1000, 750)", metrics)
+        self.assertIn("'reduced_resolution_decode': True", metrics)
+        self.assertIn(f"'decode_memory_saved_bytes': {(4000 * 3000 - 1000 * 750) * 3}", metrics)
+
+    @override_config(IMAGE_PROCESSING_WORKERS=1)
+    def test_optimize_image_async_runs_in_worker_process(self):
+        """Scans resize images in the shared process pool and get the same JPEG the in-process path produces."""
+        contents = _image_bytes((1024, 768), (0, 128, 255), 'PNG')
+        proc = ProcessContentImages(course_id=self.course_id)
+        try:
+            optimized = async_to_sync(proc.optimize_image_async)(contents, 'pooled.png')
+            self.assertIsNotNone(image_optimizer._process_pool)
+        finally:
+            image_optimizer.shutdown_image_process_pool()
+
+        self.assertEqual(optimized, proc.get_optimized_images(contents, 'pooled.png'))
+        self.assertEqual(Image.open(io.BytesIO(optimized)).size, (512, 384))
@@ -0,0 +1,56 @@
+from django.test import TestCase
+from backend.canvas_app_explorer.alt_text_helper.background_tasks.canvas_tools_alt_text_scan import save_scan_results
+from backend.canvas_app_explorer.models import CourseScan, ContentItem, ImageItem
+
+
+class TestSaveScanResults(TestCase):
+    def setUp(self):
+        self.course_id = 7070
+        course_scan = CourseScan.objects.create(course_id=self.course_id)
+        self.page = ContentItem.objects.create(course=course_scan, content_type='page', content_id=1, content_name='Page 1')
+        self.kept_image = ImageItem.objects.create(
+            course=course_scan, content_item=self.page, image_url='https://example.com/kept.png', image_alt_text='Kept alt'
+        )
+        self.removed_image = ImageItem.objects.create(
+            course=course_scan, content_item=self.page, image_url='https://example.com/removed.png', image_alt_text='Removed alt'
+        )
+
+    def test_diff_keeps_matching_images_and_alt_text(self):
+        items = [{
+            'id': 1, 'name': 'Page 1 renamed', 'type': 'page', 'content_parent_id': None,
+            'images': ['https://example.com/kept.png', 'https://example.com/new.png'],
+        }]
+        save_scan_results(self.course_id, items)
+
+        # the row for an image still on the page is untouched, including its alt text
+        kept = ImageItem.objects.get(id=self.kept_image.id)
+        self.assertEqual(kept.image_alt_text, 'Kept alt')
+        self.assertFalse(ImageItem.objects.filter(id=self.removed_image.id).exists())
+        new_image = ImageItem.objects.get(image_url='https://example.com/new.png')
+        self.assertIsNone(new_image.image_alt_text)
+        # the ContentItem is updated in place
+        page = ContentItem.objects.get(content_id=1)
+        self.assertEqual(page.id, self.page.id)
+        self.assertEqual(page.content_name, 'Page 1 renamed')
+
+    def test_duplicate_image_urls_are_matched_one_to_one(self):
+        items = [{
+            'id': 1, 'name': 'Page 1', 'type': 'page', 'content_parent_id': None,
+            'images': ['https://example.com/kept.png', 'https://example.com/kept.png'],
+        }]
+        save_scan_results(self.course_id, items)
+
+        urls = list(ImageItem.objects.filter(content_item_id=1).values_list('image_url', flat=True))
+        self.assertEqual(urls, ['https://example.com/kept.png', 'https://example.com/kept.png'])
+        self.assertTrue(ImageItem.objects.filter(id=self.kept_image.id).exists())
+
+    def test_new_content_is_inserted(self):
+        items = [
+            {'id': 1, 'name': 'Page 1', 'type': 'page', 'content_parent_id': None, 'images': ['https://example.com/kept.png']},
+            {'id': 2, 'name': 'Question', 'type': 'quiz_question', 'content_parent_id': 10, 'images': ['https://example.com/q.png']},
+        ]
+        save_scan_results(self.course_id, items)
+
+        question = ContentItem.objects.get(content_id=2)
+        self.assertEqual(question.content_parent_id, 10)
+        self.assertEqual(ImageItem.objects.filter(content_item=question).count(), 1)
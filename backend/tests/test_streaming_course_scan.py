@@ -0,0 +1,106 @@
+import asyncio
+import io
+from unittest.mock import patch
+from asgiref.sync import async_to_sync
+from constance.test import override_config
+from django.test import TestCase
+from PIL import Image
+from backend.canvas_app_explorer.alt_text_helper.canvas_async_client import AsyncCanvasCourse, CanvasAsyncClient
+from backend.canvas_app_explorer.alt_text_helper.background_tasks.canvas_tools_alt_text_scan import (
+    _run_scan_pipeline, stream_and_store_course_images,
+)
+from backend.canvas_app_explorer.alt_text_helper.process_content_images import ProcessContentImages
+from backend.canvas_app_explorer.models import CourseScan, ContentItem, ImageItem, CourseScanStatus
+
+
+MODULE_PATH = 'backend.canvas_app_explorer.alt_text_helper.background_tasks.canvas_tools_alt_text_scan'
+
+
+def _jpeg_bytes():
+    buf = io.BytesIO()
+    Image.new('RGB', (10, 10), color=(0, 0, 255)).save(buf, format='JPEG')
+    return buf.getvalue()
+
+
+def _fake_fetch(content_type, content_id, image_url):
+    async def fetch(course, watermarks=None, on_content=None):
+        item = {'id': content_id, 'name': f'{content_type} {content_id}', 'images': [image_url], 'type': content_type,
+                'content_parent_id': None}
+        await on_content(item)
+        return [item]
+    return fetch
+
+
+@override_config(IMAGE_PREFILTER_ENABLED=False)
+class TestStreamingCourseScan(TestCase):
+    def setUp(self):
+        self.course_id = 5151
+        course_scan = CourseScan.objects.create(course_id=self.course_id, status=CourseScanStatus.RUNNING.value)
+        # content from an earlier scan that Canvas no longer returns
+        stale = ContentItem.objects.create(course=course_scan, content_type='page', content_id=99, content_name='Old')
+        ImageItem.objects.create(course=course_scan, content_item=stale, image_url='https://example.com/old.png')
+
+    def _course(self):
+        return AsyncCanvasCourse(CanvasAsyncClient('https://canvas.test', 'token'), self.course_id)
+
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.ProcessContentImages.get_image_content_async')
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.AltTextProcessor.generate_alt_text_from_bytes_async')
+    def test_streaming_scan_persists_content_and_alt_text(self, mock_generate_alt, mock_get_content):
+        mock_get_content.return_value = _jpeg_bytes()
+        mock_generate_alt.return_value = 'Streamed alt text'
+
+        with patch(f'{MODULE_PATH}.get_assignments', _fake_fetch('assignment', 1, 'https://example.com/a.png')), \
+             patch(f'{MODULE_PATH}.get_pages', _fake_fetch('page', 2, 'https://example.com/p.png')), \
+             patch(f'{MODULE_PATH}.get_quizzes', _fake_fetch('quiz', 3, 'https://example.com/q.png')):
+            state = stream_and_store_course_images(self._course(), None, None, False)
+
+        self.assertTrue(state)
+        self.assertEqual(
+            set(ContentItem.objects.filter(course_id=self.course_id).values_list('content_id', flat=True)), {1, 2, 3}
+        )
+        images = ImageItem.objects.filter(course_id=self.course_id)
+        self.assertEqual(images.count(), 3)
+        self.assertTrue(all(img.image_alt_text == 'Streamed alt text' for img in images))
+
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.ProcessContentImages.get_image_content_async')
+    @patch('backend.canvas_app_explorer.alt_text_helper.process_content_images.AltTextProcessor.generate_alt_text_from_bytes_async')
+    def test_streaming_scan_fetch_error_marks_failed_and_keeps_old_content(self, mock_generate_alt, mock_get_content):
+        mock_get_content.return_value = _jpeg_bytes()
+        mock_generate_alt.return_value = 'Streamed alt text'
+
+        async def failing_fetch(course, watermarks=None, on_content=None):
+            raise Exception('Canvas unavailable')
+
+        with patch(f'{MODULE_PATH}.get_assignments', _fake_fetch('assignment', 1, 'https://example.com/a.png')), \
+             patch(f'{MODULE_PATH}.get_pages', failing_fetch), \
+             patch(f'{MODULE_PATH}.get_quizzes', _fake_fetch('quiz', 3, 'https://example.com/q.png')):
+            state = stream_and_store_course_images(self._course(), None, None, False)
+
+        self.assertFalse(state)
+        self.assertEqual(CourseScan.objects.get(course_id=self.course_id).status, CourseScanStatus.FAILED.value)
+        # stale content is only removed after a complete fetch
+        self.assertTrue(ContentItem.objects.filter(content_id=99).exists())
+
+    def test_pipeline_error_stops_the_other_stages_before_it_propagates(self):
+        consumer_cancelled = []
+
+        async def failing_fetch(course, watermarks=None, on_content=None):
+            raise RuntimeError('Canvas unavailable')
+
+        async def stalled_consumer(image_queue, concurrency):
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                consumer_cancelled.append(True)
+                raise
+
+        async def run():
+            proc = ProcessContentImages(course_id=self.course_id)
+            with self.assertRaisesRegex(RuntimeError, 'Canvas unavailable'):
+                await _run_scan_pipeline(self._course(), proc, None, False)
+            # checked on the scan's own loop, before its teardown could cancel anything
+            self.assertEqual(consumer_cancelled, [True])
+
+        with patch(f'{MODULE_PATH}.fetch_course_content', failing_fetch), \
+             patch.object(ProcessContentImages, 'consume_image_queue', side_effect=stalled_consumer):
+            async_to_sync(run)()